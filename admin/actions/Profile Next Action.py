@@ -0,0 +1,6 @@
+
+def run(self):
+    # The next background job runs under cProfile, see instrumentation.py
+    self.profile_next_job = True
+    self.append_message('cProfile armed, the next action will be profiled.')
+    self.append_message('Stats are written to the log and to OUTPUT/diagnostics once the action completes.')
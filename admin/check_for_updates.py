@@ -6,11 +6,12 @@ from common import nl
 from common import REPO_BASE_URL
 
 REPO_URL = f"{REPO_BASE_URL}/commits/main"
+REQUEST_TIMEOUT = 10
 
 
 def get_latest_commit_sha():
     try:
-        response = requests.get(REPO_URL)
+        response = requests.get(REPO_URL, timeout=REQUEST_TIMEOUT)
         response.raise_for_status()
         data = response.json()
         return data['sha']
@@ -0,0 +1,360 @@
+# actions.py
+
+"""
+Headless benchmark of the BadgerWiFi-tools actions against a synthetic project.
+
+A synthetic project is generated (see synthetic_esx.py), then every selected action is run
+--runs times, each run in a fresh interpreter so the memory high-water mark belongs to that
+action alone. Each run records:
+
+    seconds             wall clock time of the action
+    baseline_rss_mb     peak resident memory after imports, before the action started
+    peak_rss_mb         peak resident memory of the whole run
+    peak_python_mb      peak Python heap allocation, only with --trace-python-memory (tracemalloc slows Python code down)
+    spans / counters    the instrumentation totals, see instrumentation.py
+
+The median of every run is written to the results JSON, together with the scale, commit and
+platform, so results from different commits can be compared with --compare.
+
+Usage, from the repository root:
+    python -m benchmarks.actions --floors 4 --aps-per-floor 200 --runs 3 --json results.json
+    python -m benchmarks.actions --actions validate,ap_list --compare results.json
+"""
+
+import sys
+import json
+import types
+import time
+import argparse
+import platform
+import statistics
+import subprocess
+import tempfile
+from pathlib import Path
+from datetime import datetime
+
+from benchmarks.synthetic_esx import generate_project, add_scale_arguments, scale_from_arguments
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+PROJECT_NAME = 'synthetic'
+BENCHMARK_PROFILE = 'example 2'
+
+# pds_project installs the profile's post-deployment requirements, used when the benchmark profile defines none
+BENCHMARK_PDS_REQUIREMENTS = [{
+    'id': '00000000-0000-4000-8000-00000000b0b0',
+    'requirementId': '00000000-0000-4000-8000-00000000b0b0',
+    'name': 'Benchmark Post-Deployment',
+    'isDefault': True,
+    'criteria': [],
+}]
+
+# Map settings, the defaults of the Asset Creator tab
+AP_ICON_SIZE = 25
+AP_NAME_LABEL_SIZE = 30
+ZOOMED_AP_CROP_SIZE = 2000
+
+# Regressions beyond this ratio are flagged by --compare
+REGRESSION_THRESHOLD = 1.10
+
+
+def benchmark_profile(profile_module):
+    """The profile the actions run with, a copy with BENCHMARK_PDS_REQUIREMENTS when it has no post-deployment requirements."""
+    if getattr(profile_module, 'post_deployment_survey_coverage_requirements', None):
+        return profile_module
+    profile = types.ModuleType(profile_module.__name__)
+    profile.__dict__.update(vars(profile_module))
+    profile.post_deployment_survey_coverage_requirements = BENCHMARK_PDS_REQUIREMENTS
+    return profile
+
+
+class BenchmarkProject:
+    """Stands in for MyFrame, carrying the attributes the actions read from it."""
+
+    def __init__(self, working_directory, project_name, project_profile_module):
+        self.working_directory = Path(working_directory)
+        self.project_name = project_name
+        self.messages = []
+
+        self.project_profile_module = project_profile_module
+        self.current_profile_ap_list_module = project_profile_module
+        self.required_tag_keys = getattr(project_profile_module, 'requiredTagKeys', ())
+        self.optional_tag_keys = getattr(project_profile_module, 'optionalTagKeys', ())
+        self.predictive_design_coverage_requirements = getattr(project_profile_module, 'predictive_design_coverage_requirements', None)
+        self.post_deployment_survey_coverage_requirements = getattr(project_profile_module, 'post_deployment_survey_coverage_requirements', None)
+
+        self.site_id = None
+        self.site_location = None
+        self.project_version = None
+
+        self.ap_icon_size = AP_ICON_SIZE
+        self.ap_name_label_size = AP_NAME_LABEL_SIZE
+        self.zoomed_ap_crop_size = ZOOMED_AP_CROP_SIZE
+        self.create_pdf_atlas = False
+        self.create_svg_overlay = False
+
+    def append_message(self, message):
+        self.messages.append(message)
+
+
+def run_summary(project, stop_event):
+    from project_detail.Summarise import run as summarise_esx
+    summarise_esx(project.working_directory, project.project_name, project.append_message)
+
+
+def run_validate(project, stop_event):
+    from esx_actions.validate_esx import validate_esx
+    validate_esx(project, project.append_message, stop_event)
+
+
+def run_ap_list(project, stop_event):
+    from esx_actions.ap_list_creator import create_ap_list
+    create_ap_list(project, stop_event)
+
+
+def run_surveyed_ap_list(project, stop_event):
+    from survey.surveyed_ap_list import create_surveyed_ap_list
+    create_surveyed_ap_list(project, stop_event)
+
+
+def run_blank_maps(project, stop_event):
+    from map_creator.extract_blank_maps import extract_blank_maps
+    extract_blank_maps(project.working_directory, project.project_name, project.append_message)
+
+
+def run_ap_location_maps(project, stop_event):
+    from map_creator.create_ap_location_maps import create_ap_location_maps
+    create_ap_location_maps(project, stop_event)
+
+
+def run_zoomed_maps(project, stop_event):
+    from map_creator.create_zoomed_ap_location_maps import create_zoomed_ap_location_maps
+    from map_creator.map_encoding import get_map_encoding_options
+    create_zoomed_ap_location_maps(project.working_directory, project.project_name, project.append_message, project.zoomed_ap_crop_size,
+                                   project.ap_icon_size, project.ap_name_label_size, stop_event,
+                                   encoding_options=get_map_encoding_options(getattr(project, 'project_profile_module', None)))
+
+
+def run_pds_maps(project, stop_event):
+    from map_creator.create_pds_maps import create_pds_maps
+    from map_creator.map_encoding import get_map_encoding_options
+    create_pds_maps(project.working_directory, project.project_name, project.append_message, project.ap_icon_size, project.ap_name_label_size, stop_event,
+                    encoding_options=get_map_encoding_options(getattr(project, 'project_profile_module', None)))
+
+
+def run_pds_project(project, stop_event):
+    from survey.pds_project_creator import create_pds_project_esx
+    create_pds_project_esx(project, project.append_message)
+
+
+def run_ap_images(project, stop_event):
+    from survey.export_ap_images import export_ap_images
+    export_ap_images(project)
+
+
+def run_map_note_images(project, stop_event):
+    from survey.export_map_note_images import export_map_note_images
+    export_map_note_images(project)
+
+
+# In run order, pds_project reuses the output of pds_maps
+# name: (module imported before the timed run, runner)
+ACTIONS = {
+    'summary': ('project_detail.Summarise', run_summary),
+    'validate': ('esx_actions.validate_esx', run_validate),
+    'ap_list': ('esx_actions.ap_list_creator', run_ap_list),
+    'surveyed_ap_list': ('survey.surveyed_ap_list', run_surveyed_ap_list),
+    'blank_maps': ('map_creator.extract_blank_maps', run_blank_maps),
+    'ap_location_maps': ('map_creator.create_ap_location_maps', run_ap_location_maps),
+    'zoomed_maps': ('map_creator.create_zoomed_ap_location_maps', run_zoomed_maps),
+    'pds_maps': ('map_creator.create_pds_maps', run_pds_maps),
+    'pds_project': ('survey.pds_project_creator', run_pds_project),
+    'ap_images': ('survey.export_ap_images', run_ap_images),
+    'map_note_images': ('survey.export_map_note_images', run_map_note_images),
+}
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process, None where the resource module is unavailable (Windows)."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def run_child(action, working_directory, trace_python_memory):
+    """Runs inside the child interpreter, prints the run result as JSON on the last line of stdout."""
+    import threading
+    import importlib
+    import tracemalloc
+
+    import wx
+
+    from common import PROJECT_PROFILES_DIR
+    from module_registry import load_module
+    from instrumentation import instrument_run
+
+    # wx.CallAfter needs an application object, no window is ever shown
+    app = wx.App(False)
+
+    profile_module = benchmark_profile(load_module(PROJECT_PROFILES_DIR, BENCHMARK_PROFILE))
+    project = BenchmarkProject(working_directory, PROJECT_NAME, profile_module)
+
+    # Import the action module before measuring, import cost belongs to the cold start benchmark
+    module_name, runner = ACTIONS[action]
+    importlib.import_module(module_name)
+    baseline_rss_mb = peak_rss_mb()
+
+    if trace_python_memory:
+        tracemalloc.start()
+
+    error = None
+    start = time.perf_counter()
+    with instrument_run(action, lambda message: None) as recorder:
+        try:
+            runner(project, threading.Event())
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+    seconds = time.perf_counter() - start
+
+    peak_python_mb = tracemalloc.get_traced_memory()[1] / (1024 * 1024) if trace_python_memory else None
+
+    # Deliver the log messages queued with wx.CallAfter, outside the timed region
+    app.ProcessPendingEvents()
+
+    result = {
+        'seconds': seconds,
+        'baseline_rss_mb': baseline_rss_mb,
+        'peak_rss_mb': peak_rss_mb(),
+        'peak_python_mb': peak_python_mb,
+        'spans': {name: total for name, (calls, total, longest) in recorder.span_totals().items()},
+        'counters': recorder.counters,
+        'messages': len(project.messages),
+        'error': error,
+    }
+    print(json.dumps(result))
+
+
+def run_once(action, working_directory, trace_python_memory):
+    command = [sys.executable, '-m', 'benchmarks.actions', '--child', action, '--working-directory', str(working_directory)]
+    if trace_python_memory:
+        command.append('--trace-python-memory')
+
+    result = subprocess.run(command, cwd=REPO_ROOT, capture_output=True, text=True)
+    if result.returncode != 0 or not result.stdout.strip():
+        return {'error': f"child process failed:\n{result.stderr.strip()}"}
+
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def median_or_none(values):
+    values = [value for value in values if value is not None]
+    return statistics.median(values) if values else None
+
+
+def summarise_runs(runs):
+    successful = [run for run in runs if not run.get('error')]
+    if not successful:
+        return {'status': 'failed', 'error': runs[-1].get('error'), 'runs': runs}
+
+    span_names = {name for run in successful for name in run['spans']}
+    return {
+        'status': 'complete',
+        'seconds': median_or_none(run['seconds'] for run in successful),
+        'baseline_rss_mb': median_or_none(run['baseline_rss_mb'] for run in successful),
+        'peak_rss_mb': median_or_none(run['peak_rss_mb'] for run in successful),
+        'peak_python_mb': median_or_none(run['peak_python_mb'] for run in successful),
+        'spans': {name: median_or_none(run['spans'].get(name, 0.0) for run in successful) for name in sorted(span_names)},
+        'counters': successful[-1]['counters'],
+        'runs': [run['seconds'] for run in successful],
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], cwd=REPO_ROOT, stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def format_mb(value):
+    return f"{value:8.1f}" if value is not None else f"{'-':>8}"
+
+
+def print_results(results, previous=None):
+    print(f"{'action':<20} {'seconds':>9} {'peak MB':>8} {'delta MB':>8}  {'vs previous' if previous else ''}")
+    for action, result in results['actions'].items():
+        if result['status'] != 'complete':
+            print(f"{action:<20} {'failed':>9}  {result['error'].splitlines()[-1] if result['error'] else ''}")
+            continue
+
+        delta = result['peak_rss_mb'] - result['baseline_rss_mb'] if result['peak_rss_mb'] is not None else None
+        comparison = ''
+        previous_result = (previous or {}).get('actions', {}).get(action)
+        if previous_result and previous_result.get('status') == 'complete' and previous_result['seconds']:
+            ratio = result['seconds'] / previous_result['seconds']
+            comparison = f"x{ratio:.2f}" + ('  REGRESSION' if ratio > REGRESSION_THRESHOLD else '')
+        print(f"{action:<20} {result['seconds']:9.3f} {format_mb(result['peak_rss_mb'])} {format_mb(delta)}  {comparison}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark BadgerWiFi-tools actions against a synthetic project')
+    add_scale_arguments(parser)
+    parser.add_argument('--actions', default=','.join(ACTIONS), help=f"comma separated, from: {', '.join(ACTIONS)}")
+    parser.add_argument('--runs', type=int, default=3, help='runs per action, the median is reported')
+    parser.add_argument('--json', type=Path, help='write the results to this file')
+    parser.add_argument('--compare', type=Path, help='previous results file to compare against')
+    parser.add_argument('--trace-python-memory', action='store_true', help='also record the tracemalloc peak, slows Python code down')
+    parser.add_argument('--working-directory', type=Path, help='where the synthetic project is generated, a temporary directory by default')
+    parser.add_argument('--child', choices=ACTIONS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.child, args.working_directory, args.trace_python_memory)
+        return
+
+    actions = [action.strip() for action in args.actions.split(',') if action.strip()]
+    unknown = [action for action in actions if action not in ACTIONS]
+    if unknown:
+        parser.error(f"unknown action(s): {', '.join(unknown)}")
+
+    scale = scale_from_arguments(args)
+
+    with tempfile.TemporaryDirectory(prefix='badger-bench-') as temporary_directory:
+        working_directory = args.working_directory or Path(temporary_directory)
+
+        start = time.perf_counter()
+        generate_project(working_directory, PROJECT_NAME, args.seed, **scale)
+        print(f"Synthetic project generated in {time.perf_counter() - start:.1f} s: {scale}")
+
+        results = {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'commit': git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'scale': scale,
+            'seed': args.seed,
+            'actions': {},
+        }
+
+        for action in actions:
+            runs = [run_once(action, working_directory, args.trace_python_memory) for _ in range(args.runs)]
+            results['actions'][action] = summarise_runs(runs)
+            print(f"{action}: {results['actions'][action]['status']}")
+
+    previous = json.loads(args.compare.read_text()) if args.compare else None
+    if previous and previous.get('scale') != scale:
+        print(f"Warning, the previous results were recorded at a different scale: {previous.get('scale')}")
+
+    print_results(results, previous)
+
+    if args.json:
+        args.json.write_text(json.dumps(results, indent=4))
+        print(f"Results written to: {args.json}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+# cold_start.py
+
+"""
+Cold start benchmark for the BadgerWiFi-tools GUI.
+
+Every run launches a fresh interpreter, so module import costs are measured cold, and records:
+
+    process_s           wall clock time of the whole child process, interpreter start to exit
+    import_s            importing wx and my_frame
+    frame_shown_s       MyFrame constructed and shown, measured from the start of MyFrame.__init__
+    startup_complete_s  application state restored and background checks dispatched
+
+The median of each metric is reported.
+
+Usage, from the repository root:
+    python -m benchmarks.cold_start --runs 5 --json cold_start.json
+"""
+
+import sys
+import json
+import time
+import argparse
+import statistics
+import subprocess
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+CHILD_SCRIPT = """
+import json
+import time
+
+start = time.perf_counter()
+import wx
+from my_frame import MyFrame
+imported = time.perf_counter()
+
+app = wx.App()
+frame = MyFrame(None, 'BadgerWiFi-tools')
+
+
+def report():
+    # Queued behind MyFrame.complete_startup, so startup has finished when this runs
+    timings = frame.startup_timings
+    print(json.dumps({
+        'import_s': imported - start,
+        'frame_shown_s': timings['frame_shown'] - timings['init_start'],
+        'startup_complete_s': timings['startup_complete'] - timings['init_start'],
+    }))
+    frame.background_executor.shutdown(wait=False, cancel_futures=True)
+    frame.Destroy()
+
+
+wx.CallAfter(report)
+app.MainLoop()
+"""
+
+
+def run_once():
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, '-c', CHILD_SCRIPT], cwd=REPO_ROOT, capture_output=True, text=True)
+    process_s = time.perf_counter() - start
+
+    if result.returncode != 0:
+        raise RuntimeError(f"Cold start run failed:\n{result.stderr}")
+
+    # The GUI may print to stdout, the timings are the last line
+    timings = json.loads(result.stdout.strip().splitlines()[-1])
+    timings['process_s'] = process_s
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure GUI cold start time')
+    parser.add_argument('--runs', type=int, default=5, help='number of fresh interpreter launches')
+    parser.add_argument('--json', type=Path, help='write the individual runs and medians to this file')
+    args = parser.parse_args()
+
+    runs = []
+    for run in range(args.runs):
+        timings = run_once()
+        runs.append(timings)
+        print(f"Run {run + 1}: " + ', '.join(f"{key} {value:.3f}" for key, value in sorted(timings.items())))
+
+    medians = {key: statistics.median(run[key] for run in runs) for key in runs[0]}
+    print('Median: ' + ', '.join(f"{key} {value:.3f}" for key, value in sorted(medians.items())))
+
+    if args.json:
+        args.json.write_text(json.dumps({'runs': runs, 'median': medians}, indent=4))
+
+
+if __name__ == '__main__':
+    main()
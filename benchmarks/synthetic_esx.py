@@ -0,0 +1,285 @@
+# synthetic_esx.py
+
+"""
+Synthetic Ekahau project generator for benchmarking.
+
+Writes an unpacked project directory, and the zipped .esx, containing every JSON file
+and image the actions read, at a configurable scale:
+
+    floors              number of floor plans
+    aps_per_floor       simulated APs per floor, each with 2.4 / 5 / 6 GHz radios
+    image_size          floor plan width and height in pixels
+    measured_radios     measured BSSIDs per AP and band, 0 for a design only project
+    notes_per_floor     AP and map notes per floor, each note carries photos_per_note photos
+    photo_size          longest edge of the synthetic JPEG photos
+
+Output is fully determined by the seed, so runs on different commits use identical inputs.
+
+Usage, from the repository root:
+    python -m benchmarks.synthetic_esx --floors 4 --aps-per-floor 150 --output /tmp/bench
+"""
+
+import json
+import base64
+import random
+import shutil
+import argparse
+from pathlib import Path
+
+from PIL import Image, ImageDraw
+
+AP_COLOURS = ('#00FF00', '#FFE600', '#FF8500', '#FF0000', '#FF00FF', '#0068FF', '#00FFCE')
+AP_MODELS = ('AP-515', 'AP-535', 'AP-635', 'AP-575 +ANT-3x3-5314')
+MOUNTINGS = ('CEILING', 'WALL')
+TILT_ANGLES = (0, 0, 0, -10, -20, -45)
+SECURITY = ('WPA2-Enterprise', 'WPA3-Personal', 'Open')
+TECHNOLOGIES = ('802.11ax', '802.11ac', '802.11n')
+
+# Centre frequencies of the measured radios for each band
+BAND_FREQUENCIES = {
+    'two': (2412, 2437, 2462),
+    'five': (5180, 5260, 5500, 5745),
+    'six': (5955, 6035, 6115),
+}
+
+DEFAULT_SCALE = {
+    'floors': 3,
+    'aps_per_floor': 100,
+    'image_size': 4000,
+    'measured_radios': 2,
+    'notes_per_floor': 20,
+    'photos_per_note': 1,
+    'photo_size': 1600,
+}
+
+
+def object_id(rng):
+    """Ekahau style random UUID, drawn from the seeded generator so the output is reproducible."""
+    return '%08x-%04x-%04x-%04x-%012x' % (rng.getrandbits(32), rng.getrandbits(16), rng.getrandbits(16), rng.getrandbits(16), rng.getrandbits(48))
+
+
+def write_json(project_dir, filename, data):
+    with open(project_dir / filename, 'w', encoding='utf-8') as f:
+        json.dump(data, f)
+
+
+def floor_plan_image(size, rng):
+    """A white plan with walls, rooms and corridors, compresses like a real floor plan rather than noise."""
+    image = Image.new('RGB', (size, size), 'white')
+    draw = ImageDraw.Draw(image)
+    room = max(size // 20, 10)
+    wall = max(size // 1000, 1)
+
+    for offset in range(0, size, room):
+        draw.line((offset, 0, offset, size), fill='black', width=wall)
+        draw.line((0, offset, size, offset), fill='black', width=wall)
+
+    # Doors and furniture blocks break up the regular grid
+    for _ in range((size // room) ** 2 // 4):
+        x, y = rng.randrange(size), rng.randrange(size)
+        draw.rectangle((x, y, x + room // 3, y + room // 5), fill=(rng.randrange(160, 255),) * 3)
+
+    return image
+
+
+def photo_image(size, rng):
+    """A photo-like JPEG source, gradients plus noise blocks so the encoder does real work."""
+    width, height = size, size * 3 // 4
+    image = Image.linear_gradient('L').resize((width, height)).convert('RGB')
+    draw = ImageDraw.Draw(image)
+    for _ in range(200):
+        x, y = rng.randrange(width), rng.randrange(height)
+        draw.ellipse((x, y, x + size // 20, y + size // 20), fill=(rng.randrange(256), rng.randrange(256), rng.randrange(256)))
+    return image
+
+
+def information_elements(channel, rng):
+    """Base64 IEs with the DS Parameter Set, TPC Report and Supported Rates elements the survey exporters decode."""
+    elements = bytes([3, 1, channel % 256])
+    elements += bytes([35, 2, rng.randrange(5, 24), 0])
+    elements += bytes([1, 8, 0x8c, 0x12, 0x98, 0x24, 0xb0, 0x48, 0x60, 0x6c])
+    return base64.b64encode(elements).decode('ascii')
+
+
+def generate_project(output_dir, project_name='synthetic', seed=1, floors=3, aps_per_floor=100, image_size=4000,
+                     measured_radios=2, notes_per_floor=20, photos_per_note=1, photo_size=1600, bundle=True):
+    """
+    Write the unpacked project to output_dir / project_name and, when bundle is set, output_dir / project_name.esx.
+    Returns the path of the unpacked project directory.
+    """
+    rng = random.Random(seed)
+    output_dir = Path(output_dir)
+    project_dir = output_dir / project_name
+
+    if project_dir.exists():
+        shutil.rmtree(project_dir)
+    project_dir.mkdir(parents=True)
+
+    floor_plans = []
+    access_points = []
+    simulated_radios = []
+    measured_radios_list = []
+    access_point_measurements = []
+    notes = []
+    picture_notes = []
+
+    tag_keys = [{'id': object_id(rng), 'key': key} for key in ('Room', 'Installer', 'Switch')]
+    antenna_type_id = object_id(rng)
+
+    # Photos are reused between notes, encoding thousands of unique JPEGs would dominate generation time
+    photo_ids = []
+    if notes_per_floor and photos_per_note:
+        for _ in range(min(8, notes_per_floor * photos_per_note)):
+            photo_id = object_id(rng)
+            photo_image(photo_size, rng).save(project_dir / f'image-{photo_id}', 'JPEG', quality=90)
+            photo_ids.append(photo_id)
+
+    ap_number = 1
+
+    for floor_index in range(floors):
+        floor_id = object_id(rng)
+        image_id = object_id(rng)
+
+        # Ekahau floor units are half the bitmap resolution, exercising the scaling ratio
+        width = height = image_size / 2
+        floor_plans.append({
+            'id': floor_id,
+            'name': f'Floor {floor_index + 1:02}',
+            'imageId': image_id,
+            'width': width,
+            'height': height,
+            'cropMinX': 0.0,
+            'cropMinY': 0.0,
+            'cropMaxX': width,
+            'cropMaxY': height,
+            'metersPerUnit': 0.05,
+        })
+        floor_plan_image(image_size, rng).save(project_dir / f'image-{image_id}', 'PNG')
+
+        floor_ap_ids = []
+
+        for _ in range(aps_per_floor):
+            ap_id = object_id(rng)
+            floor_ap_ids.append(ap_id)
+
+            access_points.append({
+                'id': ap_id,
+                'name': f'AP-{ap_number:03}',
+                'color': rng.choice(AP_COLOURS),
+                'model': rng.choice(AP_MODELS),
+                'vendor': 'Aruba',
+                'location': {'floorPlanId': floor_id, 'coord': {'x': rng.uniform(20, width - 20), 'y': rng.uniform(20, height - 20)}},
+                'tags': [{'tagKeyId': tag_key['id'], 'value': f'{tag_key["key"]}-{ap_number}'} for tag_key in tag_keys],
+                'noteIds': [],
+                'mine': True,
+                'hidden': False,
+                'userDefinedPosition': True,
+            })
+            ap_number += 1
+
+            mounting = rng.choice(MOUNTINGS)
+            for radio_index in range(3):
+                simulated_radios.append({
+                    'id': object_id(rng),
+                    'accessPointId': ap_id,
+                    'accessPointIndex': radio_index,
+                    'radioTechnology': 'IEEE802_11',
+                    'enabled': True,
+                    'antennaTypeId': antenna_type_id,
+                    'antennaMounting': mounting,
+                    'antennaDirection': rng.choice((0.0, 90.0, 180.0, 270.0, rng.uniform(0, 360))),
+                    'antennaTilt': rng.choice(TILT_ANGLES),
+                    'antennaHeight': rng.choice((2.4, 3.0, 4.5)),
+                })
+
+            measurement_ids = []
+            for band, frequencies in BAND_FREQUENCIES.items():
+                for bssid in range(measured_radios):
+                    measurement_id = object_id(rng)
+                    frequency = rng.choice(frequencies)
+                    channel = (frequency - 2407) // 5 if band == 'two' else (frequency - 5000) // 5
+                    access_point_measurements.append({
+                        'id': measurement_id,
+                        'mac': ':'.join(f'{rng.randrange(256):02x}' for _ in range(6)),
+                        'ssid': f'SSID-{bssid + 1}',
+                        'security': rng.choice(SECURITY),
+                        'technologies': rng.choice(TECHNOLOGIES),
+                        'channelByCenterFrequencyDefinedNarrowChannels': [frequency] if band == 'two' else [frequency, frequency + 20],
+                        'informationElements': information_elements(channel, rng),
+                    })
+                    measurement_ids.append(measurement_id)
+
+            if measurement_ids:
+                measured_radios_list.append({'id': object_id(rng), 'accessPointId': ap_id, 'accessPointMeasurementIds': measurement_ids})
+
+        # Half the notes are attached to APs, the others are placed on the map as picture notes
+        for note_index in range(notes_per_floor):
+            note_id = object_id(rng)
+            notes.append({
+                'id': note_id,
+                'text': f'Synthetic note {note_index + 1} on floor {floor_index + 1}',
+                'imageIds': [rng.choice(photo_ids) for _ in range(photos_per_note)] if photo_ids else [],
+                'history': {'createdAt': '2024-01-01T09:00:00.000Z', 'createdBy': 'benchmark'},
+                'status': 'OPEN',
+            })
+
+            if note_index % 2 == 0 and floor_ap_ids:
+                ap = access_points[len(access_points) - len(floor_ap_ids) + rng.randrange(len(floor_ap_ids))]
+                ap['noteIds'].append(note_id)
+            else:
+                picture_notes.append({
+                    'id': object_id(rng),
+                    'location': {'floorPlanId': floor_id, 'coord': {'x': rng.uniform(0, width), 'y': rng.uniform(0, height)}},
+                    'noteIds': [note_id],
+                })
+
+    requirement_id = object_id(rng)
+
+    write_json(project_dir, 'floorPlans.json', {'floorPlans': floor_plans})
+    write_json(project_dir, 'accessPoints.json', {'accessPoints': access_points})
+    write_json(project_dir, 'simulatedRadios.json', {'simulatedRadios': simulated_radios})
+    write_json(project_dir, 'measuredRadios.json', {'measuredRadios': measured_radios_list})
+    write_json(project_dir, 'accessPointMeasurements.json', {'accessPointMeasurements': access_point_measurements})
+    write_json(project_dir, 'notes.json', {'notes': notes})
+    write_json(project_dir, 'pictureNotes.json', {'pictureNotes': picture_notes})
+    write_json(project_dir, 'tagKeys.json', {'tagKeys': tag_keys})
+    write_json(project_dir, 'antennaTypes.json', {'antennaTypes': [{'id': antenna_type_id, 'name': 'Integrated', 'apCoupling': 'INTERNAL_ANTENNA'}]})
+    write_json(project_dir, 'projectConfiguration.json', {'projectConfiguration': {'displayOptions': [{'key': 'view_as_mobile_device_selected', 'value': 'false'}]}})
+    write_json(project_dir, 'requirements.json', {'requirements': [{'id': requirement_id, 'requirementId': requirement_id, 'name': 'Benchmark', 'isDefault': True, 'criteria': []}]})
+    write_json(project_dir, 'areas.json', {'areas': [{'id': object_id(rng), 'name': floor['name'], 'floorPlanId': floor['id'], 'requirementID': requirement_id} for floor in floor_plans]})
+
+    if bundle:
+        archive = shutil.make_archive(str(output_dir / project_name), 'zip', str(project_dir))
+        shutil.move(archive, output_dir / f'{project_name}.esx')
+
+    return project_dir
+
+
+def add_scale_arguments(parser):
+    parser.add_argument('--floors', type=int, default=DEFAULT_SCALE['floors'])
+    parser.add_argument('--aps-per-floor', type=int, default=DEFAULT_SCALE['aps_per_floor'])
+    parser.add_argument('--image-size', type=int, default=DEFAULT_SCALE['image_size'], help='floor plan width and height in pixels')
+    parser.add_argument('--measured-radios', type=int, default=DEFAULT_SCALE['measured_radios'], help='measured BSSIDs per AP and band')
+    parser.add_argument('--notes-per-floor', type=int, default=DEFAULT_SCALE['notes_per_floor'])
+    parser.add_argument('--photos-per-note', type=int, default=DEFAULT_SCALE['photos_per_note'])
+    parser.add_argument('--photo-size', type=int, default=DEFAULT_SCALE['photo_size'], help='longest edge of each photo in pixels')
+    parser.add_argument('--seed', type=int, default=1)
+
+
+def scale_from_arguments(args):
+    return {key: getattr(args, key) for key in DEFAULT_SCALE}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate a synthetic Ekahau project')
+    add_scale_arguments(parser)
+    parser.add_argument('--name', default='synthetic', help='project name')
+    parser.add_argument('--output', type=Path, required=True, help='directory for the unpacked project and .esx file')
+    args = parser.parse_args()
+
+    project_dir = generate_project(args.output, args.name, args.seed, **scale_from_arguments(args))
+    print(f"Synthetic project written to: {project_dir} and {project_dir}.esx")
+
+
+if __name__ == '__main__':
+    main()
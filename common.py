@@ -5,13 +5,19 @@ import os
 import wx
 import json
 import shutil
-import importlib.util
 import base64
 import math
-import requests
+import threading
+import zipfile
+import struct
+import zlib
 
 from pathlib import Path
 from datetime import datetime
+from contextlib import contextmanager
+from collections import OrderedDict
+
+from instrumentation import span, timed, count
 
 
 # Constants
@@ -43,6 +49,9 @@ ADMIN_ACTIONS_DIR = 'admin/actions'
 DIR_STRUCTURE_PROFILES_DIR = 'admin/dir_structure_profiles'
 OVERSIZE_MAP_LIMIT = 8000
 
+# Upper bound for the decoded floor images held by shared_project_data(), least recently used images are released first
+SHARED_DATA_CACHE_BYTES = 1024 * 1024 * 1024
+
 REPO_BASE_URL = "https://api.github.com/repos/nickjvturner/badgerwifi-tools"
 
 WHIMSY_WELCOME_MESSAGES = [
@@ -203,30 +212,6 @@ antenna_band_references = (' BLE', ' 2.4GHz', ' 5GHz', ' 6GHz')
 example_project_profile_names = ['example 1', 'example 2']
 
 
-def tracked_project_profile_check_for_update(project_profile_module, message_callback):
-    try:
-        # Fetch the latest version from the lookup URL
-        response = requests.get(project_profile_module.tracked_project_profile_version_url, timeout=10)
-        response.raise_for_status()
-        latest_data = response.json()
-
-        if project_profile_module.project_profile_id not in latest_data:
-            raise KeyError(f"Lookup ID {project_profile_module.project_profile_id} not found in the lookup data from {url}.")
-
-        latest_version = latest_data[project_profile_module.project_profile_id]["version"]
-
-        # Compare versions
-        if project_profile_module.project_profile_version < latest_version:
-            message = f"Update available for {project_profile_module.project_profile_name}: {project_profile_module.project_profile_version} -> {latest_version}"
-            wx.CallAfter(message_callback, HASH_BAR)
-            wx.CallAfter(message_callback, message)
-            wx.CallAfter(message_callback, project_profile_module.project_profile_update_acquisition_message)
-
-    except (requests.RequestException, json.JSONDecodeError, KeyError) as e:
-        error_message = f"Error checking for updates: {e}"
-        wx.CallAfter(message_callback, error_message)
-
-
 def sanitize_string(input_string, message_callback):
     """
     Check for control characters in a string and clean them if found.
@@ -239,6 +224,14 @@ def sanitize_string(input_string, message_callback):
     return sanitized
 
 
+def sanitize_filename(input_string, message_callback):
+    """
+    Make a name safe to use as a file name, control characters are removed,
+    path separators and characters Windows does not allow are replaced with '_'.
+    """
+    return re.sub(r'[/\\:*?"<>|]', '_', sanitize_string(input_string, message_callback))
+
+
 def meters_to_feet_inches(meters):
     # 1 meter = 3.28084 feet
     total_inches = meters * 39.3701
@@ -247,11 +240,119 @@ def meters_to_feet_inches(meters):
     return f'''{feet}' {inches}" '''
 
 
+class SharedDataCache:
+    """
+    Thread safe cache of parsed project data, keyed by file path and modification time.
+    Only active inside shared_project_data(), e.g. while the deliverables pipeline runs,
+    so every stage parses each JSON file and decodes each floor image once.
+    Cached objects are shared between stages and must be treated as read only.
+
+    Entries loaded with a size_of function (decoded floor images) count towards the byte
+    budget, once it is exceeded they are released least recently used first. A released
+    image stays valid for the stages still holding it, it is only decoded again if asked for.
+    """
+
+    def __init__(self, byte_budget=SHARED_DATA_CACHE_BYTES):
+        self.lock = threading.Lock()
+        self.byte_budget = byte_budget
+        self.entries = OrderedDict()  # key: value, least recently used first
+        self.entry_bytes = {}
+        self.cached_bytes = 0
+        self.key_locks = {}
+
+    def get_or_load(self, path, loader, size_of=None):
+        stat = path.stat()
+        key = (str(path), stat.st_mtime_ns, stat.st_size)
+
+        with self.lock:
+            if key in self.entries:
+                count('shared cache hits')
+                self.entries.move_to_end(key)
+                return self.entries[key]
+            key_lock = self.key_locks.setdefault(key, threading.Lock())
+
+        # Concurrent stages asking for the same file wait for the first loader rather than loading it twice
+        with key_lock:
+            with self.lock:
+                if key in self.entries:
+                    count('shared cache hits')
+                    self.entries.move_to_end(key)
+                    return self.entries[key]
+            value = loader(path)
+            with self.lock:
+                self.entries[key] = value
+                if size_of is not None:
+                    self.entry_bytes[key] = size_of(value)
+                    self.cached_bytes += self.entry_bytes[key]
+                    self.evict(keep=key)
+                self.key_locks.pop(key, None)
+            return value
+
+    def evict(self, keep):
+        # Called with self.lock held, JSON entries are small and never evicted
+        for key in list(self.entries):
+            if self.cached_bytes <= self.byte_budget:
+                break
+            if key == keep or key not in self.entry_bytes:
+                continue
+            self.cached_bytes -= self.entry_bytes.pop(key)
+            del self.entries[key]
+            count('shared cache evictions')
+
+
+_shared_data_cache = None
+
+
+@contextmanager
+def shared_project_data():
+    """Share parsed JSON and decoded floor images between actions for the duration of the block."""
+    global _shared_data_cache
+    previous_cache = _shared_data_cache
+    _shared_data_cache = SharedDataCache()
+    try:
+        yield _shared_data_cache
+    finally:
+        _shared_data_cache = previous_cache
+
+
+def get_shared_data_cache():
+    return _shared_data_cache
+
+
+class ProjectSnapshot:
+    """
+    The project attributes the actions read from MyFrame, copied when a job is submitted.
+    A queued job keeps working on the project selected at that moment, even if the file list,
+    project profile or map settings change before it starts.
+    """
+
+    ATTRIBUTES = (
+        'working_directory', 'project_name', 'project_metadata', 'site_id', 'site_location', 'project_phase', 'project_version',
+        'project_profile_module', 'current_profile_ap_list_module', 'required_tag_keys', 'optional_tag_keys',
+        'predictive_design_coverage_requirements', 'post_deployment_survey_coverage_requirements',
+        'ap_icon_size', 'ap_name_label_size', 'zoomed_ap_crop_size', 'create_pdf_atlas', 'create_svg_overlay',
+    )
+
+    def __init__(self, frame):
+        for name in self.ATTRIBUTES:
+            setattr(self, name, getattr(frame, name, None))
+        # Thread safe, re-posts itself to the GUI thread
+        self.append_message = frame.append_message
+
+
+def read_json_file(path):
+    with span('load_json', file=path.name), open(path, encoding='utf-8') as json_file:
+        count('json files parsed')
+        return json.load(json_file)
+
+
 def load_json(project_dir: Path, filename: str, message_callback):
     """Load JSON data from a file."""
     try:
-        with open(project_dir / filename, encoding='utf-8') as json_file:
-            return json.load(json_file)
+        shared_data_cache = get_shared_data_cache()
+        if shared_data_cache is not None:
+            return shared_data_cache.get_or_load(project_dir / filename, read_json_file)
+        return read_json_file(project_dir / filename)
     except FileNotFoundError:
         # print(f'{filename} not found, the project probably does not contain this data type.')
         message_callback(f'{filename} not found, project does not contain this data type, continuing.')
@@ -266,6 +367,7 @@ def load_json(project_dir: Path, filename: str, message_callback):
         return None
 
 
+@timed()
 def create_floor_plans_dict(floor_plans_json):
     """Create a dictionary of pertinent floor plan detail."""
     return {
@@ -276,6 +378,7 @@ def create_floor_plans_dict(floor_plans_json):
     }
 
 
+@timed()
 def create_notes_dict(notes_json):
     """Create a dictionary of notes."""
     if not notes_json:
@@ -304,6 +407,7 @@ def note_text_processor(note_ids, notes_dict):
     return ''
 
 
+@timed()
 def create_tag_keys_dict(tag_keys_json):
     """Create a dictionary of tag keys."""
     # Initialize an empty dictionary
@@ -326,6 +430,7 @@ def create_tag_keys_dict(tag_keys_json):
     return tag_keys_dict
 
 
+@timed()
 def create_simulated_radios_dict(simulated_radios_json):
     simulated_radio_dict = {}  # Initialize an empty dictionary
 
@@ -341,6 +446,7 @@ def create_simulated_radios_dict(simulated_radios_json):
     return simulated_radio_dict
 
 
+@timed()
 def create_antenna_types_dict(antenna_types_json):
     antenna_types_dict = {}  # Initialize an empty dictionary
 
@@ -421,15 +527,147 @@ def save_and_move_json(data, file_path):
         json.dump(data, outfile, indent=4)
 
 
+def save_json_compact(data, file_path):
+    """
+    Save JSON without indentation.
+    json.dumps without indent runs on the C accelerated encoder, json.dump(indent=4) always uses the pure Python one.
+    """
+    with span('json write', file=Path(file_path).name):
+        json_text = json.dumps(data, separators=(',', ':'))
+        with open(file_path, 'w', encoding='utf-8') as outfile:
+            outfile.write(json_text)
+
+
 def re_bundle_project(project_dir, output_dir, output_name):
     """Re-bundle the project directory into an .esx file."""
     output_esx_path = output_dir / output_name
-    shutil.make_archive(str(output_esx_path), 'zip', str(project_dir))
+    with span('zip write', file=output_name):
+        shutil.make_archive(str(output_esx_path), 'zip', str(project_dir))
     output_zip_path = str(output_esx_path) + '.zip'
     output_esx_path = str(output_esx_path) + '.esx'
     shutil.move(output_zip_path, output_esx_path)
 
 
+def file_crc32(path):
+    crc = 0
+    with open(path, 'rb') as file:
+        for chunk in iter(lambda: file.read(1024 * 1024), b''):
+            crc = zlib.crc32(chunk, crc)
+    return crc
+
+
+def raw_copy_supported(info):
+    """Entries that copy_raw_zip_entry can copy, stored or deflated and not encrypted."""
+    return not info.flag_bits & 0x1 and info.compress_type in (zipfile.ZIP_STORED, zipfile.ZIP_DEFLATED)
+
+
+def copy_raw_zip_entry(source_zip, info, target_zip):
+    """Copy an entry's compressed data from one open ZipFile to another, without decompressing and compressing it again."""
+    # zipfile has no public API for raw copies, the local header is rewritten from the central directory entry
+    source_zip.fp.seek(info.header_offset)
+    local_header = source_zip.fp.read(zipfile.sizeFileHeader)
+    filename_length, extra_length = struct.unpack('<HH', local_header[26:30])
+    source_zip.fp.seek(info.header_offset + zipfile.sizeFileHeader + filename_length + extra_length)
+
+    entry = zipfile.ZipInfo(info.filename, info.date_time)
+    entry.compress_type = info.compress_type
+    entry.external_attr = info.external_attr
+    entry.CRC = info.CRC
+    entry.compress_size = info.compress_size
+    entry.file_size = info.file_size
+    entry.header_offset = target_zip.fp.tell()
+
+    target_zip.fp.write(entry.FileHeader())
+    remaining = info.compress_size
+    while remaining:
+        chunk = source_zip.fp.read(min(remaining, 1024 * 1024))
+        if not chunk:
+            raise zipfile.BadZipFile(f"Truncated entry {info.filename}")
+        target_zip.fp.write(chunk)
+        remaining -= len(chunk)
+
+    target_zip.filelist.append(entry)
+    target_zip.NameToInfo[entry.filename] = entry
+    target_zip.start_dir = target_zip.fp.tell()
+
+
+def re_bundle_project_incremental(project_dir, output_dir, output_name, base_bundles=()):
+    """
+    Re-bundle the project directory into an .esx file, like re_bundle_project, but files that are unchanged
+    in one of the base bundles (same name, size and CRC-32) are copied from it still compressed.
+    After renaming APs only accessPoints.json has to be compressed, not the floor plan images.
+    Returns the number of files that were compressed.
+    """
+    project_dir = Path(project_dir)
+    output_esx_path = Path(output_dir) / f'{output_name}{ESX_EXTENSION}'
+    temporary_path = output_esx_path.with_name(output_esx_path.name + '.tmp')
+
+    base_zips = []
+    base_entries = {}  # Archive name: (ZipFile, ZipInfo), the first base bundle containing it wins
+    try:
+        for base_bundle in base_bundles:
+            try:
+                base_zip = zipfile.ZipFile(base_bundle)
+            except (OSError, zipfile.BadZipFile):
+                continue
+            base_zips.append(base_zip)
+            for info in base_zip.infolist():
+                if not info.is_dir() and raw_copy_supported(info):
+                    base_entries.setdefault(info.filename, (base_zip, info))
+
+        compressed_files = 0
+        with span('zip write', file=output_esx_path.name), zipfile.ZipFile(temporary_path, 'w', zipfile.ZIP_DEFLATED) as output_zip:
+            for path in sorted(project_dir.rglob('*')):
+                if not path.is_file():
+                    continue
+                arcname = path.relative_to(project_dir).as_posix()
+                base_zip, info = base_entries.get(arcname, (None, None))
+
+                if info is not None and info.file_size == path.stat().st_size and info.CRC == file_crc32(path):
+                    copy_raw_zip_entry(base_zip, info, output_zip)
+                    count('zip entries reused')
+                else:
+                    output_zip.write(path, arcname)
+                    compressed_files += 1
+
+        os.replace(temporary_path, output_esx_path)
+        return compressed_files
+    finally:
+        for base_zip in base_zips:
+            base_zip.close()
+        if temporary_path.exists():
+            temporary_path.unlink()
+
+
+def re_bundle_esx_with_replaced_files(esx_path, output_dir, output_name, replaced_files):
+    """
+    Write a copy of an .esx file with some of its files replaced, replaced_files maps the name within the bundle to the new bytes.
+    Every other entry is copied still compressed, the project does not have to be unpacked.
+    """
+    output_esx_path = Path(output_dir) / f'{output_name}{ESX_EXTENSION}'
+    temporary_path = output_esx_path.with_name(output_esx_path.name + '.tmp')
+
+    try:
+        with span('zip write', file=output_esx_path.name), zipfile.ZipFile(esx_path) as source_zip, zipfile.ZipFile(temporary_path, 'w', zipfile.ZIP_DEFLATED) as output_zip:
+            for info in source_zip.infolist():
+                if info.filename in replaced_files:
+                    output_zip.writestr(info.filename, replaced_files[info.filename])
+                elif raw_copy_supported(info):
+                    copy_raw_zip_entry(source_zip, info, output_zip)
+                else:
+                    output_zip.writestr(info, source_zip.read(info))
+
+            # Files that are new to the bundle
+            for filename in sorted(replaced_files.keys() - set(source_zip.namelist())):
+                output_zip.writestr(filename, replaced_files[filename])
+
+        os.replace(temporary_path, output_esx_path)
+    finally:
+        if temporary_path.exists():
+            temporary_path.unlink()
+
+
+@timed()
 def create_custom_ap_dict(access_points_json, floor_plans_dict, simulated_radio_dict):
     custom_ap_dict = {}
     name_count = {}
@@ -465,10 +703,15 @@ def create_custom_ap_dict(access_points_json, floor_plans_dict, simulated_radio_
     return custom_ap_dict
 
 
+def ap_name_for_sequence_number(ap_sequence_number):
+    """The AP naming scheme."""
+    return f'AP-{ap_sequence_number:03}'
+
+
 def rename_aps(sorted_ap_list, message_callback, floor_plans_dict, ap_sequence_number):
     for ap in sorted_ap_list:
         # Define new AP naming scheme
-        new_ap_name = f'AP-{ap_sequence_number:03}'
+        new_ap_name = ap_name_for_sequence_number(ap_sequence_number)
 
         wx.CallAfter(message_callback, f"{ap['name']} ][ {model_antenna_split(ap['model'])[0]} from: {floor_plans_dict.get(ap['location']['floorPlanId']).get('name')} ][ renamed: {new_ap_name}")
 
@@ -482,19 +725,7 @@ def rename_process_completion_message(message_callback, output_project_name):
     wx.CallAfter(message_callback, f"{nl}Modified accessPoints.json re-bundled into {output_project_name}.esx{nl}File saved within the 'OUTPUT' directory{nl}{nl}### PROCESS COMPLETE ###")
 
 
-def discover_available_scripts(directory, ignore_files=("_", "common")):
-    """
-    General-purpose function to discover available Python script files in a specified directory.
-    Excludes files starting with underscores or 'common'.
-    """
-    script_dir = Path(__file__).resolve().parent / directory
-    available_scripts = []
-    for filename in os.listdir(script_dir):
-        if filename.endswith(".py") and not filename.startswith(ignore_files):
-            available_scripts.append(filename[:-3])
-    return sorted(available_scripts)
-
-
+@timed()
 def create_access_point_measurements_dict(access_point_measurements_json):
     access_point_measurements_dict = {}  # Initialize an empty dictionary
 
@@ -510,6 +741,7 @@ def create_access_point_measurements_dict(access_point_measurements_json):
     return access_point_measurements_dict
 
 
+@timed()
 def create_measured_radios_dict(measured_radios_json, access_point_measurements_dict):
     measured_radios_dict = {}  # Initialize an empty dictionary
 
@@ -548,13 +780,6 @@ def create_measured_radios_dict(measured_radios_json, access_point_measurements_
     return measured_radios_dict
 
 
-def import_module_from_path(module_name, path_to_module):
-    spec = importlib.util.spec_from_file_location(module_name, path_to_module)
-    module = importlib.util.module_from_spec(spec)
-    spec.loader.exec_module(module)
-    return module
-
-
 def get_ssid_and_mac(measured_radios):
     # Extract MAC addresses and SSIDs from the dictionary
     access_points = []
@@ -908,6 +1133,7 @@ def flatten_picture_notes_hierarchical(picture_notes_json, notes_dict, floor_pla
     return flattened
 
 
+@timed()
 def adjust_column_widths(df, writer, sheet_name, right_align_cols=(), narrow_fixed_width_cols=(), wide_fixed_width_cols=()):
     """Adjust column widths and apply text wrap to the 'Notes' column."""
     worksheet = writer.sheets[sheet_name]
@@ -943,6 +1169,7 @@ def adjust_column_widths(df, writer, sheet_name, right_align_cols=(), narrow_fix
             worksheet.set_column(idx, idx, column_len, left_align)
 
 
+@timed()
 def format_headers(df, writer, sheet_name, freeze_row=True, freeze_col=True):
     """Format header row in the specified Excel sheet."""
     worksheet = writer.sheets[sheet_name]
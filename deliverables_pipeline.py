@@ -0,0 +1,215 @@
+# deliverables_pipeline.py
+
+"""
+'Run all deliverables' pipeline.
+
+The handover deliverables are existing actions, declared below as stages with their
+dependencies. The stages to run come from the project profile 'deliverables_pipeline'
+attribute (DEFAULT_DELIVERABLES when absent), any stage they depend on is added automatically.
+The project is already unpacked (MyFrame.basic_checks) when the pipeline is queued.
+
+Stages run as soon as their dependencies have completed, up to MAX_PARALLEL_STAGES at a time,
+so the AP list and validation run alongside map rendering. Stages that write the same
+OUTPUT/blank floor plans share an exclusive group and never run at the same time.
+Parsed JSON and decoded floor images are shared between stages via common.shared_project_data().
+A per-stage timing table is written to the log when the pipeline finishes.
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from common import nl
+from common import HASH_BAR
+from common import shared_project_data
+
+from job_manager import FLOOR_PLAN_OUTPUT
+from instrumentation import in_current_run
+
+# Maximum number of stages running at the same time
+MAX_PARALLEL_STAGES = 3
+
+DEFAULT_DELIVERABLES = ('validate', 'ap_list', 'blank_maps', 'ap_location_maps', 'zoomed_maps', 'pds_maps', 'pds_project')
+
+COMPLETE = 'complete'
+FAILED = 'failed'
+SKIPPED = 'skipped'
+CANCELLED = 'cancelled'
+
+
+class StageSkipped(Exception):
+    """Raised by a stage that cannot run for this project, the stage is reported as skipped rather than failed."""
+
+
+def run_validate(frame, cancel_token):
+    from esx_actions.validate_esx import validate_esx
+    validate_esx(frame, frame.append_message, cancel_token)
+
+
+def run_ap_list(frame, cancel_token):
+    if not hasattr(getattr(frame, 'current_profile_ap_list_module', None), 'create_custom_ap_list'):
+        frame.append_message("Currently selected project profile has no AP list export definition, skipping.")
+        return
+    from esx_actions.ap_list_creator import create_ap_list
+    create_ap_list(frame, cancel_token)
+
+
+def run_blank_maps(frame, cancel_token):
+    from map_creator.extract_blank_maps import extract_blank_maps
+    extract_blank_maps(frame.working_directory, frame.project_name, frame.append_message)
+
+
+def run_ap_location_maps(frame, cancel_token):
+    from map_creator.create_ap_location_maps import create_ap_location_maps
+    create_ap_location_maps(frame, cancel_token)
+
+
+def run_zoomed_maps(frame, cancel_token):
+    from map_creator.create_zoomed_ap_location_maps import create_zoomed_ap_location_maps
+    from map_creator.map_encoding import get_map_encoding_options
+    create_zoomed_ap_location_maps(frame.working_directory, frame.project_name, frame.append_message, frame.zoomed_ap_crop_size,
+                                   frame.ap_icon_size, frame.ap_name_label_size, cancel_token,
+                                   encoding_options=get_map_encoding_options(getattr(frame, 'project_profile_module', None)))
+
+
+def run_pds_maps(frame, cancel_token):
+    from map_creator.create_pds_maps import create_pds_maps
+    from map_creator.map_encoding import get_map_encoding_options
+    create_pds_maps(frame.working_directory, frame.project_name, frame.append_message, frame.ap_icon_size, frame.ap_name_label_size, cancel_token,
+                    encoding_options=get_map_encoding_options(getattr(frame, 'project_profile_module', None)))
+
+
+def run_pds_project(frame, cancel_token):
+    if not getattr(getattr(frame, 'project_profile_module', None), 'post_deployment_survey_coverage_requirements', None):
+        raise StageSkipped("the project profile defines no post_deployment_survey_coverage_requirements")
+    from survey.pds_project_creator import create_pds_project_esx
+    create_pds_project_esx(frame, frame.append_message)
+
+
+# name: (label, function, dependencies, exclusive group)
+STAGES = {
+    'validate': ('Validate', run_validate, (), None),
+    'ap_list': ('AP List', run_ap_list, (), None),
+    'blank_maps': ('Blank Maps', run_blank_maps, (), FLOOR_PLAN_OUTPUT),
+    'ap_location_maps': ('AP Location Maps', run_ap_location_maps, (), FLOOR_PLAN_OUTPUT),
+    'zoomed_maps': ('Zoomed AP Maps', run_zoomed_maps, (), FLOOR_PLAN_OUTPUT),
+    'pds_maps': ('PDS Maps', run_pds_maps, (), FLOOR_PLAN_OUTPUT),
+    'pds_project': ('PDS Project', run_pds_project, ('pds_maps',), None),
+}
+
+
+def resolve_stages(requested_stages, message_callback):
+    """Return the requested stages plus everything they depend on, in dependency order."""
+    ordered = []
+
+    def visit(stage_name, chain=()):
+        if stage_name not in STAGES:
+            raise ValueError(f"Unknown deliverables pipeline stage: {stage_name}, available stages: {', '.join(STAGES)}")
+        if stage_name in chain:
+            raise ValueError(f"Circular dependency in deliverables pipeline: {' -> '.join(chain + (stage_name,))}")
+        if stage_name in ordered:
+            return
+        for dependency in STAGES[stage_name][2]:
+            visit(dependency, chain + (stage_name,))
+        ordered.append(stage_name)
+
+    for stage_name in requested_stages:
+        visit(stage_name)
+
+    added = [stage_name for stage_name in ordered if stage_name not in requested_stages]
+    if added:
+        message_callback(f"Added required pipeline stages: {', '.join(STAGES[stage_name][0] for stage_name in added)}")
+
+    return ordered
+
+
+def get_deliverables(project_profile_module):
+    return tuple(getattr(project_profile_module, 'deliverables_pipeline', DEFAULT_DELIVERABLES))
+
+
+def run_deliverables_pipeline(frame, cancel_token, progress_callback=None, max_parallel_stages=MAX_PARALLEL_STAGES):
+    message_callback = frame.append_message
+
+    stages = resolve_stages(get_deliverables(getattr(frame, 'project_profile_module', None)), message_callback)
+    message_callback(f"{HASH_BAR}Running deliverables pipeline for: {frame.project_name}{nl}"
+                     f"Stages: {', '.join(STAGES[stage_name][0] for stage_name in stages)}{HASH_BAR}")
+
+    status = {}
+    timings = {}
+    pending = list(stages)
+    running = {}
+    pipeline_start = time.perf_counter()
+
+    def report_progress(detail):
+        if progress_callback is not None:
+            progress_callback(len(status), len(stages), detail)
+
+    with shared_project_data(), ThreadPoolExecutor(max_workers=max_parallel_stages, thread_name_prefix='pipeline') as executor:
+        while pending or running:
+            if cancel_token.is_set():
+                for stage_name in pending:
+                    status[stage_name] = CANCELLED
+                pending = []
+
+            # Start every stage whose dependencies are complete and whose exclusive group is free
+            busy_groups = {STAGES[stage_name][3] for stage_name in running.values()} - {None}
+            for stage_name in list(pending):
+                label, function, dependencies, group = STAGES[stage_name]
+
+                if any(status.get(dependency) in (FAILED, SKIPPED, CANCELLED) for dependency in dependencies):
+                    status[stage_name] = SKIPPED
+                    pending.remove(stage_name)
+                    message_callback(f"{nl}Pipeline stage skipped, a dependency did not complete: {label}")
+                    continue
+
+                if len(running) >= max_parallel_stages:
+                    break
+                if not all(status.get(dependency) == COMPLETE for dependency in dependencies):
+                    continue
+                if group is not None and group in busy_groups:
+                    continue
+
+                pending.remove(stage_name)
+                timings[stage_name] = [time.perf_counter(), None]
+                running[executor.submit(in_current_run(function), frame, cancel_token)] = stage_name
+                if group is not None:
+                    busy_groups.add(group)
+                report_progress(label)
+
+            if not running:
+                continue
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                stage_name = running.pop(future)
+                timings[stage_name][1] = time.perf_counter()
+                try:
+                    future.result()
+                    status[stage_name] = CANCELLED if cancel_token.is_set() else COMPLETE
+                except StageSkipped as e:
+                    status[stage_name] = SKIPPED
+                    message_callback(f"{nl}Pipeline stage skipped, {e}: {STAGES[stage_name][0]}")
+                except Exception as e:
+                    status[stage_name] = FAILED
+                    message_callback(f"{nl}Pipeline stage failed: {STAGES[stage_name][0]}: {e}")
+                report_progress(STAGES[stage_name][0])
+
+    pipeline_elapsed = time.perf_counter() - pipeline_start
+    message_callback(format_timing_summary(stages, status, timings, pipeline_elapsed))
+
+
+def format_timing_summary(stages, status, timings, pipeline_elapsed):
+    lines = [f"{HASH_BAR}Deliverables pipeline summary{nl}"]
+    stage_total = 0.0
+
+    for stage_name in stages:
+        label = STAGES[stage_name][0]
+        if stage_name in timings and timings[stage_name][1] is not None:
+            start, end = timings[stage_name]
+            stage_total += end - start
+            lines.append(f"{label:<20} {status.get(stage_name, ''):<10} {end - start:8.2f} s")
+        else:
+            lines.append(f"{label:<20} {status.get(stage_name, ''):<10} {'-':>8}")
+
+    lines.append(f"{nl}Sum of stage times:  {stage_total:.2f} s")
+    lines.append(f"Pipeline wall time:  {pipeline_elapsed:.2f} s")
+    return nl.join(lines) + HASH_BAR
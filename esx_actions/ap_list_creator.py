@@ -10,11 +10,14 @@ from common import create_notes_dict
 from common import create_antenna_types_dict
 from common import flatten_picture_notes_hierarchical
 from common import nl
+from common import PROCESS_ABORTED
 from common import adjust_column_widths
 from common import format_headers
 
+from instrumentation import span
 
-def create_ap_list(project_object):
+
+def create_ap_list(project_object, stop_event=None):
 
     message_callback = project_object.append_message
 
@@ -36,6 +39,10 @@ def create_ap_list(project_object):
     antenna_types_dict = create_antenna_types_dict(antenna_types_json)
     notes_dict = create_notes_dict(notes_json)
 
+    if stop_event is not None and stop_event.is_set():
+        message_callback(PROCESS_ABORTED)
+        return
+
     custom_ap_list = project_object.current_profile_ap_list_module.create_custom_ap_list(access_points_json, floor_plans_dict, tag_keys_dict, simulated_radio_dict, antenna_types_dict, notes_dict)
 
     # Create a pandas dataframe and export to Excel
@@ -50,6 +57,9 @@ def create_ap_list(project_object):
         map_notes = flatten_picture_notes_hierarchical(picture_notes_json, notes_dict, floor_plans_dict)
         map_note_df = pd.DataFrame(map_notes)
 
+    if stop_event is not None and stop_event.is_set():
+        message_callback(PROCESS_ABORTED)
+        return
 
     if project_object.project_version is not None:
         # Construct the new filename format
@@ -60,7 +70,7 @@ def create_ap_list(project_object):
         output_filename = f'{project_object.project_name} - AP List.xlsx'
 
     try:
-        with pd.ExcelWriter(Path(project_object.working_directory / output_filename), engine='xlsxwriter') as writer:
+        with span('xlsx write', file=output_filename), pd.ExcelWriter(Path(project_object.working_directory / output_filename), engine='xlsxwriter') as writer:
             sheet_name = 'AP List'
             ap_df.to_excel(writer, sheet_name=sheet_name, index=False)
             adjust_column_widths(ap_df, writer, sheet_name)
@@ -1,27 +1,309 @@
 # backup_esx.py
 
-import shutil
+"""
+Content-addressed backups of .esx files.
+
+An .esx file is a zip archive, and most of its members (floor plan images
+etc.) are unchanged from one save to the next. Each backup splits the file
+into the compressed data of its members and the zip structure around them
+(local headers, central directory). Member data is stored once per distinct
+content, by SHA-256, and each backup is recorded as a small manifest listing
+the byte ranges that make up the file:
+
+    <project>_BACKUP/
+        objects/3f/3fa4...      member data, stored once
+        manifests/<project>_backup_2024-05-01__10-30-00.json
+
+Unchanged members are hashed but not copied, so a backup only writes what
+changed since any earlier backup. A restore concatenates the byte ranges and
+checks the SHA-256 of the whole file, the restored .esx is byte-for-byte the
+file that was backed up.
+
+Old manifests are pruned after each backup (see prune_backups), objects no
+longer referenced by any manifest are deleted with them.
+"""
+
+import os
+import json
+import time
+import struct
+import hashlib
+import zipfile
 from pathlib import Path
-from datetime import datetime
+from datetime import datetime, timedelta
 
+from common import nl
+from common import ERROR
 
-def backup_esx(working_directory, esx_project_name, esx_filepath, message_callback):
+from instrumentation import span, count
+
+MANIFEST_FORMAT = 1
+
+# Member data smaller than this is kept with the zip structure rather than in its own object file
+MIN_OBJECT_SIZE = 64 * 1024
+
+READ_CHUNK_SIZE = 1024 * 1024
+
+# Pruning policy, the newest backups are always kept, plus the newest backup of each day for a number of days
+KEEP_LATEST_BACKUPS = 10
+KEEP_DAILY_BACKUPS_DAYS = 30
+
+BACKUP_TIME_FORMAT = "%Y-%m-%d__%H-%M-%S"
+
+
+def backup_folder_for(working_directory, esx_project_name):
+    return Path(working_directory) / f"{esx_project_name}_BACKUP"
+
+
+def object_path(backup_folder, object_hash):
+    return backup_folder / 'objects' / object_hash[:2] / object_hash
+
+
+def zip_member_data_ranges(esx_filepath):
+    """(start, end) of each member's compressed data within the file, sorted. Empty if the file is not a readable zip."""
+    try:
+        with zipfile.ZipFile(esx_filepath) as esx_zip:
+            ranges = []
+            for info in esx_zip.infolist():
+                esx_zip.fp.seek(info.header_offset)
+                local_header = esx_zip.fp.read(zipfile.sizeFileHeader)
+                filename_length, extra_length = struct.unpack('<HH', local_header[26:30])
+                data_start = info.header_offset + zipfile.sizeFileHeader + filename_length + extra_length
+                ranges.append((data_start, data_start + info.compress_size))
+            return sorted(ranges)
+    except (OSError, zipfile.BadZipFile, struct.error):
+        return []
+
+
+def split_into_segments(file_size, data_ranges):
     """
-    Create a backup of .esx file in a new directory date and time stamped
+    Cover the file with (start, end, is_object) segments. Member data of at least MIN_OBJECT_SIZE becomes an object,
+    everything else (headers, central directory, small members) belongs to the backup's structure object.
     """
+    segments = []
+    position = 0
+    for start, end in data_ranges:
+        if end - start < MIN_OBJECT_SIZE or start < position or end > file_size:
+            continue
+        if start > position:
+            segments.append((position, start, False))
+        segments.append((start, end, True))
+        position = end
+    if position < file_size or not segments:
+        segments.append((position, file_size, False))
+    return segments
+
+
+def read_range(file, start, end):
+    file.seek(start)
+    remaining = end - start
+    while remaining:
+        chunk = file.read(min(remaining, READ_CHUNK_SIZE))
+        if not chunk:
+            raise OSError(f"Unexpected end of file at {end - remaining}")
+        yield chunk
+        remaining -= len(chunk)
+
+
+def store_object(backup_folder, object_hash, chunks):
+    """Write an object unless it is already stored, returns the number of bytes written."""
+    path = object_path(backup_folder, object_hash)
+    if path.exists():
+        # Mark the object as in use, prune_backups leaves objects touched after it started alone
+        os.utime(path)
+        count('backup objects reused')
+        return 0
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temporary_path = path.with_name(path.name + '.tmp')
+    written = 0
+    with open(temporary_path, 'wb') as object_file:
+        for chunk in chunks:
+            object_file.write(chunk)
+            written += len(chunk)
+    os.replace(temporary_path, path)
+    return written
+
+
+def load_manifests(backup_folder):
+    """[(manifest path, manifest)] of every backup in the folder, oldest first."""
+    manifests = []
+    for path in sorted((backup_folder / 'manifests').glob('*.json')):
+        try:
+            with open(path, 'r') as f:
+                manifests.append((path, json.load(f)))
+        except (OSError, json.JSONDecodeError):
+            continue
+    manifests.sort(key=lambda item: item[1].get('created', ''))
+    return manifests
+
+
+def latest_manifest_for(manifests, esx_filepath, stat):
+    """The newest manifest of this file with the same name, size and modification time, i.e. the file has not been saved since."""
+    for _, manifest in reversed(manifests):
+        if manifest['source'] == esx_filepath.name and manifest['size'] == stat.st_size and manifest['mtime_ns'] == stat.st_mtime_ns:
+            return manifest
+    return None
+
+
+def create_backup_manifest(esx_filepath, backup_folder):
+    """Store the file's segments and return (manifest, bytes written)."""
+    stat = esx_filepath.stat()
+    manifests = load_manifests(backup_folder)
+
+    previous = latest_manifest_for(manifests, esx_filepath, stat)
+    if previous is not None and all(object_path(backup_folder, object_hash).exists() for object_hash, _, _ in previous['parts']):
+        # Unchanged since the last backup, nothing has to be read
+        return {**previous, 'created': datetime.now().isoformat(timespec='seconds')}, 0
 
-    # Create a backup folder if it doesn't exist
-    backup_folder = working_directory / f"{esx_project_name}_BACKUP"
-    backup_folder.mkdir(parents=True, exist_ok=True)
+    file_hash = hashlib.sha256()
+    structure = bytearray()
+    parts = []
+    written = 0
 
-    # Generate a unique name for the backup .esx file with timestamp
-    current_time = datetime.now().strftime("%Y-%m-%d__%H-%M-%S")
-    backup_esx_filename = Path(f"{esx_filepath.stem}_backup_{current_time}.esx").name
-    backup_esx_path = backup_folder / backup_esx_filename
+    with span('backup hash', file=esx_filepath.name), open(esx_filepath, 'rb') as esx_file:
+        for start, end, is_object in split_into_segments(stat.st_size, zip_member_data_ranges(esx_filepath)):
+            if not is_object:
+                for chunk in read_range(esx_file, start, end):
+                    file_hash.update(chunk)
+                    structure += chunk
+                # The structure object's hash is filled in once all of it has been read
+                parts.append([None, len(structure) - (end - start), end - start])
+                continue
+
+            segment_hash = hashlib.sha256()
+            for chunk in read_range(esx_file, start, end):
+                file_hash.update(chunk)
+                segment_hash.update(chunk)
+            object_hash = segment_hash.hexdigest()
+
+            # Only data not stored by an earlier backup is read a second time and copied
+            written += store_object(backup_folder, object_hash, read_range(esx_file, start, end))
+            parts.append([object_hash, 0, end - start])
+
+    structure_hash = hashlib.sha256(structure).hexdigest()
+    written += store_object(backup_folder, structure_hash, [bytes(structure)])
+    for part in parts:
+        if part[0] is None:
+            part[0] = structure_hash
+
+    manifest = {
+        'format': MANIFEST_FORMAT,
+        'source': esx_filepath.name,
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns,
+        'sha256': file_hash.hexdigest(),
+        'parts': parts,
+    }
+    return manifest, written
+
+
+def prune_backups(backup_folder, keep_latest=KEEP_LATEST_BACKUPS, keep_daily_days=KEEP_DAILY_BACKUPS_DAYS):
+    """
+    Delete the manifests outside the pruning policy, then the objects no longer referenced by any manifest.
+    Objects still being written (.tmp) or stored after the prune started belong to a backup whose manifest
+    may not have been written yet, they are never deleted.
+    Returns (manifests removed, object bytes freed).
+    """
+    prune_start = time.time()
+    manifests = load_manifests(backup_folder)
+    keep = {path for path, _ in manifests[-keep_latest:]} if keep_latest else set()
+
+    # The newest backup of each day, for the last keep_daily_days days
+    oldest_day_kept = (datetime.now() - timedelta(days=keep_daily_days)).date().isoformat()
+    newest_of_day = {}
+    for path, manifest in manifests:
+        day = manifest.get('created', '')[:10]
+        if day >= oldest_day_kept:
+            newest_of_day[day] = path
+    keep.update(newest_of_day.values())
+
+    removed_manifests = 0
+    referenced = set()
+    for path, manifest in manifests:
+        if path in keep:
+            referenced.update(object_hash for object_hash, _, _ in manifest['parts'])
+        else:
+            path.unlink()
+            removed_manifests += 1
+
+    freed = 0
+    if removed_manifests:
+        for path in (backup_folder / 'objects').glob('*/*'):
+            if path.name in referenced or path.suffix == '.tmp':
+                continue
+            stat = path.stat()
+            if stat.st_mtime >= prune_start:
+                continue
+            freed += stat.st_size
+            path.unlink()
+
+    return removed_manifests, freed
+
+
+def backup_esx(working_directory, esx_project_name, esx_filepath, message_callback):
+    """
+    Back up the .esx file into the project's backup store, date and time stamped
+    """
+    esx_filepath = Path(esx_filepath)
+    backup_folder = backup_folder_for(working_directory, esx_project_name)
+    (backup_folder / 'manifests').mkdir(parents=True, exist_ok=True)
+
+    current_time = datetime.now().strftime(BACKUP_TIME_FORMAT)
+    manifest_path = backup_folder / 'manifests' / f"{esx_filepath.stem}_backup_{current_time}.json"
 
     try:
-        # Copy the original .esx file to the backup folder
-        shutil.copy2(esx_filepath, backup_esx_path)
-        message_callback(f"{esx_project_name}.esx file backed up to '{backup_esx_path}'.")
+        manifest, written = create_backup_manifest(esx_filepath, backup_folder)
+        with open(manifest_path, 'w') as f:
+            json.dump(manifest, f, indent=2)
+
+        message_callback(f"{esx_project_name}.esx file backed up to '{manifest_path}'.")
+        message_callback(f"{written / 1024 / 1024:.1f} MB written for the {manifest['size'] / 1024 / 1024:.1f} MB .esx file, unchanged content is shared with earlier backups")
+
+        removed_manifests, freed = prune_backups(backup_folder)
+        if removed_manifests:
+            message_callback(f"{removed_manifests} old backups pruned, {freed / 1024 / 1024:.1f} MB freed")
     except Exception as e:
         message_callback(f"Error backing up .esx file: {e}")
+
+
+def restore_backup(manifest_path, output_path):
+    """Rebuild the backed up .esx file from a manifest, the SHA-256 of the whole file is verified before it is moved into place."""
+    manifest_path, output_path = Path(manifest_path), Path(output_path)
+    backup_folder = manifest_path.parent.parent
+    with open(manifest_path, 'r') as f:
+        manifest = json.load(f)
+
+    temporary_path = output_path.with_name(output_path.name + '.tmp')
+    file_hash = hashlib.sha256()
+    try:
+        with span('backup restore', file=output_path.name), open(temporary_path, 'wb') as output_file:
+            for object_hash, offset, length in manifest['parts']:
+                with open(object_path(backup_folder, object_hash), 'rb') as object_file:
+                    for chunk in read_range(object_file, offset, offset + length):
+                        file_hash.update(chunk)
+                        output_file.write(chunk)
+
+        if file_hash.hexdigest() != manifest['sha256']:
+            raise ValueError(f"Restored file does not match the backup of {manifest['source']}, the backup store is damaged")
+
+        os.replace(temporary_path, output_path)
+    finally:
+        if temporary_path.exists():
+            temporary_path.unlink()
+
+
+def restore_esx_backup(manifest_path, message_callback):
+    """Restore a backup next to the backup folder, never over the original .esx file."""
+    manifest_path = Path(manifest_path)
+    output_path = manifest_path.parent.parent.parent / f"{manifest_path.stem}.esx"
+    if output_path.exists():
+        message_callback(f"{ERROR}'{output_path.name}' already exists, it has not been overwritten")
+        return
+
+    try:
+        restore_backup(manifest_path, output_path)
+        message_callback(f"Backup restored to '{output_path}'{nl}")
+    except Exception as e:
+        message_callback(f"{ERROR}Error restoring backup: {e}")
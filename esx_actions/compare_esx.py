@@ -0,0 +1,445 @@
+# compare_esx.py
+
+"""
+Compare two versions of a project, e.g. 'v1.3' and 'v1.4' of a design,
+straight from their .esx files.
+
+Members whose CRC-32 and size in the zip central directory are the same in
+both files are not read at all, a section whose files are all unchanged is
+skipped. Access points, floors, areas and requirements are matched by ID,
+entities whose ID changed are matched by name when the name is unique in
+both versions.
+
+Access point changes are classified as added, removed, moved, renamed,
+radio, antenna, tag or modified (any other AP field). Changes are written to
+the log and to '<old> vs <new> - project diff.xlsx' within 'OUTPUT/PROJECT
+DIFF', optionally with one change highlight map per floor.
+"""
+
+import json
+import math
+import zipfile
+import pandas as pd
+from pathlib import Path
+from PIL import ImageDraw
+
+from common import adjust_column_widths
+from common import format_headers
+from common import nl
+from common import ERROR
+from common import PROCESS_ABORTED
+
+from map_creator.map_creator_comon import set_font
+from map_creator.map_preview import decode_floor_image_preview
+
+from instrumentation import span
+
+# APs that moved less than this are not reported as moved, in meters
+MOVE_TOLERANCE_METERS = 0.1
+
+# Changes listed individually in the log, the XLSX always has all of them
+LOG_CHANGE_LIMIT = 100
+
+OVERLAY_MAX_DIMENSION = 2400
+OVERLAY_MARKER_RADIUS = 8
+OVERLAY_FONT_SIZE = 14
+OVERLAY_COLOURS = {
+    'Added': 'green',
+    'Removed': 'red',
+    'Moved': 'orange',
+    'Modified': 'blue',
+}
+
+AP_FILES = ('accessPoints.json', 'simulatedRadios.json', 'tagKeys.json', 'antennaTypes.json')
+CATEGORIES = ('Files', 'Access Points', 'Floors', 'Areas', 'Requirements')
+
+# Fields that identify a radio rather than describe it
+RADIO_IDENTITY_FIELDS = ('id', 'accessPointId', 'accessPointIndex')
+
+
+class ProjectVersions:
+    """The old and new .esx files, JSON members are parsed on first use and only when needed."""
+
+    def __init__(self, old_esx_path, new_esx_path):
+        self.zips = (zipfile.ZipFile(old_esx_path), zipfile.ZipFile(new_esx_path))
+        self.infos = tuple({info.filename: info for info in esx_zip.infolist() if not info.is_dir()} for esx_zip in self.zips)
+        self.parsed = {}
+
+    def close(self):
+        for esx_zip in self.zips:
+            esx_zip.close()
+
+    def unchanged(self, filename):
+        """Read from the central directory only, the member data is not touched."""
+        old_info, new_info = (infos.get(filename) for infos in self.infos)
+        if old_info is None or new_info is None:
+            return old_info is new_info
+        return old_info.CRC == new_info.CRC and old_info.file_size == new_info.file_size
+
+    def file_changes(self):
+        old_infos, new_infos = self.infos
+        changes = {'Added': sorted(new_infos.keys() - old_infos.keys()), 'Removed': sorted(old_infos.keys() - new_infos.keys())}
+        changes['Modified'] = sorted(filename for filename in old_infos.keys() & new_infos.keys() if not self.unchanged(filename))
+        return changes
+
+    def load(self, filename):
+        """(old JSON, new JSON) of a member, None for a version without it."""
+        if filename not in self.parsed:
+            versions = []
+            for esx_zip, infos in zip(self.zips, self.infos):
+                if filename in infos:
+                    with span('load_json', file=filename):
+                        versions.append(json.loads(esx_zip.read(filename)))
+                else:
+                    versions.append(None)
+            self.parsed[filename] = tuple(versions)
+        return self.parsed[filename]
+
+    def entities(self, filename, key):
+        """(old list, new list) of the entities in a member, e.g. entities('areas.json', 'areas')."""
+        return tuple((version or {}).get(key, []) for version in self.load(filename))
+
+
+def match_entities(old_entities, new_entities):
+    """
+    Pair entities by ID, then entities whose ID changed by name, when the name is unique in both versions.
+    Returns (matched [(old, new)], added, removed).
+    """
+    new_by_id = {entity['id']: entity for entity in new_entities}
+    matched, unmatched_old = [], []
+    for old in old_entities:
+        new = new_by_id.pop(old['id'], None)
+        if new is None:
+            unmatched_old.append(old)
+        else:
+            matched.append((old, new))
+
+    def unique_names(entities):
+        by_name = {}
+        for entity in entities:
+            by_name.setdefault(entity.get('name'), []).append(entity)
+        return {name: found[0] for name, found in by_name.items() if name is not None and len(found) == 1}
+
+    unmatched_new_by_name = unique_names(new_by_id.values())
+    old_by_unique_name = unique_names(unmatched_old)
+    removed = []
+    for old in unmatched_old:
+        new = unmatched_new_by_name.pop(old.get('name'), None) if old_by_unique_name.get(old.get('name')) is old else None
+        if new is None:
+            removed.append(old)
+        else:
+            matched.append((old, new))
+            new_by_id.pop(new['id'])
+
+    return matched, list(new_by_id.values()), removed
+
+
+def format_value(value):
+    if value is None:
+        return ''
+    if isinstance(value, float):
+        return f'{value:g}' if value == round(value, 2) else f'{value:.2f}'
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, separators=(',', ':'))
+    return str(value)
+
+
+def changed_fields(old, new, ignore=()):
+    """[(field, old value, new value)] of the top level fields that differ."""
+    return [(field, old.get(field), new.get(field)) for field in sorted(old.keys() | new.keys())
+            if field not in ignore and old.get(field) != new.get(field)]
+
+
+def change_row(category, change, name, floor='', field='', old='', new=''):
+    return {'Category': category, 'Change': change, 'Name': name, 'Floor': floor, 'Field': field, 'Old': format_value(old), 'New': format_value(new)}
+
+
+def floors_by_id(floor_plans):
+    return {floor['id']: floor for floor in floor_plans}
+
+
+def ap_position(ap):
+    coord = ap['location'].get('coord', {})
+    return ap['location']['floorPlanId'], coord.get('x', 0), coord.get('y', 0)
+
+
+def radios_by_ap(simulated_radios):
+    radios = {}
+    for radio in simulated_radios:
+        radios.setdefault(radio['accessPointId'], {})[radio['accessPointIndex']] = radio
+    return radios
+
+
+def tags_by_key(ap, tag_keys):
+    return {tag_keys.get(tag['tagKeyId'], tag['tagKeyId']): tag.get('value') for tag in ap.get('tags', [])}
+
+
+def diff_access_points(versions, floor_id_map):
+    """
+    Change rows of the APs, and the changes to draw on the new floors: {new floor ID: [(change, new position, old position, label)]}.
+    floor_id_map maps old floor IDs to the IDs of the matched new floors.
+    """
+    old_aps, new_aps = versions.entities('accessPoints.json', 'accessPoints')
+    old_floors, new_floors = (floors_by_id(floor_plans) for floor_plans in versions.entities('floorPlans.json', 'floorPlans'))
+    old_radios, new_radios = (radios_by_ap(radios) for radios in versions.entities('simulatedRadios.json', 'simulatedRadios'))
+    old_tag_keys, new_tag_keys = ({tag_key['id']: tag_key.get('key') for tag_key in tag_keys} for tag_keys in versions.entities('tagKeys.json', 'tagKeys'))
+    antenna_names = {antenna['id']: antenna.get('name') for antenna_types in versions.entities('antennaTypes.json', 'antennaTypes') for antenna in antenna_types}
+
+    def floor_name(floors, floor_id):
+        return floors.get(floor_id, {}).get('name', '')
+
+    def radio_value(field, value):
+        return antenna_names.get(value, value) if field == 'antennaTypeId' else value
+
+    rows = []
+    overlay = {}
+    matched, added, removed = match_entities(old_aps, new_aps)
+
+    for ap in added:
+        floor_id, x, y = ap_position(ap)
+        rows.append(change_row('Access Points', 'Added', ap['name'], floor_name(new_floors, floor_id)))
+        overlay.setdefault(floor_id, []).append(('Added', (x, y), None, ap['name']))
+
+    for ap in removed:
+        floor_id, x, y = ap_position(ap)
+        rows.append(change_row('Access Points', 'Removed', ap['name'], floor_name(old_floors, floor_id)))
+        if floor_id in floor_id_map:
+            overlay.setdefault(floor_id_map[floor_id], []).append(('Removed', (x, y), None, ap['name']))
+
+    for old, new in matched:
+        ap_rows = []
+        name = new['name']
+        old_floor_id, old_x, old_y = ap_position(old)
+        new_floor_id, new_x, new_y = ap_position(new)
+        floor = floor_name(new_floors, new_floor_id)
+
+        if old['name'] != name:
+            ap_rows.append(change_row('Access Points', 'Renamed', name, floor, 'name', old['name'], name))
+
+        moved = False
+        if floor_id_map.get(old_floor_id) != new_floor_id:
+            moved = True
+            ap_rows.append(change_row('Access Points', 'Moved', name, floor, 'floor', floor_name(old_floors, old_floor_id), floor))
+        else:
+            distance = math.hypot(new_x - old_x, new_y - old_y) * new_floors.get(new_floor_id, {}).get('metersPerUnit', 1)
+            if distance >= MOVE_TOLERANCE_METERS:
+                moved = True
+                ap_rows.append(change_row('Access Points', 'Moved', name, floor, 'distance (m)', '', round(distance, 2)))
+
+        old_tags, new_tags = tags_by_key(old, old_tag_keys), tags_by_key(new, new_tag_keys)
+        for tag_key in sorted(old_tags.keys() | new_tags.keys(), key=str):
+            if old_tags.get(tag_key) != new_tags.get(tag_key):
+                ap_rows.append(change_row('Access Points', 'Tag', name, floor, tag_key, old_tags.get(tag_key), new_tags.get(tag_key)))
+
+        old_ap_radios, new_ap_radios = old_radios.get(old['id'], {}), new_radios.get(new['id'], {})
+        for index in sorted(old_ap_radios.keys() | new_ap_radios.keys()):
+            old_radio, new_radio = old_ap_radios.get(index), new_ap_radios.get(index)
+            if old_radio is None or new_radio is None:
+                ap_rows.append(change_row('Access Points', 'Radio', name, floor, f'radio {index}', 'none' if old_radio is None else 'present', 'none' if new_radio is None else 'present'))
+                continue
+            for field, old_value, new_value in changed_fields(old_radio, new_radio, RADIO_IDENTITY_FIELDS):
+                old_value, new_value = radio_value(field, old_value), radio_value(field, new_value)
+                if old_value != new_value:
+                    change = 'Antenna' if field.startswith('antenna') else 'Radio'
+                    ap_rows.append(change_row('Access Points', change, name, floor, f'radio {index} {field}', old_value, new_value))
+
+        for field, old_value, new_value in changed_fields(old, new, ('id', 'name', 'location', 'tags')):
+            ap_rows.append(change_row('Access Points', 'Modified', name, floor, field, old_value, new_value))
+
+        if ap_rows:
+            rows.extend(ap_rows)
+            same_floor = floor_id_map.get(old_floor_id) == new_floor_id
+            change = 'Moved' if moved else 'Modified'
+            overlay.setdefault(new_floor_id, []).append((change, (new_x, new_y), (old_x, old_y) if moved and same_floor else None, name))
+
+    return rows, overlay
+
+
+def diff_named_entities(category, matched, added, removed, describe_field=lambda field, value: value, floor_of=lambda entity: ''):
+    """Change rows of entities compared field by field, e.g. floors, areas and requirements."""
+    rows = [change_row(category, 'Added', entity.get('name', entity['id']), floor_of(entity)) for entity in added]
+    rows += [change_row(category, 'Removed', entity.get('name', entity['id']), floor_of(entity)) for entity in removed]
+    for old, new in matched:
+        name = new.get('name', new['id'])
+        for field, old_value, new_value in changed_fields(old, new, ('id',)):
+            change = 'Renamed' if field == 'name' else 'Modified'
+            rows.append(change_row(category, change, name, floor_of(new), field, describe_field(field, old_value), describe_field(field, new_value)))
+    return rows
+
+
+def compare_projects(old_esx_path, new_esx_path, stop_event=None):
+    """Return (change rows by category, overlay changes by new floor ID, floor plans of the new version), or None when stopped."""
+    rows = {category: [] for category in CATEGORIES}
+    versions = ProjectVersions(old_esx_path, new_esx_path)
+    try:
+        for change, filenames in versions.file_changes().items():
+            rows['Files'] += [change_row('Files', change, filename) for filename in filenames]
+
+        old_floor_plans, new_floor_plans = versions.entities('floorPlans.json', 'floorPlans')
+        matched_floors, added_floors, removed_floors = match_entities(old_floor_plans, new_floor_plans)
+        floor_id_map = {old['id']: new['id'] for old, new in matched_floors}
+        new_floors = floors_by_id(new_floor_plans)
+        all_floor_names = {floor['id']: floor['name'] for floor in old_floor_plans + new_floor_plans}
+
+        if not versions.unchanged('floorPlans.json'):
+            rows['Floors'] = diff_named_entities('Floors', matched_floors, added_floors, removed_floors)
+
+        overlay = {}
+        if not all(versions.unchanged(filename) for filename in AP_FILES):
+            rows['Access Points'], overlay = diff_access_points(versions, floor_id_map)
+
+        if stop_event is not None and stop_event.is_set():
+            return None
+
+        old_requirements, new_requirements = versions.entities('requirements.json', 'requirements')
+        requirement_names = {}
+        for requirement in old_requirements + new_requirements:
+            requirement_names[requirement['id']] = requirement.get('name')
+            if 'requirementId' in requirement:
+                requirement_names[requirement['requirementId']] = requirement.get('name')
+
+        if not versions.unchanged('requirements.json'):
+            rows['Requirements'] = diff_named_entities('Requirements', *match_entities(old_requirements, new_requirements))
+
+        if not versions.unchanged('areas.json'):
+            def describe_area_field(field, value):
+                if field.lower() == 'requirementid':
+                    return requirement_names.get(value, value)
+                if field == 'floorPlanId':
+                    return all_floor_names.get(value, value)
+                return value
+
+            rows['Areas'] = diff_named_entities('Areas', *match_entities(*versions.entities('areas.json', 'areas')), describe_area_field,
+                                                lambda area: all_floor_names.get(area.get('floorPlanId'), ''))
+
+        return rows, overlay, new_floors
+    finally:
+        versions.close()
+
+
+def draw_change_overlay(floor_preview, floor, changes):
+    """Highlight the AP changes of one floor over a decoded preview floor, moved APs get a line from their old position."""
+    preview_image, _ = floor_preview
+    overlay = preview_image.copy()
+    draw = ImageDraw.Draw(overlay)
+    font = set_font(OVERLAY_FONT_SIZE)
+    scaling_ratio = overlay.width / floor['width']
+    r = OVERLAY_MARKER_RADIUS
+
+    for change, (x, y), old_position, label in changes:
+        x, y = x * scaling_ratio, y * scaling_ratio
+        colour = OVERLAY_COLOURS[change]
+        if old_position is not None:
+            draw.line((old_position[0] * scaling_ratio, old_position[1] * scaling_ratio, x, y), fill=colour, width=3)
+        if change == 'Removed':
+            draw.line((x - r, y - r, x + r, y + r), fill=colour, width=4)
+            draw.line((x - r, y + r, x + r, y - r), fill=colour, width=4)
+        else:
+            draw.ellipse((x - r, y - r, x + r, y + r), outline=colour, width=4)
+        draw.rectangle(draw.textbbox((x + r + 2, y - r), label, font=font), fill='white')
+        draw.text((x + r + 2, y - r), label, fill=colour, font=font)
+
+    # Legend
+    legend_y = 10
+    for change, colour in OVERLAY_COLOURS.items():
+        text_box = draw.textbbox((10, legend_y), change, font=font)
+        draw.rectangle(text_box, fill='white')
+        draw.text((10, legend_y), change, fill=colour, font=font)
+        legend_y = text_box[3] + 4
+
+    return overlay
+
+
+def create_change_overlay_maps(new_esx_path, overlay, new_floors, output_dir, file_stem, stop_event=None):
+    overlay_paths = []
+    with zipfile.ZipFile(new_esx_path) as esx_zip:
+        for floor_id, changes in overlay.items():
+            if stop_event is not None and stop_event.is_set():
+                break
+            floor = new_floors.get(floor_id)
+            if floor is None:
+                continue
+
+            image_id = floor['bitmapImageId'] if 'bitmapImageId' in floor else floor['imageId']
+            with esx_zip.open('image-' + image_id) as image_file:
+                floor_preview = decode_floor_image_preview(image_file, OVERLAY_MAX_DIMENSION)
+            overlay_image = draw_change_overlay(floor_preview, floor, changes)
+
+            overlay_path = output_dir / f"{file_stem} - {floor['name']} - changes.png"
+            with span('overlay write', file=overlay_path.name):
+                overlay_image.convert('RGB').save(overlay_path, 'PNG', compress_level=1)
+            overlay_paths.append(overlay_path)
+    return overlay_paths
+
+
+def log_changes(rows, message_callback):
+    for category, category_rows in rows.items():
+        counts = {}
+        for row in category_rows:
+            counts[row['Change']] = counts.get(row['Change'], 0) + 1
+        summary = ', '.join(f'{number} {change.lower()}' for change, number in counts.items()) or 'no changes'
+        message_callback(f'{category}: {summary}')
+
+    changes = [row for category, category_rows in rows.items() if category != 'Files' for row in category_rows]
+    if changes:
+        message_callback('')
+    for row in changes[:LOG_CHANGE_LIMIT]:
+        values = f"{row['Old']} -> {row['New']}" if row['Old'] else row['New']
+        detail = f" {row['Field']}: {values}" if row['Field'] else ''
+        floor = f" ({row['Floor']})" if row['Floor'] else ''
+        message_callback(f"{row['Category']} - {row['Change']} - {row['Name']}{floor}{detail}")
+    if len(changes) > LOG_CHANGE_LIMIT:
+        message_callback(f'... {len(changes) - LOG_CHANGE_LIMIT} more changes, see the XLSX')
+
+
+def export_project_diff(rows, output_path):
+    with span('xlsx write', file=output_path.name), pd.ExcelWriter(output_path, engine='xlsxwriter') as writer:
+        summary_df = pd.DataFrame([{'Category': category, 'Change': change, 'Count': sum(row['Change'] == change for row in category_rows)}
+                                   for category, category_rows in rows.items() for change in dict.fromkeys(row['Change'] for row in category_rows)],
+                                  columns=['Category', 'Change', 'Count'])
+        summary_df.to_excel(writer, sheet_name='Summary', index=False)
+        adjust_column_widths(summary_df, writer, 'Summary')
+        format_headers(summary_df, writer, 'Summary')
+
+        for category, category_rows in rows.items():
+            category_df = pd.DataFrame(category_rows, columns=['Change', 'Name', 'Floor', 'Field', 'Old', 'New'])
+            category_df.to_excel(writer, sheet_name=category, index=False)
+            adjust_column_widths(category_df, writer, category)
+            format_headers(category_df, writer, category)
+
+
+def compare_esx(old_esx_path, new_esx_path, message_callback, create_overlay=False, stop_event=None):
+    """Compare two versions of a project, the changes are logged and exported as XLSX, optionally with change highlight maps."""
+    old_esx_path, new_esx_path = Path(old_esx_path), Path(new_esx_path)
+    message_callback(f'Comparing {old_esx_path.name} (old) with {new_esx_path.name} (new){nl}')
+
+    try:
+        result = compare_projects(old_esx_path, new_esx_path, stop_event)
+    except (OSError, KeyError, zipfile.BadZipFile, json.JSONDecodeError) as e:
+        message_callback(f'{ERROR}Failed to compare the projects: {e}')
+        return
+
+    if result is None:
+        message_callback(PROCESS_ABORTED)
+        return
+    rows, overlay, new_floors = result
+
+    log_changes(rows, message_callback)
+
+    output_dir = new_esx_path.parent / 'OUTPUT' / 'PROJECT DIFF'
+    output_dir.mkdir(parents=True, exist_ok=True)
+    file_stem = f'{old_esx_path.stem} vs {new_esx_path.stem}'
+
+    output_path = output_dir / f'{file_stem} - project diff.xlsx'
+    export_project_diff(rows, output_path)
+    message_callback(f'{nl}"{output_path.name}" created successfully')
+
+    if create_overlay:
+        for overlay_path in create_change_overlay_maps(new_esx_path, overlay, new_floors, output_dir, file_stem, stop_event):
+            message_callback(f'"{overlay_path.name}" created successfully')
+
+    if stop_event is not None and stop_event.is_set():
+        message_callback(PROCESS_ABORTED)
+        return
+
+    message_callback(f"{nl}Files saved within the 'OUTPUT/PROJECT DIFF' directory{nl}{nl}### PROCESS COMPLETE ###")
@@ -4,6 +4,8 @@ import wx
 import shutil
 from pathlib import Path
 
+from instrumentation import span
+
 nl = '\n'
 
 
@@ -18,7 +20,8 @@ def rebundle_project(working_directory, project_name, message_callback):
 
     try:
         # Create a ZIP archive - shutil.make_archive adds the .zip extension automatically
-        shutil.make_archive(working_directory / new_file_base_name, 'zip', working_directory / project_name)
+        with span('zip write', file=new_file_name_esx):
+            shutil.make_archive(working_directory / new_file_base_name, 'zip', working_directory / project_name)
         shutil.move(working_directory / new_file_name_zip, working_directory / new_file_name_esx)
 
         wx.CallAfter(message_callback, f'{new_file_name_esx} successfully re-bundled into .esx file')
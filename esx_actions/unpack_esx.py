@@ -2,6 +2,8 @@
 
 import zipfile
 
+from instrumentation import span
+
 nl = '\n'
 
 
@@ -13,7 +15,7 @@ def unpack_esx_file(working_directory, project_name, esx_filepath, message_callb
     try:
         # Unzip the .esx project file into a folder named after the project_name
         message_callback(f'Unpacking .esx project: {project_name}')
-        with zipfile.ZipFile(esx_filepath, 'r') as zip_ref:
+        with span('zip extract', file=project_name), zipfile.ZipFile(esx_filepath, 'r') as zip_ref:
             zip_ref.extractall(working_directory / project_name)
         message_callback(f"Project successfully unzipped{nl}")
         return True
@@ -11,6 +11,7 @@ from common import acceptable_antenna_tilt_angles
 from common import FIVE_GHZ_RADIO_ID
 
 from common import nl, SPACER, PASS, FAIL, CAUTION, HASH_BAR
+from common import PROCESS_ABORTED
 
 
 # def project_filename_compliance(esx, message_callback):
@@ -277,7 +278,7 @@ def validate_area_requirement_assignment(esx, areas_json, requirements_json, mes
     return True
 
 
-def validate_esx(esx, message_callback):
+def validate_esx(esx, message_callback, stop_event=None):
     message_callback(f'Performing Validation for: {esx.project_name}')
 
     project_dir = esx.working_directory / esx.project_name
@@ -307,6 +308,9 @@ def validate_esx(esx, message_callback):
 
     # Count occurrences of each
     for ap in custom_ap_dict.values():
+        if stop_event is not None and stop_event.is_set():
+            message_callback(PROCESS_ABORTED)
+            return
 
         if not ap['name'].startswith('AP-') or not ap['name'][3:].isdigit():
             offenders['ap_name_format'].append(ap['name'])
@@ -335,6 +339,10 @@ def validate_esx(esx, message_callback):
             if tagKey not in ap['tags']:
                 offenders['missing_required_tags'][tagKey].append(ap['name'])
 
+    if stop_event is not None and stop_event.is_set():
+        message_callback(PROCESS_ABORTED)
+        return
+
     total_ap_count = len(custom_ap_dict)
     total_required_tag_keys_count = len(esx.required_tag_keys)
 
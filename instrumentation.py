@@ -0,0 +1,244 @@
+# instrumentation.py
+
+"""
+Lightweight timing instrumentation.
+
+Code marks interesting work with span() context managers and count() counters:
+
+    with span('png encode', file=floor['name']):
+        all_aps.save(output_path)
+    count('json files loaded')
+
+Spans and counters cost a single check when no run is being recorded.
+While instrument_run() is active, e.g. around a background job, the spans and
+counters of that job are recorded into its run. The run belongs to the thread
+(context) that started it, so concurrent jobs keep separate timings. Work the
+job hands to worker threads is recorded into its run when the callable is
+wrapped with in_current_run():
+
+    executor.submit(in_current_run(render), item, decoded)
+
+When the run ends a timing summary is logged and,
+optionally, a Chrome trace JSON file is written (open it in chrome://tracing,
+Perfetto or speedscope) and a cProfile of the run's own thread is dumped.
+"""
+
+import io
+import os
+import json
+import time
+import pstats
+import cProfile
+import threading
+import contextvars
+from pathlib import Path
+from datetime import datetime
+from contextlib import contextmanager
+from functools import wraps
+
+# Number of rows in the logged timing summary, the slowest spans by total time first
+SUMMARY_ROWS = 15
+
+# Number of functions listed from a cProfile run, by cumulative time
+PROFILE_ROWS = 25
+
+# The run recording the current thread's work, None when nothing is being recorded
+_current_run = contextvars.ContextVar('instrumentation_run', default=None)
+
+
+class RunRecorder:
+    """Collects the spans and counters recorded while a run is active."""
+
+    def __init__(self, name):
+        self.name = name
+        self.start_ns = time.perf_counter_ns()
+        self.end_ns = None
+        self.spans = []
+        self.counters = {}
+        self.thread_names = {}
+        self.lock = threading.Lock()
+
+    def add_span(self, name, start_ns, end_ns, args):
+        thread = threading.current_thread()
+        with self.lock:
+            self.spans.append((name, start_ns, end_ns, thread.ident, args))
+            self.thread_names[thread.ident] = thread.name
+
+    def add_count(self, name, value):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    @property
+    def elapsed_seconds(self):
+        end_ns = self.end_ns if self.end_ns is not None else time.perf_counter_ns()
+        return (end_ns - self.start_ns) / 1e9
+
+    def span_totals(self):
+        """{span name: (calls, total seconds, max seconds)}"""
+        totals = {}
+        for name, start_ns, end_ns, _, _ in self.spans:
+            calls, total, longest = totals.get(name, (0, 0.0, 0.0))
+            duration = (end_ns - start_ns) / 1e9
+            totals[name] = (calls + 1, total + duration, max(longest, duration))
+        return totals
+
+    def format_summary(self):
+        lines = [f"Timing summary: {self.name} ({self.elapsed_seconds:.2f} s)"]
+
+        totals = sorted(self.span_totals().items(), key=lambda entry: entry[1][1], reverse=True)
+        if totals:
+            lines.append(f"{'span':<28} {'calls':>7} {'total s':>9} {'mean ms':>9} {'max ms':>9}")
+            for name, (calls, total, longest) in totals[:SUMMARY_ROWS]:
+                lines.append(f"{name:<28} {calls:>7} {total:>9.3f} {total / calls * 1000:>9.1f} {longest * 1000:>9.1f}")
+            if len(totals) > SUMMARY_ROWS:
+                lines.append(f"... {len(totals) - SUMMARY_ROWS} more span(s) in the trace")
+
+        for name, value in sorted(self.counters.items()):
+            lines.append(f"{name}: {value:,}")
+
+        return '\n'.join(lines)
+
+    def chrome_trace(self):
+        """Chrome trace event format, complete ('X') events with microsecond timestamps."""
+        pid = os.getpid()
+        events = [{'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': tid, 'args': {'name': thread_name}}
+                  for tid, thread_name in self.thread_names.items()]
+
+        for name, start_ns, end_ns, tid, args in self.spans:
+            events.append({
+                'name': name,
+                'ph': 'X',
+                'ts': (start_ns - self.start_ns) / 1000,
+                'dur': (end_ns - start_ns) / 1000,
+                'pid': pid,
+                'tid': tid,
+                'args': args,
+            })
+
+        for name, value in self.counters.items():
+            events.append({'name': name, 'ph': 'C', 'ts': (self.end_ns - self.start_ns) / 1000 if self.end_ns else 0,
+                           'pid': pid, 'args': {'value': value}})
+
+        return {'traceEvents': events, 'displayTimeUnit': 'ms', 'otherData': {'run': self.name}}
+
+    def write_chrome_trace(self, output_dir):
+        output_dir = Path(output_dir)
+        output_dir.mkdir(parents=True, exist_ok=True)
+        trace_path = output_dir / f"{output_file_stem(self.name)}.trace.json"
+        with open(trace_path, 'w', encoding='utf-8') as f:
+            json.dump(self.chrome_trace(), f)
+        return trace_path
+
+
+def output_file_stem(run_name):
+    safe_name = ''.join(c if c.isalnum() else '_' for c in run_name)
+    return f"{safe_name}_{datetime.now():%Y%m%d_%H%M%S}"
+
+
+def recording():
+    return _current_run.get() is not None
+
+
+def in_current_run(function):
+    """Wrap function to record into the calling thread's run, for work handed to another thread."""
+    run = _current_run.get()
+    if run is None:
+        return function
+
+    @wraps(function)
+    def wrapper(*args, **kwargs):
+        token = _current_run.set(run)
+        try:
+            return function(*args, **kwargs)
+        finally:
+            _current_run.reset(token)
+    return wrapper
+
+
+@contextmanager
+def span(name, **args):
+    """Time the enclosed block into the current run, args are shown on the trace event."""
+    run = _current_run.get()
+    if run is None:
+        yield
+        return
+
+    start_ns = time.perf_counter_ns()
+    try:
+        yield
+    finally:
+        end_ns = time.perf_counter_ns()
+        run.add_span(name, start_ns, end_ns, args)
+
+
+def timed(name=None):
+    """Decorator, record every call of the function as a span."""
+    def decorator(function):
+        span_name = name or function.__name__
+
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            if _current_run.get() is None:
+                return function(*args, **kwargs)
+            with span(span_name):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def count(name, value=1):
+    run = _current_run.get()
+    if run is not None:
+        run.add_count(name, value)
+
+
+def format_profile_stats(profiler, rows=PROFILE_ROWS):
+    stream = io.StringIO()
+    pstats.Stats(profiler, stream=stream).sort_stats('cumulative').print_stats(rows)
+    return stream.getvalue()
+
+
+@contextmanager
+def instrument_run(name, message_callback, output_dir=None, write_trace=False, profile=False):
+    """
+    Record the spans and counters of the enclosed block as a single run and log its timing summary.
+
+    write_trace writes a Chrome trace JSON file into output_dir.
+    profile runs cProfile over the calling thread, the stats are logged and dumped into output_dir,
+    work handed to other threads shows up in the profile as time spent waiting for it.
+    """
+    recorder = RunRecorder(name)
+    token = _current_run.set(recorder)
+
+    profiler = cProfile.Profile() if profile else None
+
+    if profiler is not None:
+        try:
+            profiler.enable()
+        except ValueError:
+            # Only one profiler can be active per process, i.e. another job is already being profiled
+            message_callback(f"cProfile is already active for another job, {name} will not be profiled")
+            profiler = None
+
+    try:
+        yield recorder
+    finally:
+        if profiler is not None:
+            profiler.disable()
+
+        recorder.end_ns = time.perf_counter_ns()
+        _current_run.reset(token)
+
+        message_callback(recorder.format_summary())
+
+        if write_trace and output_dir is not None:
+            trace_path = recorder.write_chrome_trace(output_dir)
+            message_callback(f"Timing trace written to: {trace_path}")
+
+        if profiler is not None:
+            message_callback(f"cProfile: {name}\n{format_profile_stats(profiler)}")
+            if output_dir is not None:
+                Path(output_dir).mkdir(parents=True, exist_ok=True)
+                profile_path = Path(output_dir) / f"{output_file_stem(name)}.prof"
+                profiler.dump_stats(profile_path)
+                message_callback(f"cProfile stats written to: {profile_path} (open with snakeviz or pstats)")
@@ -0,0 +1,260 @@
+# job_manager.py
+
+"""
+Background job manager for long running actions.
+
+Actions are submitted as jobs and run on a bounded worker pool, jobs beyond the
+concurrency limit wait in the pool's queue and start back to back.
+Each job has its own cancellation token, which exposes is_set() so it can be passed
+anywhere a threading.Event stop_event was previously expected, and reports structured
+progress (completed / total, current floor or AP, ETA) that the GUI turns into a progress bar.
+Jobs submitted with the same exclusive group, e.g. everything writing OUTPUT/blank and the
+map directories, run one at a time in submission order.
+
+All GUI updates are marshalled onto the GUI thread with wx.CallAfter.
+"""
+
+import time
+import threading
+import traceback
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import wx
+
+from common import nl
+from common import ERROR
+
+from instrumentation import instrument_run
+
+# Maximum number of jobs running at the same time, further jobs are queued
+MAX_CONCURRENT_JOBS = 2
+
+# Minimum interval between progress updates posted to the GUI, in seconds
+PROGRESS_UPDATE_INTERVAL = 0.2
+
+QUEUED = 'queued'
+RUNNING = 'running'
+COMPLETE = 'complete'
+CANCELLED = 'cancelled'
+FAILED = 'failed'
+
+# Exclusive groups, jobs sharing a group never run at the same time
+FLOOR_PLAN_OUTPUT = 'floor plans'  # OUTPUT/blank floor plans and the map output directories
+BACKUP_STORE = 'backup store'
+
+
+class CancellationToken:
+    """Per job cancellation flag, interchangeable with threading.Event for is_set() checks."""
+
+    def __init__(self):
+        self._event = threading.Event()
+
+    def cancel(self):
+        self._event.set()
+
+    def is_set(self):
+        return self._event.is_set()
+
+    is_cancelled = is_set
+
+
+class Job:
+    def __init__(self, job_id, name, target, manager, instrumentation_options=None, exclusive_group=None):
+        self.job_id = job_id
+        self.name = name
+        self.target = target
+        self.manager = manager
+        self.exclusive_group = exclusive_group
+        self.instrumentation_options = instrumentation_options
+        self.cancel_token = CancellationToken()
+        self.future = None
+
+        self.status = QUEUED
+        self.completed = 0
+        self.total = 0
+        self.detail = ''
+        self.error = None
+        self.submitted_at = time.monotonic()
+        self.started_at = None
+        self.finished_at = None
+        self.last_update_posted = 0.0
+
+    @property
+    def percent(self):
+        if self.status == COMPLETE:
+            return 100
+        if not self.total:
+            return 0
+        return min(100, int(100 * self.completed / self.total))
+
+    @property
+    def eta_seconds(self):
+        """Estimated seconds remaining, extrapolated from the average time per completed unit."""
+        if self.started_at is None or not self.completed or not self.total:
+            return None
+        elapsed = time.monotonic() - self.started_at
+        return elapsed / self.completed * (self.total - self.completed)
+
+    def report_progress(self, completed, total, detail=''):
+        """Called from the worker thread, e.g. report_progress(3, 12, 'Floor 2')."""
+        self.completed = completed
+        self.total = total
+        self.detail = detail
+
+        now = time.monotonic()
+        if now - self.last_update_posted >= PROGRESS_UPDATE_INTERVAL or completed >= total:
+            self.last_update_posted = now
+            self.manager.post_update()
+
+    def cancel(self):
+        self.cancel_token.cancel()
+        # A job that has not started yet is simply dropped from the queue
+        if self.manager.drop_waiting(self) or (self.future is not None and self.future.cancel()):
+            self.manager.set_status(self, CANCELLED)
+            if self.future is not None:
+                self.manager.release_group(self)
+            self.manager.post_update()
+
+
+class JobManager:
+    def __init__(self, message_callback, on_update, max_workers=MAX_CONCURRENT_JOBS, instrumentation_options=None):
+        """
+        message_callback receives log messages, on_update(job_manager) is called on the GUI thread
+        whenever a job is queued, progresses or finishes.
+        instrumentation_options(job_name), when given, is called on the submitting thread and returns the
+        instrument_run() keyword arguments for the job, or None to run the job without instrumentation.
+        """
+        self.message_callback = message_callback
+        self.on_update = on_update
+        self.instrumentation_options = instrumentation_options
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='job')
+        self.jobs = []
+        self.lock = threading.Lock()
+        self.next_job_id = 1
+        self.busy_groups = set()
+        self.waiting = {}  # exclusive group: deque of jobs waiting for the group to be free
+
+    def submit(self, name, target, exclusive_group=None):
+        """
+        Queue target(job) for execution and return the Job.
+        The target should check job.cancel_token.is_set() regularly and call job.report_progress().
+        A job with an exclusive_group waits until no other job of that group is queued on the pool or running.
+        """
+        options = self.instrumentation_options(name) if self.instrumentation_options is not None else None
+
+        with self.lock:
+            job = Job(self.next_job_id, name, target, self, options, exclusive_group)
+            self.next_job_id += 1
+            self.jobs.append(job)
+
+            dispatch = exclusive_group is None or exclusive_group not in self.busy_groups
+            if exclusive_group is not None:
+                if dispatch:
+                    self.busy_groups.add(exclusive_group)
+                else:
+                    self.waiting.setdefault(exclusive_group, deque()).append(job)
+
+        ahead = len(self.active_jobs()) - 1
+        if dispatch:
+            job.future = self.executor.submit(self.run_job, job)
+
+        if ahead > 0:
+            wx.CallAfter(self.message_callback, f"{name} queued, {ahead} job(s) ahead of it")
+
+        self.post_update()
+        return job
+
+    def set_status(self, job, status):
+        with self.lock:
+            job.status = status
+
+    def drop_waiting(self, job):
+        """Remove a job still waiting for its exclusive group, returns whether it was waiting."""
+        with self.lock:
+            waiting = self.waiting.get(job.exclusive_group)
+            if waiting is not None and job in waiting:
+                waiting.remove(job)
+                return True
+            return False
+
+    def release_group(self, job):
+        """Hand the job's exclusive group to the next job waiting for it."""
+        if job.exclusive_group is None:
+            return
+        with self.lock:
+            waiting = self.waiting.get(job.exclusive_group)
+            next_job = waiting.popleft() if waiting else None
+            if next_job is None:
+                self.busy_groups.discard(job.exclusive_group)
+        if next_job is not None:
+            next_job.future = self.executor.submit(self.run_job, next_job)
+
+    def run_job(self, job):
+        if job.cancel_token.is_set():
+            self.set_status(job, CANCELLED)
+            self.release_group(job)
+            self.post_update()
+            return
+
+        self.set_status(job, RUNNING)
+        job.started_at = time.monotonic()
+        self.post_update()
+
+        try:
+            if job.instrumentation_options is not None:
+                with instrument_run(job.name, self.log_message, **job.instrumentation_options):
+                    job.target(job)
+            else:
+                job.target(job)
+            self.set_status(job, CANCELLED if job.cancel_token.is_set() else COMPLETE)
+        except Exception as e:
+            self.set_status(job, FAILED)
+            job.error = e
+            wx.CallAfter(self.message_callback, f"{ERROR}{job.name} failed: {e}{nl}")
+            traceback.print_exc()
+        finally:
+            job.finished_at = time.monotonic()
+            self.release_group(job)
+            self.post_update()
+
+    def log_message(self, message):
+        wx.CallAfter(self.message_callback, message)
+
+    def post_update(self):
+        wx.CallAfter(self.on_update, self)
+
+    def active_jobs(self):
+        """Queued and running jobs, in submission order."""
+        with self.lock:
+            return [job for job in self.jobs if job.status in (QUEUED, RUNNING)]
+
+    def running_jobs(self):
+        with self.lock:
+            return [job for job in self.jobs if job.status == RUNNING]
+
+    def queued_jobs(self):
+        with self.lock:
+            return [job for job in self.jobs if job.status == QUEUED]
+
+    def cancel_all(self):
+        for job in self.active_jobs():
+            job.cancel()
+
+    def clear_finished(self):
+        with self.lock:
+            self.jobs = [job for job in self.jobs if job.status in (QUEUED, RUNNING)]
+
+    def shutdown(self):
+        self.cancel_all()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+def format_eta(seconds):
+    if seconds is None:
+        return '--:--'
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    if hours:
+        return f"{hours}:{minutes:02d}:{seconds:02d}"
+    return f"{minutes}:{seconds:02d}"
@@ -1,36 +1,34 @@
 # create_custom_ap_location_maps.py
 
 import wx
-import shutil
-import threading
 from pathlib import Path
-from PIL import Image
 
 from common import nl
 from common import load_json
 from common import create_floor_plans_dict
 from common import create_simulated_radios_dict
+from common import model_antenna_split
 from common import ERROR, PROCESS_COMPLETE, PROCESS_ABORTED
 
 from map_creator.map_creator_comon import vector_source_check
+from map_creator.map_creator_comon import load_floor_image
 from map_creator.map_creator_comon import crop_assessment
-from map_creator.map_creator_comon import annotate_map
 from map_creator.map_creator_comon import oversize_map_check
 from map_creator.map_creator_comon import add_project_filename_to_map
+from map_creator.pdf_atlas import PdfAtlasWriter
+from map_creator.scene import build_ap_scene_item, log_scene_item, render_scene_raster
+from map_creator.label_placement import place_labels
+from map_creator.svg_renderer import write_svg_overlay
+from map_creator.map_encoding import MapEncoder, get_map_encoding_options
+from map_creator.render_pipeline import render_pipeline
 
-
-CUSTOM_AP_ICON_SIZE_ADJUSTER = 4.87
+from instrumentation import span
 
 
-def create_custom_ap_location_maps_threaded(self):
-    # Wrapper function to run insert_images in a separate thread
-    def run_in_thread():
-        create_ap_location_maps(self)
-    # Start the long-running task in a separate thread
-    threading.Thread(target=run_in_thread).start()
+CUSTOM_AP_ICON_SIZE_ADJUSTER = 4.87
 
 
-def create_ap_location_maps(self):
+def create_ap_location_maps(self, stop_event, progress_callback=None):
     message_callback = self.append_message
     wx.CallAfter(message_callback, f'Creating custom AP location maps for: {self.project_name}{nl}'
                                    f'Custom AP icon size: {self.ap_icon_size}{nl}')
@@ -60,24 +58,30 @@ def create_ap_location_maps(self):
     custom_ap_location_maps = output_dir / 'AP location maps'
     custom_ap_location_maps.mkdir(parents=True, exist_ok=True)
 
-    # Create subdirectory for temporary files
-    temp_dir = output_dir / 'temp'
-    temp_dir.mkdir(parents=True, exist_ok=True)
+    # Optionally stream every annotated floor into a single PDF atlas as it is rendered
+    pdf_atlas = None
+    if getattr(self, 'create_pdf_atlas', False):
+        pdf_atlas_path = output_dir / f"{self.project_name} - AP location maps.pdf"
+        pdf_atlas = PdfAtlasWriter(pdf_atlas_path, self.project_name)
+        wx.CallAfter(message_callback, f"PDF atlas will be written to: {pdf_atlas_path.name}{nl}")
 
-    for floor in sorted(floor_plans_json['floorPlans'], key=lambda i: i['name']):
-        if self.stop_event.is_set():
-            wx.CallAfter(message_callback, PROCESS_ABORTED)
-            return
+    # Finished maps are encoded in the background while the next floor is rendered
+    map_encoder = MapEncoder(get_map_encoding_options(getattr(self, 'project_profile_module', None)), message_callback)
 
-        wx.CallAfter(message_callback, f"{nl}{nl}Processing floor: {floor['name']}{nl}")
+    floors = sorted(floor_plans_json['floorPlans'], key=lambda i: i['name'])
+    floor_indexes = {floor['id']: floor_index for floor_index, floor in enumerate(floors)}
 
-        floor_id = vector_source_check(floor, message_callback)
+    def output_filename(floor):
+        # The PNG map and its SVG overlay share the versioned name
+        if self.project_version is not None:
+            return f"{floor['name']} {self.project_version}.png"
+        return f"{floor['name']}.png"
 
-        # Move floor plan to temp_dir
-        shutil.copy(project_dir / ('image-' + floor_id), temp_dir / floor_id)
+    def decode_floor(floor):
+        floor_id = vector_source_check(floor, message_callback)
 
-        # Open the floor plan to be used for AP placement activities
-        source_floor_plan_image = Image.open(temp_dir / floor_id)
+        # Open the floor plan to be used for AP placement activities, shared with other stages when run as a pipeline
+        source_floor_plan_image = load_floor_image(project_dir, floor_id)
 
         # Check if the map is oversized
         oversize_map_check(source_floor_plan_image, message_callback)
@@ -85,25 +89,32 @@ def create_ap_location_maps(self):
         # Ensure the map_image is in 'RGBA' mode
         if source_floor_plan_image.mode != 'RGBA':
             wx.CallAfter(message_callback, f'Converting {floor_id} to RGBA colour space')
-            source_floor_plan_image = source_floor_plan_image.convert('RGBA')
+            with span('convert RGBA', floor=floor['name']):
+                source_floor_plan_image = source_floor_plan_image.convert('RGBA')
 
         map_cropped_within_ekahau, scaling_ratio, crop_bitmap = crop_assessment(floor, source_floor_plan_image, project_dir, floor_id, blank_plan_dir)
 
+        return source_floor_plan_image, map_cropped_within_ekahau, scaling_ratio, crop_bitmap
+
+    def render_floor(floor, decoded):
+        source_floor_plan_image, map_cropped_within_ekahau, scaling_ratio, crop_bitmap = decoded
+
+        if progress_callback is not None:
+            progress_callback(floor_indexes[floor['id']], len(floors), floor['name'])
+
+        wx.CallAfter(message_callback, f"{nl}{nl}Processing floor: {floor['name']}{nl}")
+
         aps_on_this_floor = []
 
         for ap in sorted(access_points_json['accessPoints'], key=lambda i: i['name']):
-            if self.stop_event.is_set():
-                wx.CallAfter(message_callback, PROCESS_ABORTED)
-                return
+            if stop_event.is_set():
+                return None
 
             if ap['location']['floorPlanId'] == floor['id']:
                 aps_on_this_floor.append(ap)
 
         current_map_image = source_floor_plan_image.copy()
 
-        # Initialize all_aps to None
-        all_aps = None
-
         if not aps_on_this_floor:
             wx.CallAfter(message_callback, f"No APs on this floor, generating a blank floor plan.")
 
@@ -118,19 +129,33 @@ def create_ap_location_maps(self):
             blank_floor_plan = add_project_filename_to_map(blank_floor_plan, self.ap_name_label_size, self.project_name)
             wx.CallAfter(message_callback, "Blank map stamped with project filename")
 
-            # Save the blank floor plan
-            blank_floor_plan.save(Path(custom_ap_location_maps / floor['name']).with_suffix('.png'))
+            return blank_floor_plan, aps_on_this_floor
+
+        # Describe the AP layer once, then rasterise it, and optionally write it as an SVG overlay
+        floor_scene = []
 
-            # Continue to the next floor instead of skipping
-            continue
+        # Generate the all_aps map
+        for ap in aps_on_this_floor:
+            if stop_event.is_set():
+                return None
+            scene_item = build_ap_scene_item(ap, scaling_ratio, custom_ap_icon_size, self.ap_name_label_size, simulated_radio_dict)
+            log_scene_item(scene_item, ap, floor_plans_dict, message_callback)
+            floor_scene.append(scene_item)
 
-        else:
-            # Generate the all_aps map
-            for ap in aps_on_this_floor:
-                if self.stop_event.is_set():
-                    wx.CallAfter(message_callback, PROCESS_ABORTED)
-                    return
-                all_aps = annotate_map(current_map_image, ap, scaling_ratio, custom_ap_icon_size, self.ap_name_label_size, simulated_radio_dict, message_callback, floor_plans_dict)
+        # Move overlapping AP name labels apart before drawing
+        displaced_labels = place_labels(floor_scene, source_floor_plan_image.size)
+        if displaced_labels:
+            wx.CallAfter(message_callback, f"{displaced_labels} AP name labels repositioned to avoid overlaps")
+
+        all_aps = render_scene_raster(current_map_image, floor_scene)
+
+        if getattr(self, 'create_svg_overlay', False):
+            svg_path = write_svg_overlay(floor_scene,
+                                         (custom_ap_location_maps / output_filename(floor)).with_suffix('.svg'),
+                                         source_floor_plan_image.size,
+                                         Path(blank_plan_dir / floor['name']).with_suffix('.png'),
+                                         crop_bitmap if map_cropped_within_ekahau else None)
+            wx.CallAfter(message_callback, f"SVG overlay for {floor['name']} saved as {svg_path.name}")
 
         # If map was cropped within Ekahau, crop the all_AP map
         if map_cropped_within_ekahau:
@@ -140,26 +165,51 @@ def create_ap_location_maps(self):
         all_aps = add_project_filename_to_map(all_aps, self.ap_name_label_size, self.project_name)
         wx.CallAfter(message_callback, "map stamped with project filename")
 
-        # Save the output images
-        try:
-            if self.project_version is not None:
-                output_filename = f"{floor['name']} {self.project_version}.png"
-            else:
-                output_filename = f"{floor['name']}.png"
+        return all_aps, aps_on_this_floor
 
-            all_aps.save(custom_ap_location_maps / output_filename)
-            wx.CallAfter(message_callback, f"Custom AP location map for {floor['name']} saved successfully as {output_filename}")
-        except Exception as e:
-            wx.CallAfter(message_callback, ERROR)
-            wx.CallAfter(message_callback, "Failure Attempting to save the OUTPUT images")
-            print(e)
+    try:
+        # Decode the next floor and encode the previous one while this floor is rendered
+        for floor, rendered in render_pipeline(floors, decode_floor, render_floor, stop_event):
+            if rendered is None:
+                break
 
-        # source_floor_plan_image.close()
-        # current_map_image.close()
+            map_image, aps_on_this_floor = rendered
 
-    try:
-        shutil.rmtree(temp_dir)
-        wx.CallAfter(message_callback, PROCESS_COMPLETE)
-    except Exception as e:
-        wx.CallAfter(message_callback, ERROR)
-        wx.CallAfter(message_callback, str(e))
\ No newline at end of file
+            if not aps_on_this_floor:
+                # Save the blank floor plan
+                map_encoder.save(map_image, Path(custom_ap_location_maps / floor['name']).with_suffix('.png'))
+
+                if pdf_atlas is not None:
+                    pdf_atlas.add_floor(floor['name'], map_image)
+
+                # Continue to the next floor instead of skipping
+                continue
+
+            # Save the output images
+            try:
+                output_path = map_encoder.output_path(custom_ap_location_maps / output_filename(floor))
+                map_encoder.save(map_image, output_path, f"Custom AP location map for {floor['name']} saved successfully as {output_path.name}")
+
+                if pdf_atlas is not None:
+                    pdf_atlas.add_floor(floor['name'], map_image, [(ap['name'], model_antenna_split(ap['model'])[0]) for ap in aps_on_this_floor])
+                    wx.CallAfter(message_callback, f"{floor['name']} added to the PDF atlas")
+            except Exception as e:
+                wx.CallAfter(message_callback, ERROR)
+                wx.CallAfter(message_callback, "Failure Attempting to save the OUTPUT images")
+                print(e)
+
+    finally:
+        map_encoder.close()
+
+        if pdf_atlas is not None:
+            pdf_atlas.close()
+            wx.CallAfter(message_callback, f"{nl}PDF atlas saved: {pdf_atlas.output_path.name}")
+
+    if stop_event.is_set():
+        wx.CallAfter(message_callback, PROCESS_ABORTED)
+        return
+
+    if progress_callback is not None:
+        progress_callback(len(floors), len(floors), 'Complete')
+
+    wx.CallAfter(message_callback, PROCESS_COMPLETE)
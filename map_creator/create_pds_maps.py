@@ -1,10 +1,7 @@
 #!/usr/bin/env python3
 
 import wx
-import shutil
-import threading
 from pathlib import Path
-from PIL import Image
 
 from common import nl
 from common import PROCESS_COMPLETE
@@ -14,23 +11,21 @@ from common import create_simulated_radios_dict
 from common import ERROR, PROCESS_ABORTED, PROCESS_COMPLETE
 
 from map_creator.map_creator_comon import vector_source_check
+from map_creator.map_creator_comon import load_floor_image
 from map_creator.map_creator_comon import crop_assessment
-from map_creator.map_creator_comon import annotate_pds_map
 from map_creator.map_creator_comon import oversize_map_check
 from map_creator.map_creator_comon import add_project_filename_to_map
+from map_creator.scene import PDS_STYLE, build_ap_scene_item, log_scene_item, render_scene_raster
+from map_creator.label_placement import place_labels
+from map_creator.map_encoding import MapEncoder, get_map_encoding_options
+from map_creator.render_pipeline import render_pipeline
 
-CUSTOM_AP_ICON_SIZE_ADJUSTER = 5.3
-
+from instrumentation import span
 
-def create_pds_maps_threaded(working_directory, project_name, message_callback, custom_ap_icon_size, ap_name_label_size, stop_event):
-    # Wrapper function to run insert_images in a separate thread
-    def run_in_thread():
-        create_pds_maps(working_directory, project_name, message_callback, custom_ap_icon_size, ap_name_label_size, stop_event)
-    # Start the long-running task in a separate thread
-    threading.Thread(target=run_in_thread).start()
+CUSTOM_AP_ICON_SIZE_ADJUSTER = 5.3
 
 
-def create_pds_maps(working_directory, project_name, message_callback, custom_ap_icon_size, ap_name_label_size, stop_event):
+def create_pds_maps(working_directory, project_name, message_callback, custom_ap_icon_size, ap_name_label_size, stop_event, progress_callback=None, encoding_options=None):
     wx.CallAfter(message_callback, f'Creating custom AP location maps for: {project_name}{nl}'
                                    f'Custom AP icon size: {custom_ap_icon_size}{nl}')
 
@@ -59,49 +54,50 @@ def create_pds_maps(working_directory, project_name, message_callback, custom_ap
     pds_plan_dir = output_dir / 'PDS AP location maps'
     pds_plan_dir.mkdir(parents=True, exist_ok=True)
 
-    # Create subdirectory for temporary files
-    temp_dir = output_dir / 'temp'
-    temp_dir.mkdir(parents=True, exist_ok=True)
+    floors = sorted(floor_plans_json['floorPlans'], key=lambda i: i['name'])
+    floor_indexes = {floor['id']: floor_index for floor_index, floor in enumerate(floors)}
 
-    for floor in sorted(floor_plans_json['floorPlans'], key=lambda i: i['name']):
-        if stop_event.is_set():
-            wx.CallAfter(message_callback, PROCESS_ABORTED)
-            return
+    # Finished maps are encoded in the background while the next floor is rendered
+    if encoding_options is None:
+        encoding_options = get_map_encoding_options(None)
 
+    def decode_floor(floor):
         floor_id = vector_source_check(floor, message_callback)
 
-        # Move floor plan to temp_dir
-        shutil.copy(project_dir / ('image-' + floor_id), temp_dir / floor_id)
-
-        # Open the floor plan to be used for AP placement activities
-        source_floor_plan_image = Image.open(temp_dir / floor_id)
+        # Open the floor plan to be used for AP placement activities, shared with other stages when run as a pipeline
+        source_floor_plan_image = load_floor_image(project_dir, floor_id)
 
         map_cropped_within_ekahau, scaling_ratio, crop_bitmap = crop_assessment(floor, source_floor_plan_image, project_dir, floor_id, blank_plan_dir)
 
-        aps_on_this_floor = []
-
-        wx.CallAfter(message_callback, f"{nl}Processing floor: {floor['name']}{nl}")
-
         # Check if the map is oversized
         oversize_map_check(source_floor_plan_image, message_callback)
 
         # Ensure the map_image is in 'RGBA' mode
         if source_floor_plan_image.mode != 'RGBA':
-            source_floor_plan_image = source_floor_plan_image.convert('RGBA')
+            with span('convert RGBA', floor=floor['name']):
+                source_floor_plan_image = source_floor_plan_image.convert('RGBA')
+
+        return source_floor_plan_image, scaling_ratio
+
+    def render_floor(floor, decoded):
+        source_floor_plan_image, scaling_ratio = decoded
+
+        if progress_callback is not None:
+            progress_callback(floor_indexes[floor['id']], len(floors), floor['name'])
+
+        wx.CallAfter(message_callback, f"{nl}Processing floor: {floor['name']}{nl}")
+
+        aps_on_this_floor = []
 
         for ap in sorted(access_points_json['accessPoints'], key=lambda i: i['name']):
             if stop_event.is_set():
-                wx.CallAfter(message_callback, PROCESS_ABORTED)
-                return
+                return None
 
             if ap['location']['floorPlanId'] == floor['id']:
                 aps_on_this_floor.append(ap)
 
         current_map_image = source_floor_plan_image.copy()
 
-        # Initialize all_aps to None
-        all_aps = None
-
         if not aps_on_this_floor:
             wx.CallAfter(message_callback, f"No APs on this floor, generating a blank PDS floor plan.")
 
@@ -117,20 +113,25 @@ def create_pds_maps(working_directory, project_name, message_callback, custom_ap
             blank_floor_plan = add_project_filename_to_map(blank_floor_plan, ap_name_label_size, project_name)
             wx.CallAfter(message_callback, "Blank PDS map stamped with project filename")
 
-            # Save the blank PDS floor plan
-            blank_floor_plan.save(Path(pds_plan_dir / floor['name']).with_suffix('.png'))
+            return blank_floor_plan, aps_on_this_floor
 
-            # Continue to the next floor
-            continue
+        floor_scene = []
 
-        else:
-            # Generate the all_aps map
-            for ap in aps_on_this_floor:
-                if stop_event.is_set():
-                    wx.CallAfter(message_callback, PROCESS_ABORTED)
-                    return
+        # Generate the all_aps map
+        for ap in aps_on_this_floor:
+            if stop_event.is_set():
+                return None
 
-                all_aps = annotate_pds_map(current_map_image, ap, scaling_ratio, custom_ap_icon_size, ap_name_label_size, simulated_radio_dict, message_callback, floor_plans_dict)
+            scene_item = build_ap_scene_item(ap, scaling_ratio, custom_ap_icon_size, ap_name_label_size, simulated_radio_dict, PDS_STYLE)
+            log_scene_item(scene_item, ap, floor_plans_dict, message_callback)
+            floor_scene.append(scene_item)
+
+        # Move overlapping AP name labels apart before drawing
+        displaced_labels = place_labels(floor_scene, source_floor_plan_image.size)
+        if displaced_labels:
+            wx.CallAfter(message_callback, f"{displaced_labels} AP name labels repositioned to avoid overlaps")
+
+        all_aps = render_scene_raster(current_map_image, floor_scene)
 
         # If map was cropped within Ekahau, crop the all_AP map
         # if map_cropped_within_ekahau:
@@ -140,17 +141,34 @@ def create_pds_maps(working_directory, project_name, message_callback, custom_ap
         all_aps = add_project_filename_to_map(all_aps, ap_name_label_size, project_name)
         wx.CallAfter(message_callback, "map stamped with project filename")
 
-        # Save the output images
-        try:
-            all_aps.save(Path(pds_plan_dir / floor['name']).with_suffix('.png'))
-            wx.CallAfter(message_callback, f"{nl}PDS map saved: {floor['name']}{nl}")
-        except Exception as e:
-            wx.CallAfter(message_callback, ERROR)
-            wx.CallAfter(message_callback, str(e))
-
-    try:
-        shutil.rmtree(temp_dir)
-        wx.CallAfter(message_callback, PROCESS_COMPLETE)
-    except Exception as e:
-        wx.CallAfter(message_callback, ERROR)
-        wx.CallAfter(message_callback, str(e))
+        return all_aps, aps_on_this_floor
+
+    # The PDS project creator imports these maps by their .png filename
+    with MapEncoder(encoding_options, message_callback, allowed_formats=('PNG',)) as map_encoder:
+        # Decode the next floor and encode the previous one while this floor is rendered
+        for floor, rendered in render_pipeline(floors, decode_floor, render_floor, stop_event):
+            if rendered is None:
+                break
+
+            map_image, aps_on_this_floor = rendered
+
+            if not aps_on_this_floor:
+                # Save the blank PDS floor plan
+                map_encoder.save(map_image, Path(pds_plan_dir / floor['name']).with_suffix('.png'))
+                continue
+
+            # Save the output images
+            try:
+                map_encoder.save(map_image, Path(pds_plan_dir / floor['name']).with_suffix('.png'), f"{nl}PDS map saved: {floor['name']}{nl}")
+            except Exception as e:
+                wx.CallAfter(message_callback, ERROR)
+                wx.CallAfter(message_callback, str(e))
+
+    if stop_event.is_set():
+        wx.CallAfter(message_callback, PROCESS_ABORTED)
+        return
+
+    if progress_callback is not None:
+        progress_callback(len(floors), len(floors), 'Complete')
+
+    wx.CallAfter(message_callback, PROCESS_COMPLETE)
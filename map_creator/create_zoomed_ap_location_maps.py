@@ -1,9 +1,7 @@
 # create_custom_ap_location_maps.py
 
-import shutil
 from pathlib import Path
 from PIL import Image
-import threading
 import wx
 
 from common import nl
@@ -13,25 +11,22 @@ from common import create_simulated_radios_dict
 from common import ERROR, PROCESS_ABORTED, PROCESS_COMPLETE
 
 from map_creator.map_creator_comon import vector_source_check
+from map_creator.map_creator_comon import load_floor_image
 from map_creator.map_creator_comon import crop_assessment
-from map_creator.map_creator_comon import annotate_map
-from map_creator.map_creator_comon import crop_map
 from map_creator.map_creator_comon import oversize_map_check
+from map_creator.scene import build_ap_scene_item, log_scene_item, render_scene_raster, render_scene_windowed
+from map_creator.label_placement import place_labels
+from map_creator.map_encoding import MapEncoder, get_map_encoding_options
+from map_creator.render_pipeline import render_pipeline
 
 from map_creator.map_creator_comon import OPACITY
 
-CUSTOM_AP_ICON_SIZE_ADJUSTER = 4.87
-
+from instrumentation import span
 
-def create_zoomed_ap_location_maps_threaded(working_directory, project_name, message_callback, zoomed_ap_crop_size, custom_ap_icon_size, ap_name_label_size, stop_event):
-    # Wrapper function to run insert_images in a separate thread
-    def run_in_thread():
-        create_zoomed_ap_location_maps(working_directory, project_name, message_callback, zoomed_ap_crop_size, custom_ap_icon_size, ap_name_label_size, stop_event)
-    # Start the long-running task in a separate thread
-    threading.Thread(target=run_in_thread).start()
+CUSTOM_AP_ICON_SIZE_ADJUSTER = 4.87
 
 
-def create_zoomed_ap_location_maps(working_directory, project_name, message_callback, zoomed_ap_crop_size, custom_ap_icon_size, ap_name_label_size, stop_event):
+def create_zoomed_ap_location_maps(working_directory, project_name, message_callback, zoomed_ap_crop_size, custom_ap_icon_size, ap_name_label_size, stop_event, progress_callback=None, encoding_options=None):
     wx.CallAfter(message_callback, f'Creating zoomed per AP location maps for {project_name}:{nl}'
                                    f'Custom AP icon size: {custom_ap_icon_size}{nl}'
                                    f'Zoomed AP crop size: {zoomed_ap_crop_size}{nl}')
@@ -64,94 +59,109 @@ def create_zoomed_ap_location_maps(working_directory, project_name, message_call
     custom_ap_location_maps = output_dir / 'AP location maps'
     custom_ap_location_maps.mkdir(parents=True, exist_ok=True)
 
-    # Create subdirectory for temporary files
-    temp_dir = output_dir / 'temp'
-    temp_dir.mkdir(parents=True, exist_ok=True)
+    floors = sorted(floor_plans_json['floorPlans'], key=lambda i: i['name'])
+    floor_indexes = {floor['id']: floor_index for floor_index, floor in enumerate(floors)}
 
-    for floor in sorted(floor_plans_json['floorPlans'], key=lambda i: i['name']):
-        if stop_event.is_set():
-            wx.CallAfter(message_callback, PROCESS_ABORTED)
-            return
+    # Finished maps are encoded in the background while the next image is rendered
+    if encoding_options is None:
+        encoding_options = get_map_encoding_options(None)
 
+    def decode_floor(floor):
         floor_id = vector_source_check(floor, message_callback)
 
-        # Extract floor plan and save to temp directory
-        shutil.copy(project_dir / ('image-' + floor_id), temp_dir / floor_id)
-
-        # Open the floor plan to be used for AP placement activities
-        source_floor_plan_image = Image.open(temp_dir / floor_id)
+        # Open the floor plan to be used for AP placement activities, shared with other stages when run as a pipeline
+        source_floor_plan_image = load_floor_image(project_dir, floor_id)
 
         map_cropped_within_ekahau, scaling_ratio, crop_bitmap = crop_assessment(floor, source_floor_plan_image, project_dir, floor_id, blank_plan_dir)
 
+        return source_floor_plan_image, scaling_ratio
+
+    def render_floor(floor, decoded):
+        source_floor_plan_image, scaling_ratio = decoded
+
+        if progress_callback is not None:
+            progress_callback(floor_indexes[floor['id']], len(floors), floor['name'])
+
         aps_on_this_floor = []
 
         for ap in sorted(access_points_json['accessPoints'], key=lambda i: i['name']):
             if stop_event.is_set():
-                wx.CallAfter(message_callback, PROCESS_ABORTED)
-                return
+                return False
 
             if ap['location']['floorPlanId'] == floor['id']:
                 aps_on_this_floor.append(ap)
 
-        if aps_on_this_floor:
-            if stop_event.is_set():
-                wx.CallAfter(message_callback, PROCESS_ABORTED)
-                return
+        if not aps_on_this_floor:
+            wx.CallAfter(message_callback, f"{nl}No APs found on floor: {floor['name']}{nl}")
+            return True
+
+        current_map_image = source_floor_plan_image.copy()
 
-            current_map_image = source_floor_plan_image.copy()
+        # Describe every AP once, the scene is reused for the all_aps map and each zoomed AP image
+        floor_scene = {}
+
+        # Generate the all_aps map
+        wx.CallAfter(message_callback, f"{nl}Creating Custom AP location map for: {floor['name']}{nl}")
+        for ap in aps_on_this_floor:
+            if stop_event.is_set():
+                return False
+            floor_scene[ap['id']] = build_ap_scene_item(ap, scaling_ratio, custom_ap_icon_size, ap_name_label_size, simulated_radio_dict)
+            log_scene_item(floor_scene[ap['id']], ap, floor_plans_dict, message_callback)
 
-            # Initialize all_aps to None
-            all_aps = None
+        # Move overlapping AP name labels apart before drawing
+        displaced_labels = place_labels(floor_scene.values(), source_floor_plan_image.size)
+        if displaced_labels:
+            wx.CallAfter(message_callback, f"{displaced_labels} AP name labels repositioned to avoid overlaps")
 
-            # Generate the all_aps map
-            wx.CallAfter(message_callback, f"{nl}Creating Custom AP location map for: {floor['name']}{nl}")
-            for ap in aps_on_this_floor:
-                if stop_event.is_set():
-                    wx.CallAfter(message_callback, PROCESS_ABORTED)
-                    return
-                all_aps = annotate_map(current_map_image, ap, scaling_ratio, custom_ap_icon_size, ap_name_label_size, simulated_radio_dict, message_callback, floor_plans_dict)
+        all_aps = render_scene_raster(current_map_image, floor_scene.values())
 
-            # Save the output images
-            wx.CallAfter(message_callback, f"{nl}Saving annotated floor plan: {floor['name']}{nl}")
-            all_aps.save(Path(custom_ap_location_maps / floor['name']).with_suffix('.png'))
+        # Save the output images
+        wx.CallAfter(message_callback, f"{nl}Saving annotated floor plan: {floor['name']}{nl}")
+        map_encoder.save(all_aps, Path(custom_ap_location_maps / floor['name']).with_suffix('.png'))
 
-            # Zoom faded AP map generation
-            wx.CallAfter(message_callback, f"{nl}Creating zoomed per AP images for: {floor['name']}{nl}")
+        # Zoom faded AP map generation
+        wx.CallAfter(message_callback, f"{nl}Creating zoomed per AP images for: {floor['name']}{nl}")
 
-            # Check if the map is oversized
-            oversize_map_check(source_floor_plan_image, message_callback)
+        # Check if the map is oversized
+        oversize_map_check(source_floor_plan_image, message_callback)
 
+        with span('fade blend', floor=floor['name']):
             all_aps_faded = all_aps.copy().convert('RGBA')
             faded_ap_background_map_image = source_floor_plan_image.convert('RGBA')
             all_aps_faded = Image.alpha_composite(faded_ap_background_map_image, Image.blend(faded_ap_background_map_image, all_aps_faded, OPACITY))
 
-            for ap in aps_on_this_floor:
-                if stop_event.is_set():
-                    wx.CallAfter(message_callback, PROCESS_ABORTED)
-                    return
+        for ap in aps_on_this_floor:
+            if stop_event.is_set():
+                return False
 
-                per_ap_map_image = annotate_map(all_aps_faded.copy(), ap, scaling_ratio, custom_ap_icon_size, ap_name_label_size, simulated_radio_dict, message_callback, floor_plans_dict)
+            # Crop the faded map around this AP and draw only this AP over it
+            scene_item = floor_scene[ap['id']]
+            zoom_window = (scene_item['x'] - zoomed_ap_crop_size // 2, scene_item['y'] - zoomed_ap_crop_size // 2,
+                           scene_item['x'] + zoomed_ap_crop_size // 2, scene_item['y'] + zoomed_ap_crop_size // 2)
 
-                cropped_per_ap_map_image = crop_map(per_ap_map_image, ap, scaling_ratio, zoomed_ap_crop_size)
+            cropped_per_ap_map_image = render_scene_windowed(all_aps_faded, [scene_item], zoom_window)
 
-                # Save the cropped image with a new filename
-                try:
-                    cropped_per_ap_map_image.save(Path(zoom_faded_dir / (ap['name'] + '-zoomed')).with_suffix('.png'))
-                    wx.CallAfter(message_callback, f"Saved zoomed image for AP: {ap['name']}")
-                except Exception as e:
-                    wx.CallAfter(message_callback, ERROR)
-                    wx.CallAfter(message_callback, str(e))
+            # Save the cropped image with a new filename, the zoomed images stream straight to the encoder
+            try:
+                map_encoder.save(cropped_per_ap_map_image, Path(zoom_faded_dir / (ap['name'] + '-zoomed')).with_suffix('.png'),
+                                 f"Saved zoomed image for AP: {ap['name']}")
+            except Exception as e:
+                wx.CallAfter(message_callback, ERROR)
+                wx.CallAfter(message_callback, str(e))
 
-            # If map was cropped within Ekahau, crop the all_AP map
-            if map_cropped_within_ekahau:
-                all_aps = all_aps.crop(crop_bitmap)
+        return True
 
-        else:
-            wx.CallAfter(message_callback, f"{nl}No APs found on floor: {floor['name']}{nl}")
+    with MapEncoder(encoding_options, message_callback) as map_encoder:
+        # Decode the next floor while this floor is rendered and its images are encoded
+        for floor, rendered in render_pipeline(floors, decode_floor, render_floor, stop_event):
+            if not rendered:
+                break
+
+    if stop_event.is_set():
+        wx.CallAfter(message_callback, PROCESS_ABORTED)
+        return
+
+    if progress_callback is not None:
+        progress_callback(len(floors), len(floors), 'Complete')
 
-    try:
-        shutil.rmtree(temp_dir)
-        wx.CallAfter(message_callback, PROCESS_COMPLETE)
-    except Exception as e:
-        wx.CallAfter(message_callback, ERROR)
-        wx.CallAfter(message_callback, str(e))
+    wx.CallAfter(message_callback, PROCESS_COMPLETE)
@@ -9,14 +9,17 @@ from PIL import Image
 from common import nl
 from common import load_json
 from map_creator.map_creator_comon import vector_source_check
+from map_creator.map_encoding import MapEncoder, get_map_encoding_options
+from map_creator.render_pipeline import render_pipeline
 from common import PROCESS_COMPLETE
 
 
-def export_floor_plan(source, destination, crop_bitmap=None):
+def open_floor_plan(source, crop_bitmap=None):
     with Image.open(source) as img:
         if crop_bitmap:
             img = img.crop(crop_bitmap)
-        img.save(destination)
+        img.load()
+        return img
 
 
 def extract_blank_maps(working_directory, project_name, message_callback):
@@ -26,7 +29,7 @@ def extract_blank_maps(working_directory, project_name, message_callback):
 
     floor_plans_json = load_json(project_dir, 'floorPlans.json', message_callback)
 
-    for floor in floor_plans_json['floorPlans']:
+    def decode_floor(floor):
         floor_id = vector_source_check(floor, message_callback)
         source_path = project_dir / f'image-{floor_id}'
         dest_path = output_dir / f"{floor['name']}.png"
@@ -36,9 +39,19 @@ def extract_blank_maps(working_directory, project_name, message_callback):
                 floor['cropMinX'], floor['cropMinY'],
                 floor['cropMaxX'], floor['cropMaxY']
             )
-            export_floor_plan(source_path, dest_path, crop_bitmap=crop_bitmap)
-        else:
-            shutil.copy(source_path, dest_path)
+            return dest_path, open_floor_plan(source_path, crop_bitmap=crop_bitmap)
+
+        shutil.copy(source_path, dest_path)
+        return dest_path, None
+
+    # Blank maps are always lossless PNG, whatever the project profile asks of the annotated maps
+    with MapEncoder(get_map_encoding_options(None), message_callback) as map_encoder:
+        # Copy / crop the next floor while the previous cropped floor is encoded
+        for floor, (dest_path, cropped_floor_plan) in render_pipeline(floor_plans_json['floorPlans'], decode_floor):
+            exported_message = f"{nl}Exported blank map for {floor['name']} to:{nl}{dest_path}{nl}"
+            if cropped_floor_plan is not None:
+                map_encoder.save(cropped_floor_plan, dest_path, exported_message)
+            else:
+                wx.CallAfter(message_callback, exported_message)
 
-        wx.CallAfter(message_callback, f"{nl}Exported blank map for {floor['name']} to:{nl}{dest_path}{nl}")
     wx.CallAfter(message_callback, PROCESS_COMPLETE)
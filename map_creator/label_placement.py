@@ -0,0 +1,231 @@
+# label_placement.py
+
+"""
+AP name label collision avoidance.
+
+scene.py places every label directly beneath its AP icon, on dense floors
+(lecture theatres, stadium bowls) those labels pile up on top of each other.
+place_labels() runs a greedy placement over a floor scene: each label tries a
+ring of candidate positions around its icon, nearest first, and takes the first
+one that does not overlap an already placed label or another AP icon.
+Labels that end up displaced away from their icon get a leader line.
+
+Overlap tests go through a uniform grid spatial index, so each candidate check
+only looks at the handful of rectangles in neighbouring cells, the whole floor
+stays near-linear in the number of APs.
+"""
+
+import math
+
+from instrumentation import timed
+
+# Candidate directions around the icon, in order of preference after the default position
+# (dx, dy) unit steps, the label box is aligned to that side of the icon
+CANDIDATE_DIRECTIONS = (
+    (0, -1),  # above
+    (1, 0),  # right
+    (-1, 0),  # left
+    (1, 1),  # below right
+    (-1, 1),  # below left
+    (1, -1),  # above right
+    (-1, -1),  # above left
+)
+
+# Number of additional rings pushed further out from the icon, each ring is one label height further away
+CANDIDATE_RINGS = 3
+
+# Fraction of the icon box treated as an obstacle, the icon artwork does not fill its square
+ICON_OBSTACLE_FACTOR = 0.8
+
+
+class SpatialGrid:
+    """Uniform grid hash of axis aligned rectangles (left, upper, right, lower)."""
+
+    def __init__(self, cell_size):
+        self.cell_size = max(1.0, cell_size)
+        self.cells = {}
+        self.rects = []
+        self.owners = []
+
+    def cell_range(self, rect):
+        left, upper, right, lower = rect
+        size = self.cell_size
+        return range(int(left // size), int(right // size) + 1), range(int(upper // size), int(lower // size) + 1)
+
+    def insert(self, rect, owner=None):
+        index = len(self.rects)
+        self.rects.append(rect)
+        self.owners.append(owner)
+
+        columns, rows = self.cell_range(rect)
+        for column in columns:
+            for row in rows:
+                self.cells.setdefault((column, row), []).append(index)
+
+    def overlap_area(self, rect, ignore_owner=None):
+        """Total area of rect overlapped by indexed rectangles, 0 means the position is free."""
+        seen = set()
+        total = 0.0
+        columns, rows = self.cell_range(rect)
+
+        for column in columns:
+            for row in rows:
+                for index in self.cells.get((column, row), ()):
+                    if index in seen:
+                        continue
+                    seen.add(index)
+
+                    if ignore_owner is not None and self.owners[index] == ignore_owner:
+                        continue
+
+                    total += intersection_area(rect, self.rects[index])
+
+        return total
+
+
+def intersection_area(a, b):
+    width = min(a[2], b[2]) - max(a[0], b[0])
+    height = min(a[3], b[3]) - max(a[1], b[1])
+    if width <= 0 or height <= 0:
+        return 0.0
+    return width * height
+
+
+def out_of_bounds_area(rect, image_size):
+    if image_size is None:
+        return 0.0
+
+    width, height = image_size
+    inside = intersection_area(rect, (0, 0, width, height))
+    return (rect[2] - rect[0]) * (rect[3] - rect[1]) - inside
+
+
+def candidate_boxes(item):
+    """
+    Yield (box, displaced) candidates for an item label, nearest first.
+    The default position beneath the icon always comes first.
+    """
+    label = item['label']
+    x, y = item['x'], item['y']
+    x1, y1, x2, y2 = label['box']
+    width, height = x2 - x1, y2 - y1
+
+    yield label['box'], False
+
+    # Distance from icon centre to the label edge, matches the default offset beneath the icon
+    gap = y1 - y
+
+    for ring in range(CANDIDATE_RINGS + 1):
+        distance = gap + ring * height
+        displaced = ring > 0
+
+        for dx, dy in CANDIDATE_DIRECTIONS:
+            if dx == 0:
+                left = x - width / 2
+            elif dx > 0:
+                left = x + distance
+            else:
+                left = x - distance - width
+
+            if dy == 0:
+                upper = y - height / 2
+            elif dy > 0:
+                upper = y + distance
+            else:
+                upper = y - distance - height
+
+            yield (left, upper, left + width, upper + height), displaced
+
+        if displaced:
+            # The default position, pushed further down
+            yield (x1, y1 + ring * height, x2, y2 + ring * height), True
+
+
+def icon_box(item):
+    half = item['icon_size'] / 2 * ICON_OBSTACLE_FACTOR
+    return item['x'] - half, item['y'] - half, item['x'] + half, item['y'] + half
+
+
+def move_label(item, box, displaced):
+    """Move the label (and its text anchor) to box, adding a leader line when displaced from the icon."""
+    label = item['label']
+    old_x1, old_y1, _, _ = label['box']
+    anchor_x, anchor_y = label['anchor']
+
+    left, upper, right, lower = box
+    label['box'] = box
+    label['anchor'] = ((left + right) / 2, upper + (anchor_y - old_y1))
+
+    label['leader'] = leader_line(item, box) if displaced else None
+
+    # Keep the item bounds valid for the windowed backend
+    bounds = item['bounds']
+    item['bounds'] = (min(bounds[0], left), min(bounds[1], upper), max(bounds[2], right), max(bounds[3], lower))
+
+
+def leader_line(item, box):
+    """Line from the edge of the AP icon to the nearest point of the label box."""
+    x, y = item['x'], item['y']
+    left, upper, right, lower = box
+
+    target_x = min(max(x, left), right)
+    target_y = min(max(y, upper), lower)
+
+    distance = math.hypot(target_x - x, target_y - y)
+    if distance == 0:
+        return None
+
+    start_offset = item['icon_size'] / 2 * ICON_OBSTACLE_FACTOR
+    if distance <= start_offset:
+        return None
+
+    start = (x + (target_x - x) * start_offset / distance, y + (target_y - y) * start_offset / distance)
+    return start, (target_x, target_y)
+
+
+@timed()
+def place_labels(scene, image_size=None):
+    """
+    Resolve label collisions for a floor scene in place, scene items keep their order.
+    Returns the number of labels moved away from their default position.
+    """
+    scene = list(scene)
+    if not scene:
+        return 0
+
+    label_heights = sorted(item['label']['box'][3] - item['label']['box'][1] for item in scene)
+    label_widths = sorted(item['label']['box'][2] - item['label']['box'][0] for item in scene)
+    median_height = label_heights[len(label_heights) // 2]
+    median_width = label_widths[len(label_widths) // 2]
+
+    # Cells roughly one label wide keep each query to a few cells
+    grid = SpatialGrid(max(median_width, median_height * 2))
+
+    # Every AP icon is an obstacle to every label but its own
+    for index, item in enumerate(scene):
+        grid.insert(icon_box(item), owner=index)
+
+    moved = 0
+
+    for index, item in enumerate(scene):
+        item['label'].setdefault('leader', None)
+
+        best_box, best_displaced, best_cost = None, False, None
+
+        for box, displaced in candidate_boxes(item):
+            cost = grid.overlap_area(box, ignore_owner=index) + out_of_bounds_area(box, image_size)
+
+            if cost == 0:
+                best_box, best_displaced, best_cost = box, displaced, 0
+                break
+
+            if best_cost is None or cost < best_cost:
+                best_box, best_displaced, best_cost = box, displaced, cost
+
+        if best_box != item['label']['box']:
+            move_label(item, best_box, best_displaced)
+            moved += 1
+
+        grid.insert(best_box, owner=index)
+
+    return moved
@@ -5,16 +5,17 @@ import wx
 import math
 import shutil
 import platform
+import threading
 from pathlib import Path
+from collections import namedtuple
 from PIL import Image, ImageDraw, ImageFont
 
-from common import ekahau_color_dict
-from common import model_antenna_split
-from common import FIVE_GHZ_RADIO_ID
-
 from common import OVERSIZE_MAP_LIMIT
+from common import get_shared_data_cache
 from common import nl
 
+from instrumentation import span, timed
+
 # Static PIL Parameters
 EDGE_BUFFER = 80  # gap between rounded rectangle and cropped image edge
 OPACITY = 0.5  # Value from 0 -> 1, defines the opacity of the 'other' APs on zoomed AP images
@@ -35,6 +36,69 @@ def set_font(font_size):
         return ImageFont.truetype(MACOS_FONT, font_size)
 
 
+def decode_floor_image(path):
+    with span('image decode', file=path.name):
+        image = Image.open(path)
+        image.load()  # Decode now, the image may be shared between threads, and so the decode is timed here
+    return image
+
+
+def decoded_image_bytes(image):
+    return image.width * image.height * len(image.getbands())
+
+
+def load_floor_image(project_dir, floor_id):
+    """
+    Open the floor plan image-<id> file.
+    Within shared_project_data() the decoded image is shared between actions, callers must copy / convert before drawing on it.
+    The shared cache holds decoded images up to its byte budget, so memory does not grow with the number of floors.
+    """
+    path = Path(project_dir) / ('image-' + floor_id)
+    shared_data_cache = get_shared_data_cache()
+    if shared_data_cache is not None:
+        return shared_data_cache.get_or_load(path, decode_floor_image, size_of=decoded_image_bytes)
+    return decode_floor_image(path)
+
+
+FloorImageInfo = namedtuple('FloorImageInfo', ['width', 'height', 'mode', 'format', 'file_size'])
+
+# Header details of every floor image read so far, keyed by path, modification time and size
+_floor_image_info_cache = {}
+_floor_image_info_lock = threading.Lock()
+
+
+def read_floor_image_info(path):
+    """Read only the image header for the dimensions, mode and format, the pixel data is never decoded."""
+    path = Path(path)
+    stat = path.stat()
+    key = (str(path), stat.st_mtime_ns, stat.st_size)
+
+    with _floor_image_info_lock:
+        if key in _floor_image_info_cache:
+            return _floor_image_info_cache[key]
+
+    with span('image header', file=path.name), Image.open(path) as image:
+        image_info = FloorImageInfo(image.width, image.height, image.mode, image.format, stat.st_size)
+
+    with _floor_image_info_lock:
+        _floor_image_info_cache[key] = image_info
+    return image_info
+
+
+def floor_image_index(project_dir, floor_plans_json):
+    """{image id: FloorImageInfo} for the imageId and bitmapImageId of every floor, missing images are left out."""
+    index = {}
+    for floor in floor_plans_json['floorPlans']:
+        for image_id in (floor.get('imageId'), floor.get('bitmapImageId')):
+            if image_id is None or image_id in index:
+                continue
+            try:
+                index[image_id] = read_floor_image_info(Path(project_dir) / ('image-' + image_id))
+            except (OSError, ValueError):
+                continue
+    return index
+
+
 def get_rrect_text_border_space(font_size):
     return (font_size // 3) + 2
 
@@ -48,17 +112,6 @@ def vector_source_check(floor, message_callback):
         return floor['imageId']
 
 
-def get_ap_icon(ap, custom_ap_icon_size):
-    # Get the AP icon colour
-    ap_color_hex = ap.get('color', '#FFFFFF')
-    ap_color = ekahau_color_dict.get(ap_color_hex)
-
-    # Import ekahau style custom
-    spot = Image.open(ASSETS_DIR / 'ekahau_style' / f'ekahau-AP-{ap_color}.png')
-
-    return spot.resize((custom_ap_icon_size, custom_ap_icon_size))
-
-
 def get_y_offset(arrow, angle):
     arrow_length = arrow.height / 2
     default_y_offset = arrow.height / 4
@@ -90,6 +143,7 @@ def text_width_and_height_getter(text, font_size):
     return width, height
 
 
+@timed()
 def crop_assessment(floor, source_floor_plan_image, project_dir, floor_id, blank_plan_dir):
     # Check if the floor plan has been cropped within Ekahau?
     crop_bitmap = (floor['cropMinX'], floor['cropMinY'], floor['cropMaxX'], floor['cropMaxY'])
@@ -107,7 +161,8 @@ def crop_assessment(floor, source_floor_plan_image, project_dir, floor_id, blank
         # save a blank copy of the cropped floor plan
         cropped_blank_map = source_floor_plan_image.copy()
         cropped_blank_map = cropped_blank_map.crop(crop_bitmap)
-        cropped_blank_map.save(Path(blank_plan_dir / floor['name']).with_suffix('.png'))
+        with span('png encode', file=floor['name']):
+            cropped_blank_map.save(Path(blank_plan_dir / floor['name']).with_suffix('.png'))
 
         # set boolean value
         map_cropped_within_ekahau = True
@@ -145,164 +200,7 @@ def oversize_map_check(map_image, message_callback):
         wx.CallAfter(message_callback, f"{'#' * 20} WARNING {'#' * 20}{nl}Map is larger than {OVERSIZE_MAP_LIMIT} pixels.{nl}This may cause undesirable output artefacts.{nl}{'#' * 49}{nl}")
 
 
-def annotate_map(map_image, ap, scaling_ratio, custom_ap_icon_size, font_size, simulated_radio_dict, message_callback, floor_plans_dict):
-    font = set_font(font_size)
-    rrect_text_border_space = get_rrect_text_border_space(font_size)
-
-    ap_color = ap['color'] if 'color' in ap else 'FFFFFF'
-
-    # establish x and y
-    x, y = (ap['location']['coord']['x'] * scaling_ratio,
-            ap['location']['coord']['y'] * scaling_ratio)
-
-    wx.CallAfter(message_callback, f"{ap['name']} ({model_antenna_split(ap['model'])[0]}) ][ {floor_plans_dict.get(ap['location']['floorPlanId']).get('name')} ][ colour: {ekahau_color_dict.get(ap_color)} ][ coordinates {round(x)}, {round(y)}")
-
-    spot = get_ap_icon(ap, custom_ap_icon_size)
-
-    antenna_direction_angle = simulated_radio_dict[ap['id']][FIVE_GHZ_RADIO_ID]['antennaDirection']
-    antenna_tilt_angle = simulated_radio_dict[ap['id']][FIVE_GHZ_RADIO_ID]['antennaTilt']
-
-    arrow = Image.open(ASSETS_DIR / 'ekahau_style' / 'ekahau-AP-arrow.png')
-    arrow = arrow.resize((custom_ap_icon_size, custom_ap_icon_size))
-
-    # Calculate AP icon rounded rectangle offset value for text below the AP icon
-    y_offset = get_y_offset(arrow, antenna_direction_angle)
-
-    # Define the centre point of the spot
-    spot_centre_point = (spot.width // 2, spot.height // 2)
-
-    # Calculate the top-left corner of the icon based on the center point and x, y
-    top_left = (int(x) - spot_centre_point[0], int(y) - spot_centre_point[1])
-
-    # Paste the arrow onto the floor plan at the calculated location
-    map_image.paste(spot, top_left, mask=spot)
-
-    antenna_mounting = simulated_radio_dict[ap['id']][FIVE_GHZ_RADIO_ID]['antennaMounting']
-
-    if antenna_mounting == 'WALL' or antenna_tilt_angle != 0:
-        wx.CallAfter(message_callback, f'AP directional arrow is considered relevant')
-
-        if antenna_mounting == 'WALL':
-            wx.CallAfter(message_callback, f'AP is WALL mounted')
-
-        if antenna_tilt_angle != 0:
-            wx.CallAfter(message_callback, f'AP has antenna tilt angle of: {round(antenna_tilt_angle)}')
-
-        rotated_arrow = arrow.rotate(-antenna_direction_angle, expand=True)
-
-        # Define the centre point of the rotated icon
-        rotated_arrow_centre_point = (rotated_arrow.width // 2, rotated_arrow.height // 2)
-
-        # Calculate the top-left corner of the icon based on the center point and x, y
-        top_left = (int(x) - rotated_arrow_centre_point[0], int(y) - rotated_arrow_centre_point[1])
-
-        # draw the rotated arrow onto the floor plan
-        map_image.paste(rotated_arrow, top_left, mask=rotated_arrow)
-
-    # Calculate the height and width of the AP Name rounded rectangle
-    text_width, text_height = text_width_and_height_getter(ap['name'], font_size)
-
-    # Establish coordinates for the rounded rectangle
-    x1 = x - (text_width / 2) - rrect_text_border_space
-    y1 = y + y_offset
-
-    x2 = x + (text_width / 2) + rrect_text_border_space
-    y2 = y + y_offset + text_height + (rrect_text_border_space * 2)
-
-    r = (y2 - y1) / 3
-
-    # Create ImageDraw object for ALL APs Placement map
-    draw_map_image = ImageDraw.Draw(map_image)
-
-    # draw the rounded rectangle for 'AP Name'
-    draw_map_image.rounded_rectangle((x1, y1, x2, y2), r, fill='white', outline='black', width=2)
-
-    # draw the text for 'AP Name'
-    draw_map_image.text((x, y + y_offset + rrect_text_border_space), ap['name'], anchor='mt', fill='black', font=font)
-
-    return map_image
-
-
-def annotate_pds_map(map_image, ap, scaling_ratio, custom_ap_icon_size, font_size, simulated_radio_dict, message_callback, floor_plans_dict):
-    font = set_font(font_size)
-    rrect_text_border_space = get_rrect_text_border_space(font_size)
-
-    ap_color = ap['color'] if 'color' in ap else 'FFFFFF'
-
-    # establish x and y
-    x, y = (ap['location']['coord']['x'] * scaling_ratio,
-            ap['location']['coord']['y'] * scaling_ratio)
-
-    wx.CallAfter(message_callback, f"{ap['name']} ({model_antenna_split(ap['model'])[0]}) ][ {floor_plans_dict.get(ap['location']['floorPlanId']).get('name')} ][ colour: {ekahau_color_dict.get(ap_color)} ][ coordinates {round(x)}, {round(y)}")
-
-    spot = Image.open(ASSETS_DIR / 'custom' / 'spot.png')
-    spot = spot.resize((custom_ap_icon_size, custom_ap_icon_size))
-
-    antenna_direction_angle = simulated_radio_dict[ap['id']][FIVE_GHZ_RADIO_ID]['antennaDirection']
-    antenna_tilt_angle = simulated_radio_dict[ap['id']][FIVE_GHZ_RADIO_ID]['antennaTilt']
-
-    arrow = Image.open(ASSETS_DIR / 'custom' / 'overlay-arrow.png')
-    arrow = arrow.resize((custom_ap_icon_size, custom_ap_icon_size))
-
-    # Calculate AP icon rounded rectangle offset value for text below the AP icon
-    y_offset = get_y_offset(arrow, antenna_direction_angle)
-
-    # Define the centre point of the spot
-    spot_centre_point = (spot.width // 2, spot.height // 2)
-
-    # Calculate the top-left corner of the icon based on the center point and x, y
-    top_left = (int(x) - spot_centre_point[0], int(y) - spot_centre_point[1])
-
-    # Paste the arrow onto the floor plan at the calculated location
-    map_image.paste(spot, top_left, mask=spot)
-
-    antenna_mounting = simulated_radio_dict[ap['id']][FIVE_GHZ_RADIO_ID]['antennaMounting']
-
-    if antenna_mounting == 'WALL' or antenna_tilt_angle != 0:
-        wx.CallAfter(message_callback, f'AP directional arrow is considered relevant')
-
-        if antenna_mounting == 'WALL':
-            wx.CallAfter(message_callback, f'AP is WALL mounted')
-
-        if antenna_tilt_angle != 0:
-            wx.CallAfter(message_callback, f'AP has antenna tilt angle of: {round(antenna_tilt_angle)}')
-
-        rotated_arrow = arrow.rotate(-antenna_direction_angle, expand=True)
-
-        # Define the centre point of the rotated icon
-        rotated_arrow_centre_point = (rotated_arrow.width // 2, rotated_arrow.height // 2)
-
-        # Calculate the top-left corner of the icon based on the center point and x, y
-        top_left = (int(x) - rotated_arrow_centre_point[0], int(y) - rotated_arrow_centre_point[1])
-
-        # draw the rotated arrow onto the floor plan
-        map_image.paste(rotated_arrow, top_left, mask=rotated_arrow)
-
-
-    # Calculate the height and width of the AP Name rounded rectangle
-    text_width, text_height = text_width_and_height_getter(ap['name'], font_size)
-
-    # Establish coordinates for the rounded rectangle
-    x1 = x - (text_width / 2) - rrect_text_border_space
-    y1 = y + y_offset
-
-    x2 = x + (text_width / 2) + rrect_text_border_space
-    y2 = y + y_offset + text_height + (rrect_text_border_space * 2)
-
-    r = (y2 - y1) / 3
-
-    # Create ImageDraw object for ALL APs Placement map
-    draw_map_image = ImageDraw.Draw(map_image)
-
-    # draw the rounded rectangle for 'AP Name'
-    draw_map_image.rounded_rectangle((x1, y1, x2, y2), r, fill=ap_color, outline='black', width=2)
-
-    # draw the text for 'AP Name'
-    draw_map_image.text((x, y + y_offset + rrect_text_border_space), ap['name'], anchor='mt', fill='black', font=font)
-
-    return map_image
-
-
+@timed()
 def add_project_filename_to_map(map_image, font_size, project_filename):
     """
     Adds the project filename to the bottom-left corner of the map image.
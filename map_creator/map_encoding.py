@@ -0,0 +1,159 @@
+# map_encoding.py
+
+"""
+Shared output encoding for the generated map images.
+
+PNG encoding of a large annotated floor plan can take as long as rendering it,
+the map creators therefore hand each finished image to a MapEncoder which
+prepares it (drop an unused alpha channel, optional adaptive palette) and saves
+it on a background thread, while the next floor / AP is being rendered.
+
+When the selected project profile defines 'map_encoding_options' they are
+merged with the defaults below, e.g.
+map_encoding_options = {'compress_level': 1, 'quantize': True}
+"""
+
+import threading
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+import wx
+from PIL import Image
+
+from common import nl
+from common import ERROR
+
+from instrumentation import span
+from instrumentation import in_current_run
+
+DEFAULT_MAP_ENCODING_OPTIONS = {
+    'format': 'PNG',  # 'PNG', 'WEBP' or 'JPEG'
+    'compress_level': 6,  # PNG zlib level 0-9, 1 is several times faster than 6 for slightly larger files
+    'quantize': False,  # PNG only, reduce to an adaptive palette, much smaller files for line drawings
+    'colours': 256,  # Palette size when quantizing
+    'drop_alpha': True,  # Write RGB when every pixel of the map is fully opaque
+    'quality': 90,  # WebP / JPEG quality
+    'background_encoding': True,  # Encode on a worker thread, overlapping with rendering of the next image
+    'max_pending': 2,  # Images queued for encoding before the renderer waits, bounds memory use
+}
+
+FORMAT_EXTENSIONS = {
+    'PNG': '.png',
+    'WEBP': '.webp',
+    'JPEG': '.jpg',
+}
+
+
+def get_map_encoding_options(project_profile_module):
+    """Merge the project profile 'map_encoding_options' with the defaults."""
+    options = dict(DEFAULT_MAP_ENCODING_OPTIONS)
+    options.update(getattr(project_profile_module, 'map_encoding_options', None) or {})
+
+    options['format'] = options['format'].upper()
+    if options['format'] == 'JPG':
+        options['format'] = 'JPEG'
+    if options['format'] not in FORMAT_EXTENSIONS:
+        raise ValueError(f"Unsupported map encoding format: {options['format']}, use one of {tuple(FORMAT_EXTENSIONS)}")
+
+    return options
+
+
+def prepare_map_image(image, options):
+    """Return a copy of the image in the cheapest mode that the output format can represent without loss of content."""
+    if image.mode == 'RGBA':
+        if options['format'] == 'JPEG':
+            # JPEG has no alpha channel, flatten any transparency onto white
+            background = Image.new('RGB', image.size, 'white')
+            background.paste(image, mask=image.getchannel('A'))
+            image = background
+        elif options['drop_alpha'] and image.getchannel('A').getextrema() == (255, 255):
+            image = image.convert('RGB')
+
+    if options['format'] == 'PNG' and options['quantize'] and image.mode in ('RGB', 'RGBA'):
+        with span('quantize', colours=options['colours']):
+            image = image.quantize(colors=options['colours'], method=Image.Quantize.FASTOCTREE, dither=Image.Dither.NONE)
+
+    return image
+
+
+def encode_map_image(image, output_path, options):
+    """Prepare and save a single map image, output_path must already carry the extension for the format."""
+    with span('map encode', file=Path(output_path).name, format=options['format']):
+        image = prepare_map_image(image, options)
+
+        if options['format'] == 'PNG':
+            image.save(output_path, 'PNG', compress_level=options['compress_level'])
+        else:
+            image.save(output_path, options['format'], quality=options['quality'])
+
+
+class MapEncoder:
+    """
+    Saves map images on a single background thread, save() may be called from several render workers.
+    Images handed to save() must not be modified by the caller afterwards.
+    allowed_formats restricts the output for maps consumed by other tools, e.g. the PDS project expects PNG.
+    """
+
+    def __init__(self, options, message_callback, allowed_formats=None):
+        self.options = dict(options)
+        self.message_callback = message_callback
+
+        if allowed_formats is not None and self.options['format'] not in allowed_formats:
+            wx.CallAfter(message_callback, f"{self.options['format']} is not supported for these maps, saving as PNG")
+            self.options['format'] = 'PNG'
+
+        self.executor = None
+        if self.options['background_encoding']:
+            self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='map-encoder')
+        self.pending = threading.BoundedSemaphore(max(1, self.options['max_pending']))
+        self.futures = []
+
+    def output_path(self, path):
+        return Path(path).with_suffix(FORMAT_EXTENSIONS[self.options['format']])
+
+    def save(self, image, path, saved_message=None):
+        """Queue the image for encoding, saved_message is logged once the file has been written."""
+        output_path = self.output_path(path)
+
+        if self.executor is None:
+            self._encode(image, output_path, saved_message)
+            return output_path
+
+        # Wait for a free slot, so a fast renderer cannot queue an unbounded number of full size images
+        self.pending.acquire()
+        try:
+            self.futures.append(self.executor.submit(in_current_run(self._encode), image, output_path, saved_message, release=True))
+        except RuntimeError:
+            self.pending.release()
+            raise
+        return output_path
+
+    def _encode(self, image, output_path, saved_message, release=False):
+        try:
+            encode_map_image(image, output_path, self.options)
+            if saved_message is not None:
+                wx.CallAfter(self.message_callback, saved_message)
+        finally:
+            if release:
+                self.pending.release()
+
+    def close(self):
+        """Wait for every queued image, log any failures and return the number of images that could not be saved."""
+        failures = 0
+        if self.executor is not None:
+            for future in self.futures:
+                exception = future.exception()
+                if exception is not None:
+                    failures += 1
+                    wx.CallAfter(self.message_callback, ERROR)
+                    wx.CallAfter(self.message_callback, f"Failure attempting to save a map image{nl}{exception}")
+            self.executor.shutdown(wait=True)
+            self.futures = []
+        return failures
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
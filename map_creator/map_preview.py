@@ -0,0 +1,215 @@
+# map_preview.py
+
+"""
+Reduced resolution previews of the AP location and PDS maps.
+
+The floor plan is decoded at (about) screen resolution, JPEG floor plans via
+PIL draft() so only the DCT scaled data is decoded, everything else via reduce().
+AP icon and name label sizes are scaled by the same factor, so the preview is a
+faithful miniature of the full resolution map. The decoded floors are kept by
+MapPreviewDialog, changing the icon / label sizes only redraws the AP layer.
+"""
+
+import math
+from pathlib import Path
+
+import wx
+from PIL import Image
+
+from common import load_json
+from common import create_simulated_radios_dict
+
+from map_creator.map_creator_comon import add_project_filename_to_map
+from map_creator.scene import EKAHAU_STYLE, PDS_STYLE, build_ap_scene_item, render_scene_raster
+from map_creator.label_placement import place_labels
+from map_creator import create_ap_location_maps
+from map_creator import create_pds_maps
+
+from instrumentation import span
+
+# Longest edge of the preview image in pixels
+PREVIEW_MAX_DIMENSION = 1600
+
+# Preview name: (map style, icon size adjuster, crop to the Ekahau crop)
+PREVIEW_MAP_TYPES = {
+    'AP Location Maps': (EKAHAU_STYLE, create_ap_location_maps.CUSTOM_AP_ICON_SIZE_ADJUSTER, True),
+    'PDS Maps': (PDS_STYLE, create_pds_maps.CUSTOM_AP_ICON_SIZE_ADJUSTER, False),
+}
+
+
+def decode_floor_image_preview(path, max_dimension=PREVIEW_MAX_DIMENSION):
+    """Decode a floor plan (path or binary file) with its longest edge at most max_dimension, returns (image, preview scale)."""
+    with span('preview decode', file=Path(getattr(path, 'name', path)).name), Image.open(path) as image:
+        full_width = image.width
+
+        # JPEG floor plans decode straight to a 1/2, 1/4 or 1/8 scale
+        image.draft('RGB', (max(1, image.width * max_dimension // max(image.size)), max(1, image.height * max_dimension // max(image.size))))
+
+        # reduce() raises for palette, bilevel and 16 bit images and averages palette indices, convert those first
+        if image.mode not in ('L', 'RGB', 'RGBA'):
+            image = image.convert('RGBA')
+
+        factor = math.ceil(max(image.size) / max_dimension)
+        if factor > 1:
+            image = image.reduce(factor)
+        else:
+            image.load()
+
+        if image.mode != 'RGBA':
+            image = image.convert('RGBA')
+
+    return image, image.width / full_width
+
+
+def render_map_preview(floor_preview, floor, aps_on_this_floor, simulated_radio_dict, ap_icon_size, ap_name_label_size, project_name, map_type='AP Location Maps'):
+    """Draw the AP layer onto a copy of a decoded preview floor, icon and label sizes are the full resolution values."""
+    preview_image, preview_scale = floor_preview
+    style, icon_size_adjuster, apply_ekahau_crop = PREVIEW_MAP_TYPES[map_type]
+
+    custom_ap_icon_size = max(1, int(ap_icon_size * icon_size_adjuster * preview_scale))
+    font_size = max(1, round(ap_name_label_size * preview_scale))
+    scaling_ratio = preview_image.width / floor['width']
+
+    floor_scene = [build_ap_scene_item(ap, scaling_ratio, custom_ap_icon_size, font_size, simulated_radio_dict, style) for ap in aps_on_this_floor]
+    place_labels(floor_scene, preview_image.size)
+    map_image = render_scene_raster(preview_image.copy(), floor_scene)
+
+    crop_bitmap = (floor['cropMinX'], floor['cropMinY'], floor['cropMaxX'], floor['cropMaxY'])
+    if apply_ekahau_crop and crop_bitmap != (0.0, 0.0, floor['width'], floor['height']):
+        map_image = map_image.crop(tuple(edge * scaling_ratio for edge in crop_bitmap))
+
+    return add_project_filename_to_map(map_image, font_size, project_name)
+
+
+class MapPreviewDialog(wx.Dialog):
+    """Preview the AP icon / name label sizes on a reduced resolution map before creating the full resolution maps."""
+    def __init__(self, parent, working_directory, project_name, ap_icon_size, ap_name_label_size):
+        super().__init__(parent, title="Map Preview", size=(1100, 850), style=wx.DEFAULT_DIALOG_STYLE | wx.RESIZE_BORDER)
+        self.project_name = project_name
+        self.project_dir = Path(working_directory) / project_name
+        self.message_callback = parent.append_message
+
+        floor_plans_json = load_json(self.project_dir, 'floorPlans.json', self.message_callback)
+        access_points_json = load_json(self.project_dir, 'accessPoints.json', self.message_callback)
+        simulated_radios_json = load_json(self.project_dir, 'simulatedRadios.json', self.message_callback)
+
+        self.floors = {floor['name']: floor for floor in floor_plans_json['floorPlans']}
+        self.access_points = sorted(access_points_json['accessPoints'], key=lambda i: i['name'])
+        self.simulated_radio_dict = create_simulated_radios_dict(simulated_radios_json)
+        self.floor_previews = {}  # Decoded preview floors, by floor name
+
+        self.init_ui(ap_icon_size, ap_name_label_size)
+        self.update_preview()
+
+    def init_ui(self, ap_icon_size, ap_name_label_size):
+        """Initialize the user interface."""
+        self.panel = wx.Panel(self)
+
+        self.floor_choice = wx.Choice(self.panel, choices=sorted(self.floors))
+        self.floor_choice.SetSelection(0)
+        self.floor_choice.Bind(wx.EVT_CHOICE, self.on_settings_change)
+
+        self.map_type_choice = wx.Choice(self.panel, choices=list(PREVIEW_MAP_TYPES))
+        self.map_type_choice.SetSelection(0)
+        self.map_type_choice.Bind(wx.EVT_CHOICE, self.on_settings_change)
+
+        self.ap_icon_size_label = wx.StaticText(self.panel, label="AP Icon Size:")
+        self.ap_icon_size_text_box = wx.TextCtrl(self.panel, value=str(ap_icon_size), style=wx.TE_PROCESS_ENTER)
+        self.ap_icon_size_text_box.Bind(wx.EVT_TEXT_ENTER, self.on_settings_change)
+
+        self.ap_name_label_size_label = wx.StaticText(self.panel, label="AP Name Label Size:")
+        self.ap_name_label_size_text_box = wx.TextCtrl(self.panel, value=str(ap_name_label_size), style=wx.TE_PROCESS_ENTER)
+        self.ap_name_label_size_text_box.Bind(wx.EVT_TEXT_ENTER, self.on_settings_change)
+
+        self.update_button = wx.Button(self.panel, label="Update")
+        self.update_button.Bind(wx.EVT_BUTTON, self.on_settings_change)
+
+        self.scrolled_window = wx.ScrolledWindow(self.panel)
+        self.scrolled_window.SetScrollRate(20, 20)
+        self.preview_bitmap = wx.StaticBitmap(self.scrolled_window)
+
+        self.status_label = wx.StaticText(self.panel, label="")
+
+        self.create_button = wx.Button(self.panel, label="Create Full Resolution Maps")
+        self.create_button.Bind(wx.EVT_BUTTON, self.on_create)
+        self.create_button.SetToolTip(wx.ToolTip("Apply these sizes and create the selected maps at full resolution"))
+
+        self.dismiss_button = wx.Button(self.panel, label='Dismiss')
+        self.dismiss_button.Bind(wx.EVT_BUTTON, lambda event: self.EndModal(wx.ID_CANCEL))
+
+        settings_row = wx.BoxSizer(wx.HORIZONTAL)
+        settings_row.Add(self.floor_choice, 0, wx.ALL, 5)
+        settings_row.Add(self.map_type_choice, 0, wx.ALL, 5)
+        settings_row.Add(self.ap_icon_size_label, 0, wx.ALL | wx.ALIGN_CENTER_VERTICAL, 5)
+        settings_row.Add(self.ap_icon_size_text_box, 0, wx.ALL | wx.ALIGN_CENTER_VERTICAL, 5)
+        settings_row.Add(self.ap_name_label_size_label, 0, wx.ALL | wx.ALIGN_CENTER_VERTICAL, 5)
+        settings_row.Add(self.ap_name_label_size_text_box, 0, wx.ALL | wx.ALIGN_CENTER_VERTICAL, 5)
+        settings_row.Add(self.update_button, 0, wx.ALL, 5)
+
+        exit_row = wx.BoxSizer(wx.HORIZONTAL)
+        exit_row.Add(self.status_label, 0, wx.ALL | wx.ALIGN_CENTER_VERTICAL, 5)
+        exit_row.AddStretchSpacer()
+        exit_row.Add(self.create_button, 0, wx.ALL, 5)
+        exit_row.Add(self.dismiss_button, 0, wx.ALL, 5)
+
+        main_sizer = wx.BoxSizer(wx.VERTICAL)
+        main_sizer.Add(settings_row, 0, wx.EXPAND)
+        main_sizer.Add(self.scrolled_window, 1, wx.EXPAND | wx.ALL, 5)
+        main_sizer.Add(exit_row, 0, wx.EXPAND)
+
+        self.panel.SetSizer(main_sizer)
+        self.Centre()
+
+    def get_sizes(self):
+        """Return (ap_icon_size, ap_name_label_size) as entered, or None when either is not a valid number."""
+        try:
+            return int(self.ap_icon_size_text_box.GetValue()), int(self.ap_name_label_size_text_box.GetValue())
+        except ValueError:
+            wx.MessageBox("Please enter a valid number", "Error", wx.OK | wx.ICON_ERROR)
+            return None
+
+    def get_floor_preview(self, floor):
+        if floor['name'] not in self.floor_previews:
+            floor_id = floor['bitmapImageId'] if 'bitmapImageId' in floor else floor['imageId']
+            self.floor_previews[floor['name']] = decode_floor_image_preview(self.project_dir / ('image-' + floor_id))
+        return self.floor_previews[floor['name']]
+
+    def update_preview(self):
+        sizes = self.get_sizes()
+        if sizes is None:
+            return
+
+        floor = self.floors[self.floor_choice.GetStringSelection()]
+        map_type = self.map_type_choice.GetStringSelection()
+        aps_on_this_floor = [ap for ap in self.access_points if ap['location']['floorPlanId'] == floor['id']]
+
+        with wx.BusyCursor():
+            floor_preview = self.get_floor_preview(floor)
+            preview_image = render_map_preview(floor_preview, floor, aps_on_this_floor, self.simulated_radio_dict, *sizes, self.project_name, map_type)
+            preview_image = preview_image.convert('RGB')
+            self.preview_bitmap.SetBitmap(wx.Bitmap.FromBuffer(preview_image.width, preview_image.height, preview_image.tobytes()))
+
+        self.scrolled_window.SetVirtualSize(preview_image.size)
+        self.status_label.SetLabel(f"{len(aps_on_this_floor)} APs, previewed at {floor_preview[1]:.0%} of full resolution")
+        self.panel.Layout()
+
+    def on_settings_change(self, event):
+        self.update_preview()
+
+    def on_create(self, event):
+        if self.get_sizes() is not None:
+            self.EndModal(wx.ID_OK)
+
+
+def preview_maps(parent, working_directory, project_name, ap_icon_size, ap_name_label_size):
+    """
+    Show the preview dialog, returns (map type, ap_icon_size, ap_name_label_size) when the user
+    asks for the full resolution maps, otherwise None.
+    """
+    dialog = MapPreviewDialog(parent, working_directory, project_name, ap_icon_size, ap_name_label_size)
+    try:
+        if dialog.ShowModal() != wx.ID_OK:
+            return None
+        return (dialog.map_type_choice.GetStringSelection(),) + dialog.get_sizes()
+    finally:
+        dialog.Destroy()
@@ -0,0 +1,235 @@
+# pdf_atlas.py
+
+"""
+Streaming multi-floor PDF atlas writer.
+
+Annotated floors are appended one at a time, straight from the map creator,
+each page embeds a single JPEG (DCTDecode) or zlib (FlateDecode) compressed image
+and is written to disk immediately, so memory stays at one floor at a time.
+Closing the atlas appends an AP index table and writes a bookmark per floor.
+
+The PDF is assembled by hand, no third party PDF library is required.
+"""
+
+import io
+import zlib
+from pathlib import Path
+
+from PIL import Image
+
+# Page geometry in PDF points (1/72 inch), A3
+A3_LONG_EDGE = 1190.55
+A3_SHORT_EDGE = 841.89
+PAGE_MARGIN = 28
+TITLE_BAND = 28
+TITLE_FONT_SIZE = 14
+
+# AP index table layout
+INDEX_FONT_SIZE = 9
+INDEX_ROW_HEIGHT = 13
+INDEX_COLUMNS = (('AP Name', 0), ('Model', 140), ('Floor', 280), ('Page', 500))
+
+IMAGE_ENCODINGS = ('flate', 'jpeg')
+
+# Reserved object numbers
+CATALOG_OBJ = 1
+PAGES_OBJ = 2
+OUTLINES_OBJ = 3
+FONT_OBJ = 4
+BOLD_FONT_OBJ = 5
+FIRST_FREE_OBJ = 6
+
+
+def pdf_string(text):
+    """Encode text as a PDF string, UTF-16BE hex so floor names survive any character set."""
+    return '<FEFF' + str(text).encode('utf-16-be').hex().upper() + '>'
+
+
+def pdf_literal(text):
+    """Escape text for a content stream Tj operator, content streams are written WinAnsi (cp1252) encoded."""
+    text = str(text)
+    return '(' + text.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)') + ')'
+
+
+class PdfAtlasWriter:
+    """Write annotated floor plans into a single PDF, one page per floor."""
+
+    def __init__(self, output_path, title, image_encoding='flate', jpeg_quality=85):
+        if image_encoding not in IMAGE_ENCODINGS:
+            raise ValueError(f"Unsupported atlas image encoding: {image_encoding}, use one of {IMAGE_ENCODINGS}")
+
+        self.output_path = Path(output_path)
+        self.title = title
+        self.image_encoding = image_encoding
+        self.jpeg_quality = jpeg_quality
+
+        self.file = open(self.output_path, 'wb')
+        self.offsets = {}
+        self.next_obj = FIRST_FREE_OBJ
+        self.page_objs = []
+        self.bookmarks = []  # (title, page_obj)
+        self.ap_index = []  # (ap name, model, floor name, page number)
+
+        self.file.write(b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def allocate(self):
+        obj = self.next_obj
+        self.next_obj += 1
+        return obj
+
+    def write_object(self, obj, body, stream=None):
+        self.offsets[obj] = self.file.tell()
+        self.file.write(f'{obj} 0 obj\n'.encode('latin-1'))
+        self.file.write(body.encode('latin-1'))
+        if stream is not None:
+            self.file.write(b'\nstream\n')
+            self.file.write(stream)
+            self.file.write(b'\nendstream')
+        self.file.write(b'\nendobj\n')
+
+    def encode_image(self, image):
+        """Return (filter, colour space, data) for the page image, alpha is flattened onto white."""
+        if image.mode in ('RGBA', 'LA', 'P'):
+            rgba = image.convert('RGBA')
+            flattened = Image.new('RGB', rgba.size, 'white')
+            flattened.paste(rgba, mask=rgba.getchannel('A'))
+            image = flattened
+        elif image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+
+        colour_space = '/DeviceGray' if image.mode == 'L' else '/DeviceRGB'
+
+        if self.image_encoding == 'jpeg':
+            buffer = io.BytesIO()
+            image.save(buffer, 'JPEG', quality=self.jpeg_quality, optimize=True)
+            return '/DCTDecode', colour_space, buffer.getvalue()
+
+        return '/FlateDecode', colour_space, zlib.compress(image.tobytes(), 6)
+
+    @staticmethod
+    def page_size(image_width, image_height):
+        if image_width >= image_height:
+            return A3_LONG_EDGE, A3_SHORT_EDGE
+        return A3_SHORT_EDGE, A3_LONG_EDGE
+
+    def add_floor(self, floor_name, image, aps=()):
+        """
+        Append one floor page, the image is encoded and written to disk before returning.
+        aps is an iterable of (AP name, model) tuples for the index table.
+        """
+        page_width, page_height = self.page_size(image.width, image.height)
+
+        # Fit the image beneath the title band, preserving aspect ratio
+        available_width = page_width - 2 * PAGE_MARGIN
+        available_height = page_height - 2 * PAGE_MARGIN - TITLE_BAND
+        scale = min(available_width / image.width, available_height / image.height)
+        draw_width = image.width * scale
+        draw_height = image.height * scale
+        draw_x = (page_width - draw_width) / 2
+        draw_y = PAGE_MARGIN + (available_height - draw_height) / 2
+
+        image_filter, colour_space, data = self.encode_image(image)
+
+        image_obj = self.allocate()
+        self.write_object(image_obj, f'<< /Type /XObject /Subtype /Image /Width {image.width} /Height {image.height} '
+                                     f'/ColorSpace {colour_space} /BitsPerComponent 8 /Filter {image_filter} /Length {len(data)} >>', data)
+        del data
+
+        content = (f'q {draw_width:.2f} 0 0 {draw_height:.2f} {draw_x:.2f} {draw_y:.2f} cm /Im0 Do Q\n'
+                   f'BT /F2 {TITLE_FONT_SIZE} Tf {PAGE_MARGIN} {page_height - PAGE_MARGIN - TITLE_FONT_SIZE} Td {pdf_literal(floor_name)} Tj ET\n'
+                   f'BT /F1 {INDEX_FONT_SIZE} Tf {page_width - PAGE_MARGIN - 200} {page_height - PAGE_MARGIN - TITLE_FONT_SIZE} Td {pdf_literal(self.title)} Tj ET\n')
+
+        page_obj = self.write_page(page_width, page_height, content, f'/XObject << /Im0 {image_obj} 0 R >>')
+
+        self.bookmarks.append((floor_name, page_obj))
+
+        page_number = len(self.page_objs)
+        for ap_name, model in aps:
+            self.ap_index.append((ap_name, model, floor_name, page_number))
+
+    def write_page(self, page_width, page_height, content, extra_resources=''):
+        content_bytes = zlib.compress(content.encode('cp1252', errors='replace'))
+        content_obj = self.allocate()
+        self.write_object(content_obj, f'<< /Length {len(content_bytes)} /Filter /FlateDecode >>', content_bytes)
+
+        page_obj = self.allocate()
+        self.write_object(page_obj, f'<< /Type /Page /Parent {PAGES_OBJ} 0 R /MediaBox [0 0 {page_width:.2f} {page_height:.2f}] '
+                                    f'/Resources << /Font << /F1 {FONT_OBJ} 0 R /F2 {BOLD_FONT_OBJ} 0 R >> {extra_resources} >> '
+                                    f'/Contents {content_obj} 0 R >>')
+        self.page_objs.append(page_obj)
+        return page_obj
+
+    def write_ap_index(self):
+        """Append the AP index table, as many A4 portrait pages as required."""
+        if not self.ap_index:
+            return
+
+        page_width, page_height = A3_SHORT_EDGE / 2 ** 0.5, A3_LONG_EDGE / 2 ** 0.5  # A4 portrait
+        top = page_height - PAGE_MARGIN - TITLE_FONT_SIZE
+        rows_per_page = int((top - PAGE_MARGIN - 2 * INDEX_ROW_HEIGHT) // INDEX_ROW_HEIGHT)
+
+        rows = sorted(self.ap_index, key=lambda row: (row[0], row[2]))
+        first_index_page = None
+
+        for start in range(0, len(rows), rows_per_page):
+            lines = [f'BT /F2 {TITLE_FONT_SIZE} Tf {PAGE_MARGIN} {top} Td {pdf_literal("AP Index")} Tj ET']
+
+            y = top - 2 * INDEX_ROW_HEIGHT
+            for heading, column_x in INDEX_COLUMNS:
+                lines.append(f'BT /F2 {INDEX_FONT_SIZE} Tf {PAGE_MARGIN + column_x} {y} Td {pdf_literal(heading)} Tj ET')
+
+            for ap_name, model, floor_name, page_number in rows[start:start + rows_per_page]:
+                y -= INDEX_ROW_HEIGHT
+                for value, (_, column_x) in zip((ap_name, model, floor_name, page_number), INDEX_COLUMNS):
+                    lines.append(f'BT /F1 {INDEX_FONT_SIZE} Tf {PAGE_MARGIN + column_x} {y} Td {pdf_literal(value)} Tj ET')
+
+            page_obj = self.write_page(page_width, page_height, '\n'.join(lines) + '\n')
+            if first_index_page is None:
+                first_index_page = page_obj
+
+        self.bookmarks.append(('AP Index', first_index_page))
+
+    def write_outlines(self):
+        outline_objs = [self.allocate() for _ in self.bookmarks]
+
+        for i, ((title, page_obj), outline_obj) in enumerate(zip(self.bookmarks, outline_objs)):
+            links = ''
+            if i > 0:
+                links += f' /Prev {outline_objs[i - 1]} 0 R'
+            if i < len(outline_objs) - 1:
+                links += f' /Next {outline_objs[i + 1]} 0 R'
+            self.write_object(outline_obj, f'<< /Title {pdf_string(title)} /Parent {OUTLINES_OBJ} 0 R /Dest [{page_obj} 0 R /Fit]{links} >>')
+
+        if outline_objs:
+            self.write_object(OUTLINES_OBJ, f'<< /Type /Outlines /First {outline_objs[0]} 0 R /Last {outline_objs[-1]} 0 R /Count {len(outline_objs)} >>')
+        else:
+            self.write_object(OUTLINES_OBJ, '<< /Type /Outlines /Count 0 >>')
+
+    def close(self):
+        if self.file.closed:
+            return
+
+        self.write_ap_index()
+        self.write_outlines()
+
+        kids = ' '.join(f'{obj} 0 R' for obj in self.page_objs)
+        self.write_object(PAGES_OBJ, f'<< /Type /Pages /Kids [{kids}] /Count {len(self.page_objs)} >>')
+        self.write_object(FONT_OBJ, '<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>')
+        self.write_object(BOLD_FONT_OBJ, '<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica-Bold /Encoding /WinAnsiEncoding >>')
+        self.write_object(CATALOG_OBJ, f'<< /Type /Catalog /Pages {PAGES_OBJ} 0 R /Outlines {OUTLINES_OBJ} 0 R /PageMode /UseOutlines >>')
+
+        xref_offset = self.file.tell()
+        self.file.write(f'xref\n0 {self.next_obj}\n'.encode('latin-1'))
+        self.file.write(b'0000000000 65535 f \n')
+        for obj in range(1, self.next_obj):
+            self.file.write(f'{self.offsets[obj]:010d} 00000 n \n'.encode('latin-1'))
+
+        self.file.write(f'trailer\n<< /Size {self.next_obj} /Root {CATALOG_OBJ} 0 R /Info << /Title {pdf_string(self.title)} >> >>\n'
+                        f'startxref\n{xref_offset}\n%%EOF\n'.encode('latin-1'))
+        self.file.close()
@@ -0,0 +1,117 @@
+# render_pipeline.py
+
+"""
+Producer / consumer pipeline for the per floor map creators.
+
+    decode thread -> bounded queue -> render workers -> caller, in floor order -> MapEncoder thread
+
+While floor N is being rendered the decode thread is already reading and
+decoding floor N+1 (and writing its blank plan), and the MapEncoder saves
+floor N-1. Every stage is bounded, at most 'prefetch' decoded floors wait for
+a render worker and at most 'render_workers' floors are rendered at once.
+
+Usage:
+
+    for floor, rendered in render_pipeline(floors, decode_floor, render_floor, stop_event):
+        map_encoder.save(rendered, output_path)
+
+decode(item) runs on the decode thread, render(item, decoded) on a render worker.
+Results are yielded in the order of items, so logs, PDF atlas pages and progress stay ordered.
+"""
+
+import os
+import queue
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from instrumentation import in_current_run
+
+# Decoded floors waiting for a render worker
+PREFETCH_FLOORS = 2
+
+# Floors rendered concurrently, PIL releases the GIL for most of its pixel work,
+# leave a core for the decode and encode threads, each worker holds a full size floor in memory
+RENDER_WORKERS = max(1, min(2, (os.cpu_count() or 1) - 1))
+
+_END_OF_ITEMS = object()
+
+
+def _raise(exception):
+    raise exception
+
+
+def render_pipeline(items, decode, render=None, stop_event=None, render_workers=RENDER_WORKERS, prefetch=PREFETCH_FLOORS):
+    """
+    Generator yielding (item, rendered) in the order of items, render=None yields the decoded value as is.
+    An exception raised by decode or render is re-raised when its item is reached.
+    Stops early when stop_event is set, leaving the loop (break / return / exception) stops every stage.
+    """
+    decoded_queue = queue.Queue(maxsize=max(1, prefetch))
+    halt = threading.Event()
+
+    def stopped():
+        return halt.is_set() or (stop_event is not None and stop_event.is_set())
+
+    def put(entry):
+        # Never block forever on a full queue, the consumer may have gone away
+        while not halt.is_set():
+            try:
+                decoded_queue.put(entry, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def decode_items():
+        for item in items:
+            if stopped():
+                break
+            try:
+                put((item, decode(item), None))
+            except Exception as e:
+                put((item, None, e))
+        put(_END_OF_ITEMS)
+
+    # The stages record their spans into the caller's instrumentation run
+    decode = in_current_run(decode)
+    if render is not None:
+        render = in_current_run(render)
+
+    decoder = threading.Thread(target=in_current_run(decode_items), name='map-decode', daemon=True)
+    executor = ThreadPoolExecutor(max_workers=max(1, render_workers), thread_name_prefix='map-render')
+    in_flight = deque()
+    decoding_finished = False
+
+    decoder.start()
+    try:
+        while True:
+            # Keep the render workers busy, only wait on the decoder when there is nothing else to hand back
+            while not decoding_finished and len(in_flight) < max(1, render_workers):
+                try:
+                    entry = decoded_queue.get(block=not in_flight)
+                except queue.Empty:
+                    break
+
+                if entry is _END_OF_ITEMS:
+                    decoding_finished = True
+                    break
+
+                item, decoded, error = entry
+                if error is not None:
+                    in_flight.append((item, executor.submit(_raise, error)))
+                elif render is None:
+                    in_flight.append((item, executor.submit(lambda value: value, decoded)))
+                else:
+                    in_flight.append((item, executor.submit(render, item, decoded)))
+
+            if not in_flight or stopped():
+                return
+
+            item, future = in_flight.popleft()
+            yield item, future.result()
+    finally:
+        halt.set()
+        for _, future in in_flight:
+            future.cancel()
+        executor.shutdown(wait=True)
+        decoder.join()
@@ -0,0 +1,222 @@
+# scene.py
+
+"""
+Scene description of the AP layer drawn onto a floor plan.
+
+build_ap_scene_item() resolves everything needed to draw one AP (icon, centre point,
+arrow rotation and name label box) into a plain dict, without touching the floor plan image.
+A floor's scene is simply the list of those dicts, handed to one of the backends:
+
+    render_scene_raster()    draw onto the full floor plan
+    render_scene_windowed()  draw only the items intersecting a crop window, onto that window
+    svg_renderer             write the scene as a vector overlay
+
+The Ekahau style AP location maps and the PDS maps are the same renderer with a different
+MapStyle, annotate_map() and annotate_pds_map() remain as per AP conveniences.
+"""
+
+import wx
+from functools import lru_cache
+
+from PIL import Image, ImageDraw
+
+from common import ekahau_color_dict
+from common import model_antenna_split
+from common import FIVE_GHZ_RADIO_ID
+
+from map_creator.map_creator_comon import ASSETS_DIR
+from map_creator.map_creator_comon import set_font
+from map_creator.map_creator_comon import get_y_offset
+from map_creator.map_creator_comon import get_rrect_text_border_space
+from map_creator.map_creator_comon import text_width_and_height_getter
+
+from instrumentation import timed, count
+
+LABEL_OUTLINE_WIDTH = 2
+LEADER_LINE_WIDTH = 2
+
+# Rotated arrows expand up to icon_size * sqrt(2), allow for that when computing item bounds
+ICON_BOUNDS_FACTOR = 0.75
+
+# Map styles, icon is formatted with the Ekahau colour name of the AP
+# label_fill None fills the AP name label with the AP colour
+EKAHAU_STYLE = {
+    'icon': 'ekahau_style/ekahau-AP-{color_name}.png',
+    'arrow': 'ekahau_style/ekahau-AP-arrow.png',
+    'label_fill': 'white',
+}
+
+PDS_STYLE = {
+    'icon': 'custom/spot.png',
+    'arrow': 'custom/overlay-arrow.png',
+    'label_fill': None,
+}
+
+
+@lru_cache(maxsize=64)
+def load_asset(asset, size):
+    """Open and resize an icon asset once, asset is a path relative to ASSETS_DIR."""
+    with Image.open(ASSETS_DIR / asset) as image:
+        return image.resize((size, size))
+
+
+@lru_cache(maxsize=512)
+def load_rotated_asset(asset, size, angle):
+    return load_asset(asset, size).rotate(-angle, expand=True)
+
+
+@lru_cache(maxsize=16)
+def load_font(font_size):
+    return set_font(font_size)
+
+
+def build_ap_scene_item(ap, scaling_ratio, custom_ap_icon_size, font_size, simulated_radio_dict, style=EKAHAU_STYLE):
+    """Describe how a single AP is drawn in the given map style, coordinates are in source floor plan pixels."""
+    ap_color = ap['color'] if 'color' in ap else 'FFFFFF'
+
+    # establish x and y
+    x, y = (ap['location']['coord']['x'] * scaling_ratio,
+            ap['location']['coord']['y'] * scaling_ratio)
+
+    icon = style['icon'].format(color_name=ekahau_color_dict.get(ap.get('color', '#FFFFFF')))
+    arrow_asset = style['arrow']
+
+    simulated_radio = simulated_radio_dict[ap['id']][FIVE_GHZ_RADIO_ID]
+    antenna_direction_angle = simulated_radio['antennaDirection']
+    antenna_tilt_angle = simulated_radio['antennaTilt']
+    antenna_mounting = simulated_radio['antennaMounting']
+
+    # The directional arrow is only drawn for wall mounted or tilted APs
+    arrow_relevant = antenna_mounting == 'WALL' or antenna_tilt_angle != 0
+
+    # Calculate AP icon rounded rectangle offset value for text below the AP icon
+    y_offset = get_y_offset(load_asset(arrow_asset, custom_ap_icon_size), antenna_direction_angle)
+
+    # Calculate the height and width of the AP Name rounded rectangle
+    rrect_text_border_space = get_rrect_text_border_space(font_size)
+    text_width, text_height = text_width_and_height_getter(ap['name'], font_size)
+
+    # Establish coordinates for the rounded rectangle
+    x1 = x - (text_width / 2) - rrect_text_border_space
+    y1 = y + y_offset
+
+    x2 = x + (text_width / 2) + rrect_text_border_space
+    y2 = y + y_offset + text_height + (rrect_text_border_space * 2)
+
+    icon_reach = custom_ap_icon_size * ICON_BOUNDS_FACTOR
+
+    return {
+        'id': ap['id'],
+        'name': ap['name'],
+        'color': ap_color,
+        'x': x,
+        'y': y,
+        'icon': icon,
+        'icon_size': custom_ap_icon_size,
+        'arrow': arrow_asset if arrow_relevant else None,
+        'arrow_angle': antenna_direction_angle,
+        'antenna_mounting': antenna_mounting,
+        'antenna_tilt': antenna_tilt_angle,
+        'bounds': (min(x - icon_reach, x1), min(y - icon_reach, y1), max(x + icon_reach, x2), max(y + icon_reach, y2)),
+        'label': {
+            'text': ap['name'],
+            'box': (x1, y1, x2, y2),
+            'radius': (y2 - y1) / 3,
+            'fill': style['label_fill'] if style['label_fill'] is not None else ap_color,
+            'anchor': (x, y + y_offset + rrect_text_border_space),
+            'font_size': font_size,
+        },
+    }
+
+
+@timed()
+def build_floor_scene(aps, scaling_ratio, custom_ap_icon_size, font_size, simulated_radio_dict, style=EKAHAU_STYLE):
+    return [build_ap_scene_item(ap, scaling_ratio, custom_ap_icon_size, font_size, simulated_radio_dict, style) for ap in aps]
+
+
+def log_scene_item(item, ap, floor_plans_dict, message_callback):
+    wx.CallAfter(message_callback, f"{ap['name']} ({model_antenna_split(ap['model'])[0]}) ][ {floor_plans_dict.get(ap['location']['floorPlanId']).get('name')} ][ colour: {ekahau_color_dict.get(item['color'])} ][ coordinates {round(item['x'])}, {round(item['y'])}")
+
+    if item['arrow'] is not None:
+        wx.CallAfter(message_callback, f'AP directional arrow is considered relevant')
+
+        if item['antenna_mounting'] == 'WALL':
+            wx.CallAfter(message_callback, f'AP is WALL mounted')
+
+        if item['antenna_tilt'] != 0:
+            wx.CallAfter(message_callback, f"AP has antenna tilt angle of: {round(item['antenna_tilt'])}")
+
+
+def render_scene_item(map_image, item, draw=None, offset=(0, 0)):
+    """Rasterise one scene item onto map_image, offset is the map_image origin in scene coordinates."""
+    offset_x, offset_y = offset
+    x, y = item['x'] - offset_x, item['y'] - offset_y
+    count('APs drawn')
+
+    spot = load_asset(item['icon'], item['icon_size'])
+
+    # Calculate the top-left corner of the icon based on the center point and x, y
+    top_left = (int(x) - spot.width // 2, int(y) - spot.height // 2)
+    map_image.paste(spot, top_left, mask=spot)
+
+    if item['arrow'] is not None:
+        rotated_arrow = load_rotated_asset(item['arrow'], item['icon_size'], item['arrow_angle'])
+        top_left = (int(x) - rotated_arrow.width // 2, int(y) - rotated_arrow.height // 2)
+        map_image.paste(rotated_arrow, top_left, mask=rotated_arrow)
+
+    label = item['label']
+    x1, y1, x2, y2 = label['box']
+    anchor_x, anchor_y = label['anchor']
+
+    if draw is None:
+        draw = ImageDraw.Draw(map_image)
+
+    # Labels displaced by label_placement are tied back to their icon
+    if label.get('leader') is not None:
+        (start_x, start_y), (end_x, end_y) = label['leader']
+        draw.line((start_x - offset_x, start_y - offset_y, end_x - offset_x, end_y - offset_y), fill='black', width=LEADER_LINE_WIDTH)
+
+    # draw the rounded rectangle and text for 'AP Name'
+    draw.rounded_rectangle((x1 - offset_x, y1 - offset_y, x2 - offset_x, y2 - offset_y), label['radius'], fill=label['fill'], outline='black', width=LABEL_OUTLINE_WIDTH)
+    draw.text((anchor_x - offset_x, anchor_y - offset_y), label['text'], anchor='mt', fill='black', font=load_font(label['font_size']))
+
+    return map_image
+
+
+@timed()
+def render_scene_raster(map_image, scene):
+    """Raster backend, draw a whole floor scene onto map_image in scene order."""
+    draw = ImageDraw.Draw(map_image)
+    for item in scene:
+        render_scene_item(map_image, item, draw)
+    return map_image
+
+
+@timed()
+def render_scene_windowed(map_image, scene, window):
+    """
+    Windowed raster backend, crop map_image to window (left, upper, right, lower) and draw
+    only the scene items whose bounds intersect it. The full size map is never copied.
+    """
+    window = tuple(round(edge) for edge in window)
+    windowed_image = map_image.crop(window)
+    draw = ImageDraw.Draw(windowed_image)
+
+    for item in scene:
+        left, upper, right, lower = item['bounds']
+        if right < window[0] or left > window[2] or lower < window[1] or upper > window[3]:
+            continue
+        render_scene_item(windowed_image, item, draw, offset=window[:2])
+
+    return windowed_image
+
+
+@timed()
+def annotate_map(map_image, ap, scaling_ratio, custom_ap_icon_size, font_size, simulated_radio_dict, message_callback, floor_plans_dict, style=EKAHAU_STYLE):
+    item = build_ap_scene_item(ap, scaling_ratio, custom_ap_icon_size, font_size, simulated_radio_dict, style)
+    log_scene_item(item, ap, floor_plans_dict, message_callback)
+    return render_scene_item(map_image, item)
+
+
+def annotate_pds_map(map_image, ap, scaling_ratio, custom_ap_icon_size, font_size, simulated_radio_dict, message_callback, floor_plans_dict):
+    return annotate_map(map_image, ap, scaling_ratio, custom_ap_icon_size, font_size, simulated_radio_dict, message_callback, floor_plans_dict, PDS_STYLE)
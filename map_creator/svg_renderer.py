@@ -0,0 +1,132 @@
+# svg_renderer.py
+
+"""
+Write a floor scene (see scene.py) as an SVG overlay.
+
+The floor plan bitmap is referenced, not embedded, as a background <image>.
+Each icon asset is embedded once per drawn size as a <symbol>, downscaled to
+that size as the PNG maps draw it, and every AP is a <use> of it,
+directional arrows are the same shared symbol with a rotate() transform
+and AP names are real <text> elements, so the output stays small and the
+label styling can be changed in the <style> block without re-rendering.
+"""
+
+import io
+import os
+import base64
+from pathlib import Path
+from xml.sax.saxutils import escape, quoteattr
+
+from map_creator.scene import LABEL_OUTLINE_WIDTH, LEADER_LINE_WIDTH
+from map_creator.scene import load_asset
+
+SVG_FONT_FAMILY = 'Consolas, Menlo, monospace'
+
+
+def symbol_id(asset, size):
+    return f'sym-{Path(asset).stem}-{size}'
+
+
+def asset_data_uri(asset, size):
+    """Return the icon asset, resized to size x size pixels, as a base64 PNG data URI."""
+    buffer = io.BytesIO()
+    load_asset(asset, size).save(buffer, 'PNG', optimize=True)
+    return 'data:image/png;base64,' + base64.b64encode(buffer.getvalue()).decode('ascii')
+
+
+def svg_number(value):
+    return f'{value:.2f}'.rstrip('0').rstrip('.')
+
+
+def scene_to_svg(scene, image_size, background_href=None, crop_box=None):
+    """
+    Build the SVG document for a floor scene.
+
+    image_size is the (width, height) of the source floor plan, all scene coordinates are relative to it.
+    crop_box, when the map is cropped within Ekahau, becomes the viewBox, background_href then points at the cropped blank plan.
+    """
+    if crop_box is not None:
+        view_x, view_y = crop_box[0], crop_box[1]
+        view_width, view_height = crop_box[2] - crop_box[0], crop_box[3] - crop_box[1]
+    else:
+        view_x, view_y = 0, 0
+        view_width, view_height = image_size
+
+    lines = [
+        '<?xml version="1.0" encoding="UTF-8"?>',
+        f'<svg xmlns="http://www.w3.org/2000/svg" xmlns:xlink="http://www.w3.org/1999/xlink" '
+        f'width="{svg_number(view_width)}" height="{svg_number(view_height)}" '
+        f'viewBox="{svg_number(view_x)} {svg_number(view_y)} {svg_number(view_width)} {svg_number(view_height)}">',
+        '<style>',
+        f'.ap-label rect {{ stroke: black; stroke-width: {LABEL_OUTLINE_WIDTH}; }}',
+        f'.ap-label line {{ stroke: black; stroke-width: {LEADER_LINE_WIDTH}; }}',
+        f'.ap-label text {{ font-family: {SVG_FONT_FAMILY}; fill: black; text-anchor: middle; dominant-baseline: text-before-edge; }}',
+        '</style>',
+        '<defs>',
+    ]
+
+    # One symbol per distinct icon / arrow asset and size
+    assets = sorted({(item['icon'], item['icon_size']) for item in scene} |
+                    {(item['arrow'], item['icon_size']) for item in scene if item['arrow'] is not None})
+    for asset, size in assets:
+        lines.append(f'<symbol id="{symbol_id(asset, size)}" viewBox="0 0 {size} {size}">'
+                     f'<image width="{size}" height="{size}" xlink:href="{asset_data_uri(asset, size)}"/></symbol>')
+    lines.append('</defs>')
+
+    if background_href is not None:
+        lines.append(f'<image id="floor-plan" x="{svg_number(view_x)}" y="{svg_number(view_y)}" '
+                     f'width="{svg_number(view_width)}" height="{svg_number(view_height)}" xlink:href={quoteattr(background_href)}/>')
+
+    lines.append('<g id="ap-icons">')
+    for item in scene:
+        half = item['icon_size'] / 2
+        lines.append(f'<use xlink:href="#{symbol_id(item["icon"], item["icon_size"])}" x="{svg_number(item["x"] - half)}" y="{svg_number(item["y"] - half)}" '
+                     f'width="{item["icon_size"]}" height="{item["icon_size"]}"><title>{escape(item["name"])}</title></use>')
+    lines.append('</g>')
+
+    lines.append('<g id="ap-arrows">')
+    for item in scene:
+        if item['arrow'] is None:
+            continue
+        half = item['icon_size'] / 2
+        lines.append(f'<use xlink:href="#{symbol_id(item["arrow"], item["icon_size"])}" x="{svg_number(item["x"] - half)}" y="{svg_number(item["y"] - half)}" '
+                     f'width="{item["icon_size"]}" height="{item["icon_size"]}" '
+                     f'transform="rotate({svg_number(item["arrow_angle"])} {svg_number(item["x"])} {svg_number(item["y"])})"/>')
+    lines.append('</g>')
+
+    lines.append('<g id="ap-labels">')
+    for item in scene:
+        label = item['label']
+        x1, y1, x2, y2 = label['box']
+        anchor_x, anchor_y = label['anchor']
+        leader = ''
+        if label.get('leader') is not None:
+            (start_x, start_y), (end_x, end_y) = label['leader']
+            leader = f'<line x1="{svg_number(start_x)}" y1="{svg_number(start_y)}" x2="{svg_number(end_x)}" y2="{svg_number(end_y)}"/>'
+        lines.append(f'<g class="ap-label">{leader}'
+                     f'<rect x="{svg_number(x1)}" y="{svg_number(y1)}" width="{svg_number(x2 - x1)}" height="{svg_number(y2 - y1)}" '
+                     f'rx="{svg_number(label["radius"])}" fill={quoteattr(svg_colour(label["fill"]))}/>'
+                     f'<text x="{svg_number(anchor_x)}" y="{svg_number(anchor_y)}" font-size="{label["font_size"]}">{escape(label["text"])}</text></g>')
+    lines.append('</g>')
+
+    lines.append('</svg>')
+    return '\n'.join(lines) + '\n'
+
+
+def svg_colour(colour):
+    """Label fills are named colours or Ekahau hex colours, the default 'FFFFFF' lacks the leading '#' SVG requires."""
+    if len(colour) == 6 and all(c in '0123456789abcdefABCDEF' for c in colour):
+        return '#' + colour
+    return colour
+
+
+def write_svg_overlay(scene, output_path, image_size, background_path=None, crop_box=None):
+    """Write the floor scene to output_path, the background is referenced relative to the SVG file."""
+    output_path = Path(output_path)
+
+    background_href = None
+    if background_path is not None:
+        background_href = Path(os.path.relpath(background_path, output_path.parent)).as_posix()
+
+    output_path.write_text(scene_to_svg(scene, image_size, background_href, crop_box), encoding='utf-8')
+    return output_path
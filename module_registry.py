@@ -0,0 +1,145 @@
+# module_registry.py
+
+"""
+Registry of the modules loaded from the application directories: project
+profiles, AP rename scripts, project detail views, admin actions and
+directory structure profiles.
+
+    available_modules(RENAME_APS_DIR)                      # names for a dropdown
+    load_module(PROJECT_PROFILES_DIR, 'example 1')         # the imported module
+    module_declarations(RENAME_APS_DIR, 'Dynamic Rows')    # capabilities, without importing
+
+Directory listings are cached by the directory's modification time, modules
+by their path and modification time. A module is executed the first time it
+is loaded and again only when its file changes, so re-selecting a dropdown
+entry does not execute the module again.
+
+module_declarations() reads the names a module defines at module level
+(e.g. SAR, BOUNDARY_SEPARATOR, requiredTagKeys, sort_logic) from its source,
+without executing it. Literal values such as descriptions are included,
+anything else maps to NOT_LITERAL.
+"""
+
+import ast
+import os
+import threading
+import importlib.util
+from pathlib import Path
+
+from instrumentation import span, count
+
+APP_DIR = Path(__file__).resolve().parent
+
+# Stands in for module level names whose value is not a literal, e.g. functions
+NOT_LITERAL = object()
+
+
+def _file_key(path):
+    stat = path.stat()
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _literal_value(node):
+    # f-strings without placeholders, as used for the rename script descriptions
+    if isinstance(node, ast.JoinedStr) and all(isinstance(value, ast.Constant) for value in node.values):
+        return ''.join(value.value for value in node.values)
+    try:
+        return ast.literal_eval(node)
+    except (ValueError, TypeError, SyntaxError, MemoryError, RecursionError):
+        return NOT_LITERAL
+
+
+def parse_module_declarations(path):
+    """Names assigned or defined at module level, mapped to their literal value or NOT_LITERAL."""
+    tree = ast.parse(Path(path).read_text(encoding='utf-8'), filename=str(path))
+    declarations = {}
+    for node in tree.body:
+        if isinstance(node, ast.Assign):
+            value = _literal_value(node.value)
+            for target in node.targets:
+                if isinstance(target, ast.Name):
+                    declarations[target.id] = value
+        elif isinstance(node, ast.AnnAssign) and isinstance(node.target, ast.Name):
+            declarations[node.target.id] = _literal_value(node.value) if node.value is not None else NOT_LITERAL
+        elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            declarations[node.name] = NOT_LITERAL
+    return declarations
+
+
+class ModuleRegistry:
+    def __init__(self, base_dir=APP_DIR, ignore_files=("_", "common")):
+        self.base_dir = Path(base_dir)
+        self.ignore_files = ignore_files
+        self.lock = threading.RLock()
+        self.listings = {}  # directory: (directory mtime, names)
+        self.modules = {}  # path: (file key, module)
+        self.declarations = {}  # path: (file key, declarations)
+
+    def module_path(self, directory, name):
+        return self.base_dir / directory / f'{name}.py'
+
+    def available(self, directory):
+        """Module names in the directory, sorted, excluding files starting with underscores or 'common'."""
+        module_dir = self.base_dir / directory
+        directory_mtime = module_dir.stat().st_mtime_ns
+
+        with self.lock:
+            cached = self.listings.get(directory)
+            if cached is not None and cached[0] == directory_mtime:
+                return list(cached[1])
+
+            names = sorted(filename[:-3] for filename in os.listdir(module_dir) if filename.endswith('.py') and not filename.startswith(self.ignore_files))
+            self.listings[directory] = (directory_mtime, names)
+            return list(names)
+
+    def load(self, directory, name):
+        """The imported module, executed again only when its file has changed since it was last loaded."""
+        path = self.module_path(directory, name)
+        file_key = _file_key(path)
+
+        with self.lock:
+            cached = self.modules.get(path)
+            if cached is not None and cached[0] == file_key:
+                count('module registry hits')
+                return cached[1]
+
+            with span('module import', file=path.name):
+                spec = importlib.util.spec_from_file_location(name, str(path))
+                module = importlib.util.module_from_spec(spec)
+                spec.loader.exec_module(module)
+
+            self.modules[path] = (file_key, module)
+            return module
+
+    def module_declarations(self, directory, name):
+        """Module level names of the module and their literal values, read from its source without executing it."""
+        path = self.module_path(directory, name)
+        file_key = _file_key(path)
+
+        with self.lock:
+            cached = self.declarations.get(path)
+            if cached is not None and cached[0] == file_key:
+                return cached[1]
+
+            declarations = parse_module_declarations(path)
+            self.declarations[path] = (file_key, declarations)
+            return declarations
+
+
+_registry = ModuleRegistry()
+
+
+def get_module_registry():
+    return _registry
+
+
+def available_modules(directory):
+    return _registry.available(directory)
+
+
+def load_module(directory, name):
+    return _registry.load(directory, name)
+
+
+def module_declarations(directory, name):
+    return _registry.module_declarations(directory, name)
@@ -3,41 +3,48 @@
 import wx
 import os
 import json
-import threading
 import webbrowser
 import subprocess
-import importlib.util
 import platform
 import random
+import time
 
 from pathlib import Path
-from importlib.machinery import SourceFileLoader
+from concurrent.futures import ThreadPoolExecutor
 
 from drop_target import DropTarget
+from job_manager import JobManager
+from job_manager import format_eta
+from job_manager import FLOOR_PLAN_OUTPUT
+from job_manager import BACKUP_STORE
 from common import file_or_dir_exists
 
 from esx_actions.validate_esx import validate_esx
 from esx_actions.unpack_esx import unpack_esx_file
 from esx_actions.backup_esx import backup_esx
-from esx_actions.ap_list_creator import create_ap_list
+from esx_actions.backup_esx import backup_folder_for
+from esx_actions.backup_esx import restore_esx_backup
 from esx_actions.rebundle_esx import rebundle_project
 
 from project_detail.Summarise import run as summarise_esx
 
-from rename_aps.rename_visualiser import visualise_ap_renaming
 from rename_aps.ap_renamer import ap_renamer
 
-from survey import export_map_note_images, export_ap_images
+import module_registry
+from module_registry import available_modules
+from module_registry import module_declarations
+from module_registry import NOT_LITERAL
 
-from map_creator.extract_blank_maps import extract_blank_maps
-from map_creator.create_ap_location_maps import create_custom_ap_location_maps_threaded
-from map_creator.create_zoomed_ap_location_maps import create_zoomed_ap_location_maps_threaded
-from map_creator.create_pds_maps import create_pds_maps_threaded
+from profile_update_checker import ProfileUpdateChecker
+
+# Action modules that pull in pandas, matplotlib or PIL are imported on first use
+# within their event handlers, keeping them off the startup path
 
 from common import nl
 from common import CONFIGURATION_DIR
 from common import PROJECT_PROFILES_DIR
 from common import RENAME_APS_DIR
+from common import ESX_EXTENSION
 from common import PROJECT_DETAIL_DIR
 from common import ADMIN_ACTIONS_DIR
 from common import BOUNDARY_SEPARATION_WIDGET
@@ -45,24 +52,25 @@ from common import WHIMSY_WELCOME_MESSAGES
 from common import CALL_TO_DONATE_MESSAGE
 from common import DIR_STRUCTURE_PROFILES_DIR
 
-from common import discover_available_scripts
-from common import import_module_from_path
-from common import tracked_project_profile_check_for_update
 from common import example_project_profile_names
 
 from common import parse_project_metadata
+from common import ProjectSnapshot
 from common import cleanup_unpacked_project_folder
 
 from admin import check_for_updates
 from admin.dir_creator import select_root_and_create_directory_structure
 from admin.dir_creator import preview_directory_structure
 
-from survey.surveyed_ap_list import create_surveyed_ap_list
 from survey.pds_project_creator import create_pds_project_esx
 
+# Number of threads available for background network checks
+BACKGROUND_CHECK_WORKERS = 2
+
 
 class MyFrame(wx.Frame):
     def __init__(self, parent, title):
+        self.startup_timings = {'init_start': time.perf_counter()}
         wx.Frame.__init__(self, parent, title=title, size=(1000, 800))
         self.set_window()
         self.panel = wx.Panel(self)
@@ -82,11 +90,18 @@ class MyFrame(wx.Frame):
         self.setup_main_sizer()
         self.create_menu()
         self.setup_drop_target()
-        self.load_application_state()
         self.Center()
         self.Show()
+        self.startup_timings['frame_shown'] = time.perf_counter()
+
+        # Restore state and start the network checks once the frame has been drawn
+        wx.CallAfter(self.complete_startup)
+
+    def complete_startup(self):
+        self.load_application_state()
         self.check_for_updates_on_startup()
         self.display_welcome_message()
+        self.startup_timings['startup_complete'] = time.perf_counter()
 
     def set_window(self):
         self.SetMinSize((500, 600))
@@ -129,8 +144,17 @@ class MyFrame(wx.Frame):
         # Define the path for the application state file
         self.app_state_file_path = self.config_dir / 'app_state.json'
 
-        # Create a thread control variable
-        self.stop_event = threading.Event()  # Initialize the stop event
+        # Armed from the Admin tab, the next submitted job runs under cProfile
+        self.profile_next_job = False
+
+        # Long running actions are queued here, each job carries its own cancellation token and is timed
+        self.job_manager = JobManager(self.append_message, self.on_job_update, instrumentation_options=self.get_instrumentation_options)
+
+        # Network checks run here so a slow or absent connection never blocks the GUI thread
+        self.background_executor = ThreadPoolExecutor(max_workers=BACKGROUND_CHECK_WORKERS, thread_name_prefix='background-check')
+
+        # Tracked project profile update checks, version manifests are cached on disk between runs
+        self.profile_update_checker = ProfileUpdateChecker(self.config_dir / 'profile_version_cache.json', self.append_message)
 
     def setup_list_box(self):
         # Set up your list box here
@@ -151,7 +175,7 @@ class MyFrame(wx.Frame):
         Setup all dropdown elements
         """
         # Discover available AP renaming scripts in 'rename_aps' directory
-        self.available_ap_rename_scripts = discover_available_scripts(RENAME_APS_DIR)
+        self.available_ap_rename_scripts = available_modules(RENAME_APS_DIR)
 
         # Create a dropdown to select an AP renaming script
         self.ap_rename_script_dropdown = wx.Choice(self.tab1, choices=self.available_ap_rename_scripts)
@@ -159,7 +183,7 @@ class MyFrame(wx.Frame):
         self.ap_rename_script_dropdown.Bind(wx.EVT_CHOICE, self.on_ap_rename_script_dropdown_selection)
 
         # Discover available project Profiles 'project_profiles' directory
-        self.available_project_profiles = discover_available_scripts(PROJECT_PROFILES_DIR)
+        self.available_project_profiles = available_modules(PROJECT_PROFILES_DIR)
 
         # Create a dropdown to select a Project Profile on the Predictive Design tab
         self.project_profile_dropdown = wx.Choice(self.tab1, choices=self.available_project_profiles)
@@ -172,7 +196,7 @@ class MyFrame(wx.Frame):
         self.survey_project_profile_dropdown.Bind(wx.EVT_CHOICE, self.on_survey_project_profile_dropdown_selection)
 
         # Discover available Project Detail Views
-        self.available_project_detail_views = discover_available_scripts(PROJECT_DETAIL_DIR)
+        self.available_project_detail_views = available_modules(PROJECT_DETAIL_DIR)
 
         # Create a dropdown to select a Project Detail View
         self.project_detail_dropdown = wx.Choice(self.tab4, choices=self.available_project_detail_views)
@@ -180,7 +204,7 @@ class MyFrame(wx.Frame):
         self.project_detail_dropdown.Bind(wx.EVT_CHOICE, self.on_project_detail_dropdown_selection)
 
         # Discover available Admin action scripts
-        self.available_admin_actions = discover_available_scripts(ADMIN_ACTIONS_DIR)
+        self.available_admin_actions = available_modules(ADMIN_ACTIONS_DIR)
 
         # Create a dropdown to select an Admin action
         self.admin_actions_dropdown = wx.Choice(self.tab4, choices=self.available_admin_actions)
@@ -188,7 +212,7 @@ class MyFrame(wx.Frame):
         self.admin_actions_dropdown.Bind(wx.EVT_CHOICE, self.on_admin_actions_dropdown_selection)
 
         # Discover available directory structure profiles
-        self.available_dir_structure_profiles = discover_available_scripts(DIR_STRUCTURE_PROFILES_DIR)
+        self.available_dir_structure_profiles = available_modules(DIR_STRUCTURE_PROFILES_DIR)
 
         # Create a dropdown to select a directory structure profile
         self.dir_structure_profile_dropdown = wx.Choice(self.tab4, choices=self.available_dir_structure_profiles)
@@ -239,13 +263,26 @@ class MyFrame(wx.Frame):
         # Create backup esx file button
         self.backup_button = wx.Button(self.panel, label="Backup .esx")
         self.backup_button.Bind(wx.EVT_BUTTON, self.on_backup)
-        self.backup_button.SetToolTip(wx.ToolTip("Make a backup the of .esx file currently in the file list"))
+        self.backup_button.SetToolTip(wx.ToolTip("Make a backup the of .esx file currently in the file list, only what changed since earlier backups is stored"))
+
+        # Create restore esx backup button
+        self.restore_backup_button = wx.Button(self.panel, label="Restore Backup")
+        self.restore_backup_button.Bind(wx.EVT_BUTTON, self.on_restore_backup)
+        self.restore_backup_button.SetToolTip(wx.ToolTip("Restore a backup of the .esx file currently in the file list as a new .esx file"))
 
         # Create a button to execute the selected AP renaming script
         self.rename_aps_button = wx.Button(self.tab1, label="Rename APs")
         self.rename_aps_button.Bind(wx.EVT_BUTTON, self.on_rename_aps)
         self.rename_aps_button.SetToolTip(wx.ToolTip("Execute the selected AP renaming script"))
 
+        self.rename_aps_dry_run_button = wx.Button(self.tab1, label="Dry Run")
+        self.rename_aps_dry_run_button.Bind(wx.EVT_BUTTON, self.on_rename_aps_dry_run)
+        self.rename_aps_dry_run_button.SetToolTip(wx.ToolTip("Export the current and new AP names (CSV, XLSX and overlay maps) without modifying the project"))
+
+        self.rename_aps_across_projects_button = wx.Button(self.tab1, label="Rename Across Projects")
+        self.rename_aps_across_projects_button.Bind(wx.EVT_BUTTON, self.on_rename_aps_across_projects)
+        self.rename_aps_across_projects_button.SetToolTip(wx.ToolTip("Rename the APs of every .esx file in the file list with one continuous numbering, in the project profile building order"))
+
         self.visualise_ap_renaming_button = wx.Button(self.tab1, label="Rename Pattern Visualiser")
         self.visualise_ap_renaming_button.Bind(wx.EVT_BUTTON, self.on_visualise_ap_renaming)
         self.visualise_ap_renaming_button.SetToolTip(wx.ToolTip("Preview the AP renaming pattern"))
@@ -263,6 +300,10 @@ class MyFrame(wx.Frame):
         self.summarise_button.Bind(wx.EVT_BUTTON, self.on_summarise)
         self.summarise_button.SetToolTip(wx.ToolTip("Summarise the contents of the .esx project"))
 
+        self.compare_projects_button = wx.Button(self.tab1, label="Compare Projects")
+        self.compare_projects_button.Bind(wx.EVT_BUTTON, self.on_compare_projects)
+        self.compare_projects_button.SetToolTip(wx.ToolTip("Compare the first two .esx files in the file list (old, new), changes are logged and exported as XLSX"))
+
         self.export_ap_images_button = wx.Button(self.tab3, label="AP Images")
         self.export_ap_images_button.Bind(wx.EVT_BUTTON, self.on_export_ap_images)
         self.export_ap_images_button.SetToolTip(wx.ToolTip("Images from within AP notes"))
@@ -287,6 +328,14 @@ class MyFrame(wx.Frame):
         self.export_pds_maps_button.Bind(wx.EVT_BUTTON, self.on_export_pds_maps)
         self.export_pds_maps_button.SetToolTip(wx.ToolTip("Generate maps with red circle AP markers for use during Post Deployment Surveys"))
 
+        self.preview_maps_button = wx.Button(self.tab2, label="Preview")
+        self.preview_maps_button.Bind(wx.EVT_BUTTON, self.on_preview_maps)
+        self.preview_maps_button.SetToolTip(wx.ToolTip("Preview the AP icon and name label sizes on a reduced resolution map"))
+
+        self.run_deliverables_button = wx.Button(self.tab2, label="All Deliverables")
+        self.run_deliverables_button.Bind(wx.EVT_BUTTON, self.on_run_deliverables)
+        self.run_deliverables_button.SetToolTip(wx.ToolTip("Run every deliverable listed in the project profile, independent steps run concurrently"))
+
         self.create_pds_project_button = wx.Button(self.tab3, label="Create PDS Project")
         self.create_pds_project_button.Bind(wx.EVT_BUTTON, self.on_create_pds_project)
         self.create_pds_project_button.SetToolTip(wx.ToolTip("Create a PDS project from the current .esx project"))
@@ -323,6 +372,10 @@ class MyFrame(wx.Frame):
         self.abort_thread_button = wx.Button(self.panel, label="Abort Current Process")
         self.abort_thread_button.Bind(wx.EVT_BUTTON, self.on_abort_thread)
 
+        # Create a progress bar and status text for background jobs
+        self.job_progress_gauge = wx.Gauge(self.panel, range=100, size=(150, -1))
+        self.job_status_label = wx.StaticText(self.panel, label="")
+
         # Create exit button
         self.exit_button = wx.Button(self.panel, label="Exit")
         self.exit_button.Bind(wx.EVT_BUTTON, self.on_exit)
@@ -340,6 +393,19 @@ class MyFrame(wx.Frame):
         # Create a text input box for the zoomed AP image crop size
         self.zoomed_ap_crop_text_box = wx.TextCtrl(self.tab2, value="2000", style=wx.TE_PROCESS_ENTER)
 
+        # Create a checkbox to additionally bundle the AP location maps into a single PDF atlas
+        self.create_pdf_atlas_checkbox = wx.CheckBox(self.tab2, label="PDF Atlas")
+
+        # Create a checkbox to additionally write the AP layer as an SVG overlay per floor
+        self.create_svg_overlay_checkbox = wx.CheckBox(self.tab2, label="SVG Overlay")
+
+        # Create a checkbox to additionally highlight the AP changes on a map per floor when comparing projects
+        self.compare_change_maps_checkbox = wx.CheckBox(self.tab1, label="Change Maps")
+
+        # Create a checkbox to write a Chrome trace JSON file for every background job
+        self.write_timing_trace_checkbox = wx.CheckBox(self.tab4, label="Write Timing Trace")
+        self.write_timing_trace_checkbox.SetToolTip(wx.ToolTip("Write a Chrome trace / speedscope JSON file into OUTPUT/diagnostics for every background job"))
+
     def setup_text_labels(self):
         # Create a text label for the drop target with custom position
         self.drop_target_label = wx.StaticText(self.panel, label="Drag and Drop files here", pos=(22, 17))
@@ -379,8 +445,11 @@ class MyFrame(wx.Frame):
         self.button_row2_sizer.Add(self.unpack_button, 0, wx.LEFT | wx.RIGHT | wx.BOTTOM, self.widget_margin)
         self.button_row2_sizer.Add(self.rebundle_button, 0, wx.LEFT | wx.RIGHT | wx.BOTTOM, self.widget_margin)
         self.button_row2_sizer.Add(self.backup_button, 0, wx.LEFT | wx.RIGHT | wx.BOTTOM, self.widget_margin)
+        self.button_row2_sizer.Add(self.restore_backup_button, 0, wx.LEFT | wx.RIGHT | wx.BOTTOM, self.widget_margin)
 
         self.button_exit_row_sizer = wx.BoxSizer(wx.HORIZONTAL)
+        self.button_exit_row_sizer.Add(self.job_progress_gauge, 0, wx.ALL | wx.ALIGN_CENTER_VERTICAL, self.widget_margin)
+        self.button_exit_row_sizer.Add(self.job_status_label, 0, wx.ALL | wx.ALIGN_CENTER_VERTICAL, self.widget_margin)
         self.button_exit_row_sizer.AddStretchSpacer(1)
         self.button_exit_row_sizer.Add(self.abort_thread_button, 0, wx.ALL, self.widget_margin)
         self.button_exit_row_sizer.Add(self.exit_button, 0, wx.ALL, self.widget_margin)
@@ -446,6 +515,12 @@ class MyFrame(wx.Frame):
         row_sizer.Add(self.create_ap_list, 0, wx.ALL, self.widget_margin)
         self.project_profile_sizer.Add(row_sizer, 0, wx.LEFT, self.row_sizer_margin)
 
+        # Row 3
+        row_sizer = wx.BoxSizer(wx.HORIZONTAL)
+        row_sizer.Add(self.compare_projects_button, 0, wx.ALL, self.widget_margin)
+        row_sizer.Add(self.compare_change_maps_checkbox, 0, wx.ALL | wx.ALIGN_CENTER_VERTICAL, self.widget_margin)
+        self.project_profile_sizer.Add(row_sizer, 0, wx.LEFT, self.row_sizer_margin)
+
     def setup_rename_aps_section(self):
         self.rename_aps_box = wx.StaticBox(self.tab1, label="Rename APs")
         self.rename_aps_sizer = wx.StaticBoxSizer(self.rename_aps_box, wx.VERTICAL)
@@ -462,6 +537,8 @@ class MyFrame(wx.Frame):
         # Row 2
         row_sizer = wx.BoxSizer(wx.HORIZONTAL)
         row_sizer.Add(self.visualise_ap_renaming_button, 0, wx.ALL, self.widget_margin)
+        row_sizer.Add(self.rename_aps_dry_run_button, 0, wx.ALL, self.widget_margin)
+        row_sizer.Add(self.rename_aps_across_projects_button, 0, wx.ALL, self.widget_margin)
         self.rename_aps_sizer.Add(row_sizer, 0, wx.EXPAND | wx.LEFT, self.row_sizer_margin)
 
     def setup_tab2(self):
@@ -484,6 +561,7 @@ class MyFrame(wx.Frame):
         # Row 1
         row_sizer = wx.BoxSizer(wx.HORIZONTAL)
         row_sizer.Add(self.extract_blank_maps_button, 0, wx.ALL, self.widget_margin)
+        row_sizer.Add(self.run_deliverables_button, 0, wx.ALL, self.widget_margin)
         self.export_sizer.Add(row_sizer, 0, wx.EXPAND | wx.LEFT, self.row_sizer_margin)
 
     def setup_create_section(self):
@@ -495,6 +573,8 @@ class MyFrame(wx.Frame):
         row_sizer.Add(self.create_ap_location_maps_button, 0, wx.ALL, self.widget_margin)
         row_sizer.Add(self.create_zoomed_ap_maps_button, 0, wx.ALL, self.widget_margin)
         row_sizer.Add(self.export_pds_maps_button, 0, wx.ALL, self.widget_margin)
+        row_sizer.Add(self.create_pdf_atlas_checkbox, 0, wx.ALL | wx.ALIGN_CENTER_VERTICAL, self.widget_margin)
+        row_sizer.Add(self.create_svg_overlay_checkbox, 0, wx.ALL | wx.ALIGN_CENTER_VERTICAL, self.widget_margin)
         self.create_sizer.Add(row_sizer, 0, wx.EXPAND | wx.LEFT, self.row_sizer_margin)
 
         # Row 2
@@ -505,6 +585,7 @@ class MyFrame(wx.Frame):
         row_sizer.Add(self.ap_name_label_size_text_box, 0, wx.ALL | wx.ALIGN_CENTER_VERTICAL, self.widget_margin)
         row_sizer.Add(self.zoomed_ap_crop_label, 0, wx.ALL | wx.ALIGN_CENTER_VERTICAL, self.widget_margin)
         row_sizer.Add(self.zoomed_ap_crop_text_box, 0, wx.ALL | wx.ALIGN_CENTER_VERTICAL, self.widget_margin)
+        row_sizer.Add(self.preview_maps_button, 0, wx.ALL | wx.ALIGN_CENTER_VERTICAL, self.widget_margin)
         self.create_sizer.Add(row_sizer, 0, wx.EXPAND, wx.LEFT, self.row_sizer_margin)
 
 
@@ -583,6 +664,11 @@ class MyFrame(wx.Frame):
         row_sizer.Add(self.perform_admin_action_button, 0, wx.EXPAND | wx.ALL, self.widget_margin)
         self.application_section_sizer.Add(row_sizer, 0, wx.EXPAND | wx.LEFT, self.row_sizer_margin)
 
+        # Row 3
+        row_sizer = wx.BoxSizer(wx.HORIZONTAL)
+        row_sizer.Add(self.write_timing_trace_checkbox, 0, wx.ALL | wx.ALIGN_CENTER_VERTICAL, self.widget_margin)
+        self.application_section_sizer.Add(row_sizer, 0, wx.EXPAND | wx.LEFT, self.row_sizer_margin)
+
     def setup_misc_section(self):
         self.misc_box = wx.StaticBox(self.tab4, label="Misc")
         self.misc_sizer = wx.StaticBoxSizer(self.misc_box, wx.VERTICAL)
@@ -672,11 +758,8 @@ class MyFrame(wx.Frame):
             self.append_message(welcome_message)
 
     def load_module(self, module_subdir, module_name):
-        module_path = Path(__file__).resolve().parent / module_subdir / f"{module_name}.py"
-        spec = importlib.util.spec_from_file_location(module_name, str(module_path))
-        module = importlib.util.module_from_spec(spec)
-        spec.loader.exec_module(module)
-        return module
+        # Imported once, and again only when the module file changes
+        return module_registry.load_module(module_subdir, module_name)
 
     def on_create_surveyed_ap_list(self, event):
         if not hasattr(self.current_profile_ap_list_module, 'create_custom_measured_ap_list'):
@@ -685,7 +768,9 @@ class MyFrame(wx.Frame):
         elif not self.basic_checks():
             return
         else:
-            create_surveyed_ap_list(self)
+            from survey.surveyed_ap_list import create_surveyed_ap_list
+            project = ProjectSnapshot(self)
+            self.job_manager.submit('Surveyed AP list', lambda job: create_surveyed_ap_list(project, job.cancel_token))
 
     def on_admin_actions_dropdown_selection(self, event):
         selected_index = self.admin_actions_dropdown.GetSelection()
@@ -699,13 +784,16 @@ class MyFrame(wx.Frame):
         check_for_updates.check_for_updates(self.append_message)
 
     def on_project_detail_dropdown_selection(self, event):
-        selected_index = self.project_detail_dropdown.GetSelection()
-        project_detail_module = self.available_project_detail_views[selected_index]
-        self.current_project_detail_module = self.load_module(PROJECT_DETAIL_DIR, project_detail_module)
+        # Some project detail views import PIL, the selected module is loaded when it is first displayed
+        self.current_project_detail_module = None
 
     def on_display_project_detail(self, event):
         if not self.basic_checks():
             return
+        if self.current_project_detail_module is None:
+            selected_index = self.project_detail_dropdown.GetSelection()
+            project_detail_module = self.available_project_detail_views[selected_index]
+            self.current_project_detail_module = self.load_module(PROJECT_DETAIL_DIR, project_detail_module)
         self.current_project_detail_module.run(self.working_directory, self.project_name, self.append_message)
 
     def on_dir_structure_profile_dropdown_selection(self, event):
@@ -727,6 +815,10 @@ class MyFrame(wx.Frame):
 
     def append_message(self, message):
         # Append a message to the message display area.
+        # Safe to call from job threads, the update is re-posted onto the GUI thread
+        if not wx.IsMainThread():
+            wx.CallAfter(self.append_message, message)
+            return
         self.display_log.AppendText(message + '\n')
 
     def update_last_message(self, message):
@@ -758,6 +850,10 @@ class MyFrame(wx.Frame):
             'selected_tab_index': self.notebook.GetSelection(),
             'ap_icon_size_text_box': self.ap_icon_size_text_box.GetValue(),
             'zoomed_ap_crop_text_box': self.zoomed_ap_crop_text_box.GetValue(),
+            'create_pdf_atlas_checkbox': self.create_pdf_atlas_checkbox.GetValue(),
+            'create_svg_overlay_checkbox': self.create_svg_overlay_checkbox.GetValue(),
+            'compare_change_maps_checkbox': self.compare_change_maps_checkbox.GetValue(),
+            'write_timing_trace_checkbox': self.write_timing_trace_checkbox.GetValue(),
             'boundary_separator_value': self.rename_aps_boundary_separator
         }
         # Save the state to the defined path
@@ -803,6 +899,10 @@ class MyFrame(wx.Frame):
                 # Restore the text box values
                 self.ap_icon_size_text_box.SetValue(state.get('ap_icon_size_text_box', "25"))
                 self.zoomed_ap_crop_text_box.SetValue(state.get('zoomed_ap_crop_text_box', "2000"))
+                self.create_pdf_atlas_checkbox.SetValue(state.get('create_pdf_atlas_checkbox', False))
+                self.create_svg_overlay_checkbox.SetValue(state.get('create_svg_overlay_checkbox', False))
+                self.compare_change_maps_checkbox.SetValue(state.get('compare_change_maps_checkbox', False))
+                self.write_timing_trace_checkbox.SetValue(state.get('write_timing_trace_checkbox', False))
 
                 # Restore the directory structure profile index
                 self.dir_structure_profile_dropdown.SetSelection(state.get('selected_dir_structure_profile_index', 0))
@@ -822,7 +922,7 @@ class MyFrame(wx.Frame):
         self.ap_icon_size_text_box.SetValue("25")  # Reset the AP icon size
         self.zoomed_ap_crop_text_box.SetValue("2000")  # Reset the zoomed AP crop size
         self.rename_aps_boundary_separator = 200  # Reset the boundary separator value
-        self.stop_event.clear()  # Clear the stop event
+        self.job_manager.clear_finished()  # Forget finished jobs
 
     def on_clear_log(self, event):
         self.display_log.SetValue("")  # Clear the contents of the display_log
@@ -868,23 +968,62 @@ class MyFrame(wx.Frame):
         if not self.filepath:
             if not self.get_single_specific_file_type('.esx'):
                 return
-        backup_esx(self.working_directory, self.project_name, self.filepath, self.append_message)
+        working_directory, project_name, filepath = self.working_directory, self.project_name, self.filepath
+        self.job_manager.submit('Backup', lambda job: backup_esx(working_directory, project_name, filepath, self.append_message), exclusive_group=BACKUP_STORE)
+
+    def on_restore_backup(self, event):
+        if not self.filepath:
+            if not self.get_single_specific_file_type('.esx'):
+                return
+        manifests_dir = backup_folder_for(self.working_directory, self.project_name) / 'manifests'
+        if not manifests_dir.exists():
+            self.append_message(f"No backups found for {self.project_name}.esx{nl}")
+            return
+
+        dlg = wx.FileDialog(self, "Choose a backup to restore", defaultDir=str(manifests_dir), wildcard="Backup manifests (*.json)|*.json",
+                            style=wx.FD_OPEN | wx.FD_FILE_MUST_EXIST)
+        if dlg.ShowModal() == wx.ID_OK:
+            manifest_path = dlg.GetPath()
+            self.job_manager.submit('Restore backup', lambda job: restore_esx_backup(manifest_path, self.append_message), exclusive_group=BACKUP_STORE)
+        dlg.Destroy()
 
     def on_validate(self, event):
         if not self.basic_checks():
             return
-        validate_esx(self, self.append_message)
+        project = ProjectSnapshot(self)
+        self.job_manager.submit('Validation', lambda job: validate_esx(project, self.append_message, job.cancel_token))
 
     def on_summarise(self, event):
         if not self.basic_checks():
             return
-        summarise_esx(self.working_directory, self.project_name, self.append_message)
+        working_directory, project_name = self.working_directory, self.project_name
+        self.job_manager.submit('Summary', lambda job: summarise_esx(working_directory, project_name, self.append_message))
+
+    def on_compare_projects(self, event):
+        from esx_actions.compare_esx import compare_esx
+
+        esx_paths = [Path(filepath) for filepath in self.list_box.GetStrings() if filepath.lower().endswith(ESX_EXTENSION)]
+        if len(esx_paths) < 2:
+            self.append_message(f"Add the old and the new .esx file to the file list to compare them")
+            return
+
+        missing_paths = [esx_path for esx_path in esx_paths[:2] if not esx_path.exists()]
+        if missing_paths:
+            self.append_message(f'The file {missing_paths[0]} does not exist.')
+            return
+
+        self.on_clear_log(None)
+        old_esx_path, new_esx_path = esx_paths[:2]
+        create_change_maps = self.compare_change_maps_checkbox.GetValue()
+        self.job_manager.submit('Compare projects', lambda job: compare_esx(old_esx_path, new_esx_path, self.append_message, create_change_maps, job.cancel_token))
 
     def on_create_ap_list(self, event):
         if not self.basic_checks():
             return
         if hasattr(self, 'current_project_profile_module'):
-            create_ap_list(self)
+            from esx_actions.ap_list_creator import create_ap_list
+            project = ProjectSnapshot(self)
+            self.job_manager.submit('AP list', lambda job: create_ap_list(project, job.cancel_token))
 
     def on_copy_log(self, event):
         if wx.TheClipboard.Open():
@@ -899,6 +1038,9 @@ class MyFrame(wx.Frame):
         self.save_application_state(None)
         print(f'Application state saved on exit, file list and dropdown options should be the same next time you launch the application')
         cleanup_unpacked_project_folder(self)
+        self.background_executor.shutdown(wait=False, cancel_futures=True)
+        self.profile_update_checker.shutdown()
+        self.job_manager.shutdown()
         self.Close()
         self.Destroy()
 
@@ -936,11 +1078,7 @@ class MyFrame(wx.Frame):
         return True
 
     def load_project_profile(self, profile_name):
-        profile_path = Path(__file__).resolve().parent / PROJECT_PROFILES_DIR / f"{profile_name}.py"
-        spec = importlib.util.spec_from_file_location(profile_name, str(profile_path))
-        module = importlib.util.module_from_spec(spec)
-        spec.loader.exec_module(module)
-        return module
+        return self.load_module(PROJECT_PROFILES_DIR, profile_name)
 
     def on_project_profile_dropdown_selection(self, event):
         selected_profile = self.project_profile_dropdown.GetStringSelection()
@@ -978,7 +1116,8 @@ class MyFrame(wx.Frame):
             self.ap_rename_script_dropdown.SetStringSelection(project_profile_module.preferred_ap_rename_script)
             self.on_ap_rename_script_dropdown_selection(None)
         if hasattr(project_profile_module, 'project_profile_id'):
-            tracked_project_profile_check_for_update(project_profile_module, self.append_message)
+            # Results are posted back to the log with wx.CallAfter
+            self.profile_update_checker.check_profile_module(project_profile_module)
         self.save_application_state(None)
 
     def on_design_project_profile_dropdown_selection(self, event):
@@ -1003,34 +1142,77 @@ class MyFrame(wx.Frame):
         except ValueError:
             raise ValueError("Please enter a valid number for the start number.")
 
-    def on_rename_aps(self, event):
-        if not self.basic_checks():
-            return
-
+    def load_selected_ap_rename_script(self):
+        """Return (script module, start number) for the selected AP renaming script, or None when the start number is invalid."""
         try:
             # Use the helper function to get the start number
             rename_start_number = self.get_rename_start_number()
         except ValueError as e:
             wx.MessageBox(str(e), "Error", wx.OK | wx.ICON_ERROR)
-            return
+            return None
 
         # Load the selected script
         selected_script = self.available_ap_rename_scripts[self.ap_rename_script_dropdown.GetSelection()]
-        script_path = str(Path(__file__).resolve().parent / RENAME_APS_DIR / (selected_script + ".py"))
 
         # Load module from selected script
-        script_module = SourceFileLoader(selected_script, script_path).load_module()
+        script_module = self.load_module(RENAME_APS_DIR, selected_script)
+        return script_module, rename_start_number
+
+    def on_rename_aps(self, event):
+        if not self.basic_checks():
+            return
+
+        selected_rename_script = self.load_selected_ap_rename_script()
+        if selected_rename_script is None:
+            return
+        script_module, rename_start_number = selected_rename_script
 
         # Pass the start number to the rename function
-        ap_renamer(self.working_directory, self.project_name, script_module, self.append_message, self.rename_aps_boundary_separator, rename_start_number)
+        working_directory, project_name, boundary_separator = self.working_directory, self.project_name, self.rename_aps_boundary_separator
+        self.job_manager.submit('Rename APs', lambda job: ap_renamer(working_directory, project_name, script_module, self.append_message, boundary_separator, rename_start_number, stop_event=job.cancel_token))
+
+    def on_rename_aps_dry_run(self, event):
+        if not self.basic_checks():
+            return
+
+        selected_rename_script = self.load_selected_ap_rename_script()
+        if selected_rename_script is None:
+            return
+        script_module, rename_start_number = selected_rename_script
+
+        working_directory, project_name, boundary_separator = self.working_directory, self.project_name, self.rename_aps_boundary_separator
+        self.job_manager.submit('Rename dry run', lambda job: ap_renamer(working_directory, project_name, script_module, self.append_message, boundary_separator, rename_start_number, dry_run=True, stop_event=job.cancel_token))
+
+    def on_rename_aps_across_projects(self, event):
+        from rename_aps.multi_project_renamer import multi_project_ap_renamer
+
+        esx_paths = [Path(filepath) for filepath in self.list_box.GetStrings() if filepath.lower().endswith(ESX_EXTENSION)]
+        if len(esx_paths) < 2:
+            self.append_message(f"Add two or more .esx files to the file list to rename APs across projects")
+            return
+
+        missing_paths = [esx_path for esx_path in esx_paths if not esx_path.exists()]
+        if missing_paths:
+            self.append_message(f'The file {missing_paths[0]} does not exist.')
+            return
+
+        selected_rename_script = self.load_selected_ap_rename_script()
+        if selected_rename_script is None:
+            return
+        script_module, rename_start_number = selected_rename_script
+
+        self.on_clear_log(None)
+        boundary_separator = self.rename_aps_boundary_separator
+        building_order = getattr(getattr(self, 'project_profile_module', None), 'campus_building_order', ())
+        self.job_manager.submit('Rename across projects', lambda job: multi_project_ap_renamer(esx_paths, script_module, self.append_message, boundary_separator, rename_start_number, building_order, job.cancel_token))
 
     def on_ap_rename_script_dropdown_selection(self, event):
         """Handle rename script selection change."""
         selected_script = self.ap_rename_script_dropdown.GetStringSelection()
-        path_to_module = Path(__file__).resolve().parent / RENAME_APS_DIR / f'{selected_script}.py'
 
         _, short_description = self.get_ap_rename_tooltips(selected_script)  # Ignore script_name
-        self.current_sorting_module = import_module_from_path(selected_script, path_to_module)
+        # Read from the script source, the script itself is only imported when it is run
+        self.current_sorting_script_declarations = module_declarations(RENAME_APS_DIR, selected_script)
 
         self.ap_rename_script_dropdown.SetToolTip(wx.ToolTip(short_description))
 
@@ -1039,18 +1221,17 @@ class MyFrame(wx.Frame):
             self.save_application_state(None)
 
     def display_boundary_separator_message(self):
-        if hasattr(self.current_sorting_module, BOUNDARY_SEPARATION_WIDGET):
+        if BOUNDARY_SEPARATION_WIDGET in self.current_sorting_script_declarations:
             self.display_log.SetValue("")  # Clear the contents of the display_log
             self.append_message(f"Selected AP renaming script contains a configurable boundary parameter{nl}Boundary separator value: {self.rename_aps_boundary_separator}")
         else:
             self.display_log.SetValue("")  # Clear the contents of the display_log
 
     def get_ap_rename_tooltips(self, script_name):
-        script_path = str(Path(__file__).resolve().parent / RENAME_APS_DIR / f"{script_name}.py")
-        spec = importlib.util.spec_from_file_location(script_name, script_path)
-        module = importlib.util.module_from_spec(spec)
-        spec.loader.exec_module(module)
-        short_description = getattr(module, 'SHORT_DESCRIPTION', "No short description available.")
+        short_description = module_declarations(RENAME_APS_DIR, script_name).get('SHORT_DESCRIPTION', "No short description available.")
+        if short_description is NOT_LITERAL:
+            # Built at import time, e.g. an f-string with placeholders
+            short_description = self.load_module(RENAME_APS_DIR, script_name).SHORT_DESCRIPTION
         return script_name, short_description
 
     def placeholder(self, event):
@@ -1059,12 +1240,16 @@ class MyFrame(wx.Frame):
     def on_export_ap_images(self, event):
         if not self.basic_checks():
             return
-        export_ap_images.export_ap_images(self)
+        from survey import export_ap_images
+        project = ProjectSnapshot(self)
+        self.job_manager.submit('AP images', lambda job: export_ap_images.export_ap_images(project))
 
     def on_export_map_note_images(self, event):
         if not self.basic_checks():
             return
-        export_map_note_images.export_map_note_images(self)
+        from survey import export_map_note_images
+        project = ProjectSnapshot(self)
+        self.job_manager.submit('Map note images', lambda job: export_map_note_images.export_map_note_images(project))
 
     def on_export_pds_maps(self, event):
         if not self.basic_checks():
@@ -1074,13 +1259,14 @@ class MyFrame(wx.Frame):
         ap_icon_size = self.ap_icon_size_text_box.GetValue()
         ap_name_label_size = self.ap_name_label_size_text_box.GetValue()
 
-        # Clear the stop event flag before starting the thread
-        self.stop_event.clear()
-
         try:
             ap_icon_size = int(ap_icon_size)  # Convert the input to a float
             ap_name_label_size = int(ap_name_label_size)  # Ensure the AP name label size value is an integer
-            create_pds_maps_threaded(self.working_directory, self.project_name, self.append_message, ap_icon_size, ap_name_label_size, self.stop_event)
+            from map_creator.create_pds_maps import create_pds_maps
+            from map_creator.map_encoding import get_map_encoding_options
+            working_directory, project_name, profile = self.working_directory, self.project_name, getattr(self, 'project_profile_module', None)
+            self.job_manager.submit('PDS maps', lambda job: create_pds_maps(working_directory, project_name, self.append_message, ap_icon_size, ap_name_label_size, job.cancel_token, job.report_progress,
+                                                                            get_map_encoding_options(profile)), exclusive_group=FLOOR_PLAN_OUTPUT)
 
         except ValueError:
             # Handle the case where the input is not a valid number
@@ -1093,22 +1279,48 @@ class MyFrame(wx.Frame):
         # Retrieve the numbers from the custom size text boxes as an integers
         self.ap_icon_size = int(self.ap_icon_size_text_box.GetValue())
         self.ap_name_label_size = int(self.ap_name_label_size_text_box.GetValue())
-
-        # Clear the stop event flag before starting the thread
-        self.stop_event.clear()
+        self.create_pdf_atlas = self.create_pdf_atlas_checkbox.GetValue()
+        self.create_svg_overlay = self.create_svg_overlay_checkbox.GetValue()
 
         try:
-            create_custom_ap_location_maps_threaded(self)
+            from map_creator.create_ap_location_maps import create_ap_location_maps
+            project = ProjectSnapshot(self)
+            self.job_manager.submit('AP location maps', lambda job: create_ap_location_maps(project, job.cancel_token, job.report_progress), exclusive_group=FLOOR_PLAN_OUTPUT)
 
         except ValueError:
             # Handle the case where the input is not a valid number
             wx.MessageBox("Please enter a valid number", "Error", wx.OK | wx.ICON_ERROR)
 
-    def on_create_zoomed_ap_maps(self, event):
+    def on_preview_maps(self, event):
         if not self.basic_checks():
             return
 
-        self.stop_event.clear()
+        try:
+            ap_icon_size = int(self.ap_icon_size_text_box.GetValue())
+            ap_name_label_size = int(self.ap_name_label_size_text_box.GetValue())
+        except ValueError:
+            # Handle the case where the input is not a valid number
+            wx.MessageBox("Please enter a valid number", "Error", wx.OK | wx.ICON_ERROR)
+            return
+
+        from map_creator.map_preview import preview_maps
+        preview_result = preview_maps(self, self.working_directory, self.project_name, ap_icon_size, ap_name_label_size)
+        if preview_result is None:
+            return
+
+        # The sizes confirmed in the preview are used for the full resolution maps
+        map_type, ap_icon_size, ap_name_label_size = preview_result
+        self.ap_icon_size_text_box.SetValue(str(ap_icon_size))
+        self.ap_name_label_size_text_box.SetValue(str(ap_name_label_size))
+
+        if map_type == 'PDS Maps':
+            self.on_export_pds_maps(event)
+        else:
+            self.on_create_ap_location_maps(event)
+
+    def on_create_zoomed_ap_maps(self, event):
+        if not self.basic_checks():
+            return
 
         # Retrieve the number from the zoomed AP crop size text box
         zoomed_ap_crop_size = self.zoomed_ap_crop_text_box.GetValue()
@@ -1118,7 +1330,11 @@ class MyFrame(wx.Frame):
         try:
             zoomed_ap_crop_size = int(zoomed_ap_crop_size)  # Convert the input to a float
             custom_ap_icon_size = int(ap_icon_size)  # Convert the input to a float
-            create_zoomed_ap_location_maps_threaded(self.working_directory, self.project_name, self.append_message, zoomed_ap_crop_size, custom_ap_icon_size, ap_name_label_size, self.stop_event)
+            from map_creator.create_zoomed_ap_location_maps import create_zoomed_ap_location_maps
+            from map_creator.map_encoding import get_map_encoding_options
+            working_directory, project_name, profile = self.working_directory, self.project_name, getattr(self, 'project_profile_module', None)
+            self.job_manager.submit('Zoomed AP maps', lambda job: create_zoomed_ap_location_maps(working_directory, project_name, self.append_message, zoomed_ap_crop_size, custom_ap_icon_size, ap_name_label_size, job.cancel_token, job.report_progress,
+                                                                                                 get_map_encoding_options(profile)), exclusive_group=FLOOR_PLAN_OUTPUT)
         except ValueError:
             # Handle the case where the input is not a valid number
             wx.MessageBox("Please enter a valid number", "Error", wx.OK | wx.ICON_ERROR)
@@ -1126,12 +1342,35 @@ class MyFrame(wx.Frame):
     def on_export_blank_maps(self, event):
         if not self.basic_checks():
             return
-        extract_blank_maps(self.working_directory, self.project_name, self.append_message)
+        from map_creator.extract_blank_maps import extract_blank_maps
+        working_directory, project_name = self.working_directory, self.project_name
+        self.job_manager.submit('Blank maps', lambda job: extract_blank_maps(working_directory, project_name, self.append_message), exclusive_group=FLOOR_PLAN_OUTPUT)
 
     def on_create_pds_project(self, event):
         if not self.basic_checks():
             return
-        create_pds_project_esx(self, self.append_message)
+        project = ProjectSnapshot(self)
+        self.job_manager.submit('PDS project', lambda job: create_pds_project_esx(project, self.append_message), exclusive_group=FLOOR_PLAN_OUTPUT)
+
+    def on_run_deliverables(self, event):
+        if not self.basic_checks():
+            return
+
+        try:
+            # The map stages read their settings from the project snapshot
+            self.ap_icon_size = int(self.ap_icon_size_text_box.GetValue())
+            self.ap_name_label_size = int(self.ap_name_label_size_text_box.GetValue())
+            self.zoomed_ap_crop_size = int(self.zoomed_ap_crop_text_box.GetValue())
+            self.create_pdf_atlas = self.create_pdf_atlas_checkbox.GetValue()
+            self.create_svg_overlay = self.create_svg_overlay_checkbox.GetValue()
+
+            from deliverables_pipeline import run_deliverables_pipeline
+            project = ProjectSnapshot(self)
+            self.job_manager.submit('Deliverables', lambda job: run_deliverables_pipeline(project, job.cancel_token, job.report_progress), exclusive_group=FLOOR_PLAN_OUTPUT)
+
+        except ValueError:
+            # Handle the case where the input is not a valid number
+            wx.MessageBox("Please enter a valid number", "Error", wx.OK | wx.ICON_ERROR)
 
     def on_tab_changed(self, event):
         # Get the index of the newly selected tab
@@ -1156,8 +1395,42 @@ class MyFrame(wx.Frame):
         self.on_clear_log(None)
         return True
 
+    def get_instrumentation_options(self, job_name):
+        """Every job logs a timing summary, the trace file and the one-shot cProfile are set from the Admin tab."""
+        output_dir = self.working_directory / 'OUTPUT' / 'diagnostics' if self.working_directory else None
+
+        profile = self.profile_next_job
+        if profile:
+            self.profile_next_job = False
+            self.append_message(f"{job_name} will run under cProfile")
+
+        return {'output_dir': output_dir, 'write_trace': self.write_timing_trace_checkbox.GetValue(), 'profile': profile}
+
     def on_abort_thread(self, event):
-        self.stop_event.set()
+        # Cancels the running jobs and drops any queued behind them
+        self.job_manager.cancel_all()
+
+    def on_job_update(self, job_manager):
+        """Refresh the progress bar and status text, always called on the GUI thread."""
+        running_jobs = job_manager.running_jobs()
+        queued_jobs = job_manager.queued_jobs()
+
+        if not running_jobs:
+            self.job_progress_gauge.SetValue(0)
+            self.job_status_label.SetLabel(f"{len(queued_jobs)} job(s) queued" if queued_jobs else "")
+            job_manager.clear_finished()
+            return
+
+        job = running_jobs[0]
+        self.job_progress_gauge.SetValue(job.percent)
+
+        status = f"{job.name}: {job.detail} {job.percent}% ETA {format_eta(job.eta_seconds)}"
+        if len(running_jobs) > 1:
+            status += f" (+{len(running_jobs) - 1} running)"
+        if queued_jobs:
+            status += f" ({len(queued_jobs)} queued)"
+        self.job_status_label.SetLabel(status)
+        self.button_exit_row_sizer.Layout()
 
     def on_open_working_directory(self, event):
         if not self.esx_project_unpacked:
@@ -1186,6 +1459,7 @@ class MyFrame(wx.Frame):
         if not self.basic_checks():
             return
 
+        from rename_aps.rename_visualiser import visualise_ap_renaming
         visualise_ap_renaming(self.working_directory, self.project_name, self.append_message, self)
 
     def update_boundary_separator_value(self, value):
@@ -1198,11 +1472,15 @@ class MyFrame(wx.Frame):
         self.on_ap_rename_script_dropdown_selection(None)
 
     def check_for_updates_on_startup(self):
+        self.background_executor.submit(self.check_for_updates_in_background)
+        self.profile_update_checker.check_installed_profiles()
+
+    def check_for_updates_in_background(self):
         try:
             latest_sha = check_for_updates.get_latest_commit_sha()
             local_commit_sha = check_for_updates.get_git_commit_sha()
             if latest_sha != local_commit_sha:
-                self.append_message(f"** Update available **{nl}")
+                wx.CallAfter(self.append_message, f"** Update available **{nl}")
         except Exception as e:
             print(e)  # Check for updates failed
 
@@ -0,0 +1,205 @@
+# profile_update_checker.py
+
+"""
+Update checks for tracked project profiles.
+
+A tracked project profile declares where its latest version is published:
+
+    project_profile_id = 'acme-campus'
+    project_profile_version = 1.2
+    tracked_project_profile_version_url = 'https://example.com/profiles/versions.json'
+
+The version manifest at that URL maps profile IDs to {"version": ...}. Several
+profiles usually share one manifest, so checks are batched per URL: at startup
+every installed tracked profile is checked with one request per manifest URL,
+the profile attributes are read from source without importing the profiles.
+
+Manifests are kept in a TTL cache on disk, a profile selected within the TTL
+is checked without touching the network, and a start without a connection
+falls back to the last cached manifest. Requests share one pooled session.
+
+Nothing here runs on the GUI thread, results reach the log with wx.CallAfter.
+"""
+
+import json
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, Future
+
+import requests
+from requests.adapters import HTTPAdapter
+import wx
+
+from common import HASH_BAR
+from common import PROJECT_PROFILES_DIR
+
+from module_registry import available_modules, module_declarations, NOT_LITERAL
+from instrumentation import span, count
+
+# Cached version manifests younger than this are used without a request, in seconds
+MANIFEST_CACHE_TTL = 6 * 60 * 60
+REQUEST_TIMEOUT = 10
+
+# Manifest URLs fetched at once
+FETCH_WORKERS = 4
+
+
+def tracked_profile(source):
+    """The update check attributes of a profile module or its declarations, None if the profile is not tracked."""
+    get = source.get if isinstance(source, dict) else lambda name, default=None: getattr(source, name, default)
+    profile = {
+        'id': get('project_profile_id'),
+        'version': get('project_profile_version'),
+        'url': get('tracked_project_profile_version_url'),
+        'name': get('project_profile_name', get('project_profile_id')),
+        'acquisition_message': get('project_profile_update_acquisition_message', ''),
+    }
+    if any(profile[key] is None or profile[key] is NOT_LITERAL for key in ('id', 'version', 'url')):
+        return None
+    if profile['name'] is NOT_LITERAL:
+        profile['name'] = profile['id']
+    if profile['acquisition_message'] is NOT_LITERAL:
+        profile['acquisition_message'] = ''
+    return profile
+
+
+class ProfileUpdateChecker:
+    def __init__(self, cache_path, message_callback, ttl=MANIFEST_CACHE_TTL):
+        self.cache_path = cache_path
+        self.message_callback = message_callback
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.manifests = self.load_cache()  # url: {'fetched': epoch seconds, 'manifest': {...}}
+        self.in_flight = {}  # url: Future of the request in progress
+        self.reported = set()
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=FETCH_WORKERS, pool_maxsize=FETCH_WORKERS)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.executor = ThreadPoolExecutor(max_workers=FETCH_WORKERS, thread_name_prefix='profile-update')
+
+    def load_cache(self):
+        try:
+            with open(self.cache_path, 'r') as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return {}
+
+    def save_cache(self):
+        # Called with self.lock held
+        try:
+            with open(self.cache_path, 'w') as f:
+                json.dump(self.manifests, f, indent=2)
+        except OSError as e:
+            print(f"Failed to save the profile version cache: {e}")
+
+    def post(self, message):
+        wx.CallAfter(self.message_callback, message)
+
+    def fetch_manifest(self, url):
+        with span('profile manifest fetch', url=url):
+            response = self.session.get(url, timeout=REQUEST_TIMEOUT)
+            response.raise_for_status()
+            manifest = response.json()
+
+        with self.lock:
+            self.manifests[url] = {'fetched': time.time(), 'manifest': manifest}
+            self.save_cache()
+        return manifest
+
+    def manifest(self, url):
+        """The version manifest at url, from the cache while it is fresh. A failed request falls back to a stale cached copy."""
+        with self.lock:
+            cached = self.manifests.get(url)
+            if cached is not None and time.time() - cached['fetched'] < self.ttl:
+                count('profile manifest cache hits')
+                return cached['manifest']
+
+            # Concurrent checks of one URL share a single request
+            future = self.in_flight.get(url)
+            fetching = future is None
+            if fetching:
+                future = Future()
+                self.in_flight[url] = future
+
+        if fetching:
+            try:
+                future.set_result(self.fetch_manifest(url))
+            except (requests.RequestException, json.JSONDecodeError) as e:
+                future.set_exception(e)
+            finally:
+                with self.lock:
+                    self.in_flight.pop(url, None)
+
+        try:
+            return future.result()
+        except (requests.RequestException, json.JSONDecodeError):
+            if cached is not None:
+                return cached['manifest']
+            raise
+
+    def report(self, profile, manifest):
+        if profile['id'] not in manifest:
+            self.post(f"Error checking for updates: Lookup ID {profile['id']} not found in the lookup data from {profile['url']}.")
+            return
+
+        latest_version = manifest[profile['id']]['version']
+        if profile['version'] < latest_version:
+            with self.lock:
+                # Once per session, the startup check and restoring the selected profile would otherwise both report it
+                if (profile['id'], profile['version'], latest_version) in self.reported:
+                    return
+                self.reported.add((profile['id'], profile['version'], latest_version))
+            self.post(HASH_BAR)
+            self.post(f"Update available for {profile['name']}: {profile['version']} -> {latest_version}")
+            self.post(profile['acquisition_message'])
+
+    def check_url(self, url, profiles):
+        """Check profiles sharing a version manifest URL. Blocks, runs on the checker's worker pool."""
+        try:
+            manifest = self.manifest(url)
+        except (requests.RequestException, json.JSONDecodeError) as e:
+            self.post(f"Error checking for updates: {e}")
+            return
+        for profile in profiles:
+            try:
+                self.report(profile, manifest)
+            except (KeyError, TypeError, ValueError) as e:
+                # A malformed manifest entry, e.g. no version or a version that does not compare with the profile's
+                self.post(f"Error checking for updates: {e}")
+
+    def check_profiles(self, profiles):
+        """Check tracked profiles with one manifest lookup per URL, returns without waiting."""
+        profiles_by_url = {}
+        for profile in profiles:
+            profiles_by_url.setdefault(profile['url'], []).append(profile)
+
+        for url, url_profiles in profiles_by_url.items():
+            self.executor.submit(self.check_url, url, url_profiles)
+
+    def check_profile_module(self, project_profile_module):
+        """Check the selected profile, returns without waiting."""
+        profile = tracked_profile(project_profile_module)
+        if profile is not None:
+            self.check_profiles([profile])
+
+    def check_installed_profiles(self):
+        """Check every installed tracked profile, returns without waiting."""
+        self.executor.submit(self.check_installed_profiles_in_background)
+
+    def check_installed_profiles_in_background(self):
+        profiles = []
+        for name in available_modules(PROJECT_PROFILES_DIR):
+            try:
+                profile = tracked_profile(module_declarations(PROJECT_PROFILES_DIR, name))
+            except (OSError, SyntaxError):
+                continue
+            if profile is not None:
+                profiles.append(profile)
+
+        self.check_profiles(profiles)
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self.session.close()
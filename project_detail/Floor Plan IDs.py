@@ -2,7 +2,7 @@
 
 from common import nl
 from common import load_json
-from PIL import Image
+from map_creator.map_creator_comon import read_floor_image_info
 
 
 def create_custom_floor_plans_dict(floor_plans_json):
@@ -14,9 +14,9 @@ def create_custom_floor_plans_dict(floor_plans_json):
 
 
 def map_bitmap_resolution_check(project_dir, bitmapImageId):
-    """Check the resolution of the bitmap image."""
-    bitmap_image = Image.open(project_dir / f"image-{bitmapImageId}")
-    return bitmap_image.width, bitmap_image.height
+    """Check the resolution of the bitmap image, only the image header is read."""
+    bitmap_image_info = read_floor_image_info(project_dir / f"image-{bitmapImageId}")
+    return bitmap_image_info.width, bitmap_image_info.height
 
 
 def run(working_directory, project_name, message_callback):
@@ -2,7 +2,6 @@
 
 from common import nl
 from common import load_json
-from PIL import Image
 
 
 def create_custom_floor_plans_dict(floor_plans_json):
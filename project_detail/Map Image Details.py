@@ -2,7 +2,7 @@
 
 from common import nl
 from common import load_json
-from PIL import Image
+from map_creator.map_creator_comon import floor_image_index
 
 
 def create_custom_floor_plans_dict(floor_plans_json):
@@ -13,12 +13,6 @@ def create_custom_floor_plans_dict(floor_plans_json):
     return floor_plans_dict
 
 
-def map_bitmap_resolution_check(project_dir, bitmapImageId):
-    """Check the resolution of the bitmap image."""
-    bitmap_image = Image.open(project_dir / f"image-{bitmapImageId}")
-    return bitmap_image.width, bitmap_image.height
-
-
 def run(working_directory, project_name, message_callback):
     """Display the project details."""
 
@@ -38,6 +32,9 @@ def display_floor_plans_dict(project_dir, message_callback):
     floor_plans_json = load_json(project_dir, 'floorPlans.json', message_callback)
     custom_floor_plans_dict = create_custom_floor_plans_dict(floor_plans_json)
 
+    # Image headers only, so this stays quick for projects with many large floor plans
+    image_index = floor_image_index(project_dir, floor_plans_json)
+
     for floor_plan_name, floor_plan_data in sorted(custom_floor_plans_dict.items()):
         message_callback(f"{nl}{floor_plan_name}:{nl}")
 
@@ -52,8 +49,17 @@ def display_floor_plans_dict(project_dir, message_callback):
                              f"cropMaxX: {floor_plan_data['cropMaxX']}{nl}"
                              f"cropMaxY: {floor_plan_data['cropMaxY']}")
 
+        image_info = image_index.get(floor_plan_data['imageId'])
+        if image_info is not None:
+            message_callback(f"{nl}** Image details **{nl}"
+                             f"width: {image_info.width}{nl}"
+                             f"height: {image_info.height}{nl}"
+                             f"format: {image_info.format} {image_info.mode}{nl}"
+                             f"file size: {image_info.file_size / 1024:,.0f} KB")
+
         if "bitmapImageId" in floor_plan_data:
-            width, height = map_bitmap_resolution_check(project_dir, floor_plan_data["bitmapImageId"])
-            message_callback(f"{nl}** Bitmap image dimensions **{nl}"
-                             f"width: {width}{nl}"
-                             f"height: {height}")
+            bitmap_image_info = image_index.get(floor_plan_data["bitmapImageId"])
+            if bitmap_image_info is not None:
+                message_callback(f"{nl}** Bitmap image dimensions **{nl}"
+                                 f"width: {bitmap_image_info.width}{nl}"
+                                 f"height: {bitmap_image_info.height}")
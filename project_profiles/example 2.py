@@ -12,6 +12,18 @@ from common import UNKNOWN, FIVE_GHZ_RADIO_ID
 requiredTagKeys = ()
 optionalTagKeys = ()
 
+# Optional, downscale / transcode survey photos on export, see survey/image_export_common.py for all options
+# photo_export_options = {'format': 'JPEG', 'max_dimension': 2048, 'quality': 85}
+
+# Optional, faster / smaller map image encoding, see map_creator/map_encoding.py for all options
+# map_encoding_options = {'compress_level': 1, 'quantize': True}
+
+# Optional, the stages run by 'All Deliverables', see deliverables_pipeline.py for all stages
+# deliverables_pipeline = ('validate', 'ap_list', 'ap_location_maps', 'pds_project')
+
+# Optional, the building order for 'Rename Across Projects', see rename_aps/multi_project_renamer.py
+# campus_building_order = ('North', 'South', 'Sports Hall')
+
 
 def create_custom_ap_list(access_points_json, floor_plans_dict, tag_keys_dict, simulated_radio_dict, antenna_types_dict, notes_dict):
     """Process access points to a structured list."""
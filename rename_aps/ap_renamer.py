@@ -5,17 +5,35 @@ from pathlib import Path
 from common import load_json
 from common import create_floor_plans_dict
 
-from common import save_and_move_json
-from common import re_bundle_project
+from common import save_json_compact
+from common import re_bundle_project_incremental
 from common import rename_aps
+from common import ap_name_for_sequence_number
 
 from common import rename_process_completion_message as completion_message
 from common import BOUNDARY_SEPARATION_WIDGET
 from common import RENAMED_APS_PROJECT_APPENDIX
+from common import ESX_EXTENSION
 
 
-def ap_renamer(working_directory, project_name, script_module, message_callback, boundary_separation=None, ap_sequence_start_number=1):
-    message_callback(f'Renaming APs within project: {project_name}')
+def sort_access_points(access_points_list, floor_plans_dict, script_module, boundary_separation=None):
+    if hasattr(script_module, BOUNDARY_SEPARATION_WIDGET):
+        return script_module.sort_logic(access_points_list, floor_plans_dict, boundary_separation)
+    return script_module.sort_logic(access_points_list, floor_plans_dict)
+
+
+def plan_ap_names(access_points_list, floor_plans_dict, script_module, boundary_separation=None, ap_sequence_start_number=1):
+    """Return [(ap, new name)] in naming order, the APs are not modified."""
+    access_points_list_sorted = sort_access_points(access_points_list, floor_plans_dict, script_module, boundary_separation)
+    return [(ap, ap_name_for_sequence_number(ap_sequence_number)) for ap_sequence_number, ap in enumerate(access_points_list_sorted, start=ap_sequence_start_number)]
+
+
+def ap_renamer(working_directory, project_name, script_module, message_callback, boundary_separation=None, ap_sequence_start_number=1, dry_run=False, stop_event=None):
+    """
+    Rename the APs with the selected script and re-bundle the project.
+    dry_run only exports the current -> new name mapping and overlay maps, nothing is modified.
+    """
+    message_callback(f'{"Dry run, renaming" if dry_run else "Renaming"} APs within project: {project_name}')
 
     floor_plans_json = load_json(working_directory / project_name, 'floorPlans.json', message_callback)
     access_points_json = load_json(working_directory / project_name, 'accessPoints.json', message_callback)
@@ -39,24 +57,29 @@ def ap_renamer(working_directory, project_name, script_module, message_callback,
         access_points_list.append(ap)
 
     if hasattr(script_module, 'SAR'):
+        if dry_run:
+            message_callback('Dry run is not supported by stand alone rename modules')
+            return
         script_module.run(working_directory, project_name, message_callback)
 
-    else:
-        # Sort the list of APs, by the floor name(floorPlanId lookup) and x coord
-        if hasattr(script_module, BOUNDARY_SEPARATION_WIDGET):
-            access_points_list_sorted = script_module.sort_logic(access_points_list, floor_plans_dict, boundary_separation)
+    elif dry_run:
+        # pandas and PIL are only needed for the dry run exports, keep them off the startup path
+        from rename_aps.rename_dry_run import rename_dry_run
 
-        else:
-            access_points_list_sorted = script_module.sort_logic(access_points_list, floor_plans_dict)
+        rename_plan = plan_ap_names(access_points_list, floor_plans_dict, script_module, boundary_separation, ap_sequence_start_number)
+        rename_dry_run(project_dir, renamed_aps_project_dir, project_name, rename_plan, floor_plans_json, floor_plans_dict, message_callback, stop_event)
 
-        access_points_list_renamed = rename_aps(access_points_list_sorted, message_callback, floor_plans_dict, ap_sequence_start_number)
+    else:
+        # Sort the list of APs, by the floor name(floorPlanId lookup) and x coord
+        access_points_list_sorted = sort_access_points(access_points_list, floor_plans_dict, script_module, boundary_separation)
 
-        # Save and Move the Updated JSON
-        updated_access_points_json = {'accessPoints': access_points_list_renamed}
-        save_and_move_json(updated_access_points_json, working_directory / project_name / 'accessPoints.json')
+        # Only the name of each AP changes, accessPoints.json keeps its AP order and every other field
+        rename_aps(access_points_list_sorted, message_callback, floor_plans_dict, ap_sequence_start_number)
+        save_json_compact(access_points_json, project_dir / 'accessPoints.json')
 
         output_project_name = f"{project_name}{RENAMED_APS_PROJECT_APPENDIX}"
 
-        # Re-bundle into .esx File
-        re_bundle_project(project_dir, renamed_aps_project_dir, output_project_name)
+        # Re-bundle into .esx File, reusing the compressed floor plans etc. of the original or a previously renamed project
+        base_bundles = (Path(working_directory) / f'{project_name}{ESX_EXTENSION}', renamed_aps_project_dir / f'{output_project_name}{ESX_EXTENSION}')
+        re_bundle_project_incremental(project_dir, renamed_aps_project_dir, output_project_name, base_bundles)
         completion_message(message_callback, output_project_name)
@@ -0,0 +1,77 @@
+# boundary_groups.py
+
+"""
+Row / column grouping shared by the Dynamic Rows and Dynamic Columns rename scripts.
+
+The floor order, model order and the order of each floor's APs along the
+grouping axis do not depend on the boundary separator, BoundaryGroups works
+them out once. Grouping for a boundary separator value is then a single pass
+over each floor's pre-sorted coordinates plus one np.lexsort, cheap enough
+to re-run while the visualiser's boundary separator slider moves.
+
+Group IDs are returned alongside the sorted APs, never written into the AP
+JSON, so they cannot end up in the saved accessPoints.json.
+"""
+
+import numpy as np
+
+from rename_aps.sort_keys import floor_name_key, floor_id_key, model_key, coordinate_key
+
+# Boundary orientation: (grouping axis, sorting axis within a group)
+ORIENTATION_AXES = {
+    'horizontal': ('y', 'x'),
+    'vertical': ('x', 'y'),
+}
+
+
+class BoundaryGroups:
+    def __init__(self, access_points_list, floor_plans_dict, orientation):
+        group_axis, order_axis = ORIENTATION_AXES[orientation]
+        self.orientation = orientation
+
+        floor_key = floor_name_key(access_points_list, floor_plans_dict)
+        floor_ids = floor_id_key(access_points_list)
+        group_coordinates = coordinate_key(access_points_list, group_axis)
+
+        # Pre-sort by floor name, floor, then coordinate along the grouping axis
+        order = np.lexsort((group_coordinates, floor_ids, floor_key))
+        self.access_points = [access_points_list[i] for i in order]
+        self.floor_key = floor_key[order]
+        self.model_key = model_key(access_points_list)[order]
+        self.group_coordinates = group_coordinates[order].tolist()
+        self.order_coordinates = coordinate_key(access_points_list, order_axis)[order]
+
+        # (start, end) of each floor within the pre-sorted arrays
+        floor_starts = np.flatnonzero(np.diff(floor_ids[order])) + 1
+        edges = [0, *floor_starts.tolist(), len(self.access_points)]
+        self.floor_slices = list(zip(edges[:-1], edges[1:])) if self.access_points else []
+
+    def assign(self, boundary_separator):
+        """
+        Group and sort the APs for a boundary separator value, returns (sorted APs, group ID of each sorted AP, boundaries).
+        Does not modify the APs, so it may run on a worker thread.
+        """
+        if boundary_separator <= 0:
+            raise ValueError(f"Boundary separator must be greater than 0, not {boundary_separator}")
+
+        coordinates = self.group_coordinates
+        groups = np.empty(len(coordinates), dtype=np.int64)
+        boundaries = []
+
+        for start, end in self.floor_slices:
+            # The first AP on each floor defines the start of the first group
+            group = 1
+            group_start = coordinates[start]
+            boundaries.append(group_start)
+
+            for i in range(start, end):
+                while coordinates[i] - group_start > boundary_separator:
+                    # Outside the current group, start a new group
+                    group += 1
+                    group_start += boundary_separator
+                    boundaries.append(group_start)
+                groups[i] = group
+
+        # Sort by floor name, model, group ID, then coordinate within each group
+        order = np.lexsort((self.order_coordinates, groups, self.model_key, self.floor_key))
+        return [self.access_points[i] for i in order], groups[order].tolist(), boundaries
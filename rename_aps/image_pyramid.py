@@ -0,0 +1,87 @@
+# image_pyramid.py
+
+"""
+Size aware cache of floor plan images for the rename visualiser.
+
+Level n of a floor plan is the image reduced by 2**n, decoded straight from the
+.esx image file (JPEG floor plans via PIL draft(), everything else via reduce())
+and stored as uint8, never as the float arrays returned by matplotlib imread.
+The visualiser asks for the coarsest level that still matches the on screen
+resolution, finer levels are only decoded when zooming in. Cached levels are
+evicted least recently used first, once the cache exceeds its byte budget.
+"""
+
+import math
+from collections import OrderedDict
+
+import numpy as np
+from PIL import Image
+
+from map_creator.map_creator_comon import read_floor_image_info
+
+# Upper bound for the decoded levels held in memory, the level in use is always kept
+IMAGE_CACHE_BYTES = 256 * 1024 * 1024
+
+# Modes Image.reduce() averages correctly, palette, bilevel and 16 bit images are converted first
+REDUCIBLE_MODES = ('L', 'RGB', 'RGBA')
+
+
+class ImagePyramidCache:
+    def __init__(self, byte_budget=IMAGE_CACHE_BYTES):
+        self.byte_budget = byte_budget
+        self.levels = OrderedDict()  # (path, level): uint8 array, least recently used first
+        self.cached_bytes = 0
+
+    @staticmethod
+    def full_size(path):
+        """(width, height) of the full resolution image, from the image header only."""
+        image_info = read_floor_image_info(path)
+        return image_info.width, image_info.height
+
+    def level_for(self, path, screen_scale):
+        """The coarsest level with at least one image pixel per screen pixel, screen_scale is screen pixels per full resolution pixel."""
+        if screen_scale <= 0 or screen_scale >= 1:
+            return 0
+        max_level = int(math.log2(max(self.full_size(path))))
+        return min(int(math.log2(1 / screen_scale)), max_level)
+
+    def get(self, path, level):
+        key = (str(path), level)
+        if key in self.levels:
+            self.levels.move_to_end(key)
+            return self.levels[key]
+
+        array = self.decode_level(path, level)
+        self.levels[key] = array
+        self.cached_bytes += array.nbytes
+        self.evict()
+        return array
+
+    def evict(self):
+        while self.cached_bytes > self.byte_budget and len(self.levels) > 1:
+            _, array = self.levels.popitem(last=False)
+            self.cached_bytes -= array.nbytes
+
+    @staticmethod
+    def decode_level(path, level):
+        factor = 2 ** level
+        with Image.open(path) as image:
+            target_size = (math.ceil(image.width / factor), math.ceil(image.height / factor))
+
+            # JPEG images decode straight to a 1/2, 1/4 or 1/8 scale, at least as large as requested
+            image.draft('RGB', target_size)
+
+            if image.mode not in REDUCIBLE_MODES:
+                image = image.convert('RGBA' if 'A' in image.mode or 'transparency' in image.info else 'RGB')
+
+            reduce_factor = image.width // target_size[0]
+            if reduce_factor > 1:
+                image = image.reduce(reduce_factor)
+            else:
+                image.load()
+
+            # imshow colour maps single channel images, keep everything as RGB / RGBA
+            if image.mode == 'L':
+                image = image.convert('RGB')
+
+            return np.asarray(image)
@@ -0,0 +1,135 @@
+# multi_project_renamer.py
+
+"""
+Rename the APs of several projects with one continuous AP numbering, e.g. a
+campus whose buildings are designed in separate .esx files.
+
+The projects are read straight from their .esx files in parallel and ordered
+by the project profile 'campus_building_order'. Each project is given the
+next contiguous range of sequence numbers, then the renamed bundles are
+written concurrently. Only accessPoints.json is replaced, every other file
+is copied still compressed. A global mapping table covers every project.
+
+campus_building_order = ('North', 'South', 'Sports Hall')
+
+A project belongs to the first building whose name is part of the project
+file name, projects matching no building follow in project name order.
+"""
+
+import json
+import zipfile
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from common import create_floor_plans_dict
+from common import re_bundle_esx_with_replaced_files
+from common import nl
+from common import ERROR
+from common import PROCESS_ABORTED
+from common import RENAMED_APS_PROJECT_APPENDIX
+
+from rename_aps.ap_renamer import plan_ap_names
+from rename_aps.rename_dry_run import rename_mapping_rows, export_rename_mapping
+
+from instrumentation import span
+from instrumentation import in_current_run
+
+# Projects read / written at once
+PROJECT_WORKERS = 4
+
+
+def load_esx_project(esx_path):
+    """Read the JSON needed for renaming straight from the .esx file."""
+    esx_path = Path(esx_path)
+    with span('load project', file=esx_path.name), zipfile.ZipFile(esx_path) as esx_zip:
+        return {
+            'esx_path': esx_path,
+            'project_name': esx_path.stem,
+            'floor_plans_json': json.loads(esx_zip.read('floorPlans.json')),
+            'access_points_json': json.loads(esx_zip.read('accessPoints.json'))
+        }
+
+
+def building_sort_key(project_name, building_order):
+    for rank, building in enumerate(building_order):
+        if building.lower() in project_name.lower():
+            return rank, project_name
+    return len(building_order), project_name
+
+
+def write_renamed_project(project, output_dir):
+    """Apply the project's rename plan and write the renamed bundle, returns the output project name."""
+    for ap, new_name in project['rename_plan']:
+        ap['name'] = new_name
+
+    output_project_name = f"{project['project_name']}{RENAMED_APS_PROJECT_APPENDIX}"
+    access_points_data = json.dumps(project['access_points_json'], separators=(',', ':')).encode('utf-8')
+    re_bundle_esx_with_replaced_files(project['esx_path'], output_dir, output_project_name, {'accessPoints.json': access_points_data})
+    return output_project_name
+
+
+def multi_project_ap_renamer(esx_paths, script_module, message_callback, boundary_separation=None, ap_sequence_start_number=1, building_order=(), stop_event=None):
+    """Rename the APs of every project in esx_paths, numbering continues from one project to the next."""
+    if hasattr(script_module, 'SAR'):
+        message_callback('Stand alone rename modules do not support renaming across projects')
+        return
+
+    message_callback(f'Renaming APs across {len(esx_paths)} projects{nl}')
+
+    with ThreadPoolExecutor(max_workers=max(1, min(PROJECT_WORKERS, len(esx_paths))), thread_name_prefix='rename-load') as executor:
+        futures = {executor.submit(in_current_run(load_esx_project), esx_path): esx_path for esx_path in esx_paths}
+        projects = []
+        for future in as_completed(futures):
+            try:
+                projects.append(future.result())
+            except (OSError, KeyError, zipfile.BadZipFile, json.JSONDecodeError) as e:
+                message_callback(f'{ERROR}Failed to read {Path(futures[future]).name}: {e}')
+                return
+
+    projects.sort(key=lambda project: building_sort_key(project['project_name'], building_order))
+
+    # Allocate contiguous sequence number ranges, in building order
+    mapping_rows = []
+    ap_sequence_number = ap_sequence_start_number
+    for project in projects:
+        floor_plans_dict = create_floor_plans_dict(project['floor_plans_json'])
+        project['rename_plan'] = plan_ap_names(list(project['access_points_json']['accessPoints']), floor_plans_dict, script_module, boundary_separation, ap_sequence_number)
+        mapping_rows.extend({'Project': project['project_name'], **row} for row in rename_mapping_rows(project['rename_plan'], floor_plans_dict))
+
+        if project['rename_plan']:
+            message_callback(f"{project['project_name']}: {len(project['rename_plan'])} APs, {project['rename_plan'][0][1]} to {project['rename_plan'][-1][1]}")
+        else:
+            message_callback(f"{project['project_name']}: no APs")
+        ap_sequence_number += len(project['rename_plan'])
+
+    if stop_event is not None and stop_event.is_set():
+        message_callback(PROCESS_ABORTED)
+        return
+
+    # The global mapping table is saved alongside the first project
+    mapping_output_dir = projects[0]['esx_path'].parent / 'OUTPUT' / 'RENAMED APs'
+    mapping_output_dir.mkdir(parents=True, exist_ok=True)
+    if mapping_rows:
+        for path in export_rename_mapping(mapping_rows, mapping_output_dir, 'Multi-project'):
+            message_callback(f'"{path.name}" created successfully')
+
+    with ThreadPoolExecutor(max_workers=max(1, min(PROJECT_WORKERS, len(projects))), thread_name_prefix='rename-write') as executor:
+        futures = {}
+        for project in projects:
+            output_dir = project['esx_path'].parent / 'OUTPUT' / 'RENAMED APs'
+            output_dir.mkdir(parents=True, exist_ok=True)
+            futures[executor.submit(in_current_run(write_renamed_project), project, output_dir)] = project
+
+        failures = 0
+        for future in as_completed(futures):
+            try:
+                message_callback(f'{future.result()}.esx saved')
+            except Exception as e:
+                failures += 1
+                message_callback(f"{ERROR}Failed to write the renamed {futures[future]['project_name']}: {e}")
+
+    if failures:
+        message_callback(f'{nl}### PROCESS INCOMPLETE ###')
+        return
+
+    message_callback(f"{nl}Renamed projects saved within the 'OUTPUT/RENAMED APs' directories{nl}{nl}### PROCESS COMPLETE ###")
@@ -0,0 +1,146 @@
+# rename_dry_run.py
+
+"""
+Dry run of the AP renaming, the project is not modified.
+
+The current -> new name mapping is exported as CSV and XLSX, along with one
+overlay map per floor showing the renaming sequence and the new names, so a
+naming scheme can be checked before it is applied. Floor plans are decoded at
+reduced resolution, a dry run of a large project takes a second or two.
+"""
+
+import csv
+import pandas as pd
+from pathlib import Path
+from PIL import ImageDraw
+
+from common import model_antenna_split
+from common import adjust_column_widths
+from common import format_headers
+from common import nl
+from common import PROCESS_ABORTED
+
+from map_creator.map_creator_comon import set_font
+from map_creator.map_preview import decode_floor_image_preview
+
+from instrumentation import span
+
+# Longest edge of the overlay maps in pixels
+OVERLAY_MAX_DIMENSION = 2400
+OVERLAY_MARKER_RADIUS = 7
+OVERLAY_FONT_SIZE = 14
+
+
+def rename_mapping_rows(rename_plan, floor_plans_dict):
+    """One row per AP, in the new naming order."""
+    rows = []
+    for ap, new_name in rename_plan:
+        rows.append({
+            'Floor': floor_plans_dict.get(ap['location']['floorPlanId'], {}).get('name', ''),
+            'Model': model_antenna_split(ap.get('model', ''))[0],
+            'Current Name': ap['name'],
+            'New Name': new_name,
+            'Changed': 'Yes' if ap['name'] != new_name else 'No',
+            'AP ID': ap['id']
+        })
+    return rows
+
+
+def export_rename_mapping(rows, output_dir, file_stem):
+    csv_path = output_dir / f'{file_stem} - rename mapping.csv'
+    with span('csv write', file=csv_path.name), open(csv_path, 'w', newline='', encoding='utf-8') as csv_file:
+        writer = csv.DictWriter(csv_file, fieldnames=list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows)
+
+    xlsx_path = output_dir / f'{file_stem} - rename mapping.xlsx'
+    mapping_df = pd.DataFrame(rows)
+    with span('xlsx write', file=xlsx_path.name), pd.ExcelWriter(xlsx_path, engine='xlsxwriter') as writer:
+        sheet_name = 'Rename Mapping'
+        mapping_df.to_excel(writer, sheet_name=sheet_name, index=False)
+        adjust_column_widths(mapping_df, writer, sheet_name)
+        format_headers(mapping_df, writer, sheet_name)
+
+    return csv_path, xlsx_path
+
+
+def draw_rename_overlay(floor_preview, floor, rename_plan_on_floor):
+    """Draw the renaming sequence and new names over a decoded preview floor, current names are shown beneath when they change."""
+    preview_image, _ = floor_preview
+    overlay = preview_image.copy()
+    draw = ImageDraw.Draw(overlay)
+    font = set_font(OVERLAY_FONT_SIZE)
+    small_font = set_font(max(1, OVERLAY_FONT_SIZE - 4))
+    scaling_ratio = overlay.width / floor['width']
+
+    points = [(ap['location']['coord']['x'] * scaling_ratio, ap['location']['coord']['y'] * scaling_ratio) for ap, _ in rename_plan_on_floor]
+
+    # Renaming sequence
+    if len(points) > 1:
+        draw.line(points, fill='grey', width=2)
+
+    r = OVERLAY_MARKER_RADIUS
+    for (ap, new_name), (x, y) in zip(rename_plan_on_floor, points):
+        draw.ellipse((x - r, y - r, x + r, y + r), fill=ap.get('color', '#FFFFFF'), outline='black')
+
+        label_x, label_y = x + r + 2, y - r
+        text_box = draw.textbbox((label_x, label_y), new_name, font=font)
+        draw.rectangle(text_box, fill='white')
+        draw.text((label_x, label_y), new_name, fill='black', font=font)
+
+        if ap['name'] != new_name:
+            current_name_y = text_box[3] + 1
+            draw.rectangle(draw.textbbox((label_x, current_name_y), ap['name'], font=small_font), fill='white')
+            draw.text((label_x, current_name_y), ap['name'], fill='red', font=small_font)
+
+    return overlay
+
+
+def create_rename_overlay_maps(rename_plan, floor_plans_json, project_dir, output_dir, file_stem, stop_event=None):
+    """One overlay map per floor with APs, returns the paths written, stops early when stop_event is set."""
+    overlay_paths = []
+    for floor in floor_plans_json['floorPlans']:
+        if stop_event is not None and stop_event.is_set():
+            break
+
+        rename_plan_on_floor = [(ap, new_name) for ap, new_name in rename_plan if ap['location']['floorPlanId'] == floor['id']]
+        if not rename_plan_on_floor:
+            continue
+
+        floor_id = floor['bitmapImageId'] if 'bitmapImageId' in floor else floor['imageId']
+        floor_preview = decode_floor_image_preview(project_dir / ('image-' + floor_id), OVERLAY_MAX_DIMENSION)
+        overlay = draw_rename_overlay(floor_preview, floor, rename_plan_on_floor)
+
+        overlay_path = output_dir / f"{file_stem} - {floor['name']} - rename overlay.png"
+        with span('overlay write', file=overlay_path.name):
+            overlay.convert('RGB').save(overlay_path, 'PNG', compress_level=1)
+        overlay_paths.append(overlay_path)
+
+    return overlay_paths
+
+
+def rename_dry_run(project_dir, output_dir, project_name, rename_plan, floor_plans_json, floor_plans_dict, message_callback, stop_event=None):
+    """Export the rename mapping and overlay maps for a rename plan of (ap, new name) pairs."""
+    output_dir = Path(output_dir) / 'DRY RUN'
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    rows = rename_mapping_rows(rename_plan, floor_plans_dict)
+    if not rows:
+        message_callback(f'No APs to rename within project: {project_name}')
+        return
+
+    changed = sum(row['Changed'] == 'Yes' for row in rows)
+    message_callback(f'Dry run: {changed} of {len(rows)} AP names would change{nl}')
+
+    csv_path, xlsx_path = export_rename_mapping(rows, output_dir, project_name)
+    message_callback(f'"{csv_path.name}" created successfully')
+    message_callback(f'"{xlsx_path.name}" created successfully')
+
+    for overlay_path in create_rename_overlay_maps(rename_plan, floor_plans_json, Path(project_dir), output_dir, project_name, stop_event):
+        message_callback(f'"{overlay_path.name}" created successfully')
+
+    if stop_event is not None and stop_event.is_set():
+        message_callback(PROCESS_ABORTED)
+        return
+
+    message_callback(f"{nl}Nothing in the project has been modified, files saved within 'OUTPUT/RENAMED APs/DRY RUN'{nl}{nl}### PROCESS COMPLETE ###")
@@ -1,6 +1,6 @@
 # simple, x-axis.py
 
-from common import model_sort_order
+from rename_aps.sort_keys import lexsorted, floor_name_key, model_key, coordinate_key
 
 ONE_LINER_DESCRIPTION = 'APs sorted by: floor, model, y-axis value'
 
@@ -35,6 +35,7 @@ resulting AP names should look like:
     AP-001, AP-002, AP-003..."""
 
 def sort_logic(access_points_list, floor_plans_dict):
-    return sorted(access_points_list, key=lambda i: (floor_plans_dict.get(i['location']['floorPlanId']).get('name'),
-                                                     model_sort_order.get(i['model'], i['model']),
-                                                     i['location']['coord']['y']))
+    return lexsorted(access_points_list,
+                     floor_name_key(access_points_list, floor_plans_dict),
+                     model_key(access_points_list),
+                     coordinate_key(access_points_list, 'y'))
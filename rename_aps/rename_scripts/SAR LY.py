@@ -10,6 +10,8 @@ from common import rename_process_completion_message as completion_message
 
 from common import RENAMED_APS_PROJECT_APPENDIX
 
+from rename_aps.sort_keys import lexsorted, ordinals, floor_name_key, coordinate_key
+
 # Add an attribute to the module
 SAR = "This is a Stand Alone Rename module"
 
@@ -29,12 +31,19 @@ def create_tag_keys_dict(tag_keys_json):
     return tag_keys_dict
 
 
-def get_sort_value(tags_list, tag_key, tag_keys_dict):
+def get_tag_values(tags_list):
+    """Map each tagKeyId to its value, the first tag wins when a key is repeated."""
+    tag_values = {}
+    for tag in reversed(tags_list):
+        tag_values[tag.get('tagKeyId')] = tag.get('value', '-   ***   TagValue is empty   ***   -')
+    return tag_values
+
+
+def get_sort_value(tag_values, tag_key, tag_keys_dict):
     """Retrieves the sorting value for a given tag, applying custom sorting if specified."""
     sort_tag_id = tag_keys_dict.get(tag_key, 'Z')
-    for tag in tags_list:
-        if tag.get('tagKeyId') == sort_tag_id:
-            return sort_order_override.get(tag.get('value'), tag.get('value', '-   ***   TagValue is empty   ***   -'))
+    if sort_tag_id in tag_values:
+        return sort_order_override.get(tag_values[sort_tag_id], tag_values[sort_tag_id])
     return 'Z'
 
 
@@ -49,13 +58,15 @@ def get_rename_value(tags_list, tag_key, tag_keys_dict):
 
 def sort_access_points(access_points, tag_keys_dict, floor_plans_dict):
     """Sorts access points based on multiple criteria."""
-    return sorted(access_points, key=lambda ap: (
-        get_sort_value(ap.get('tags', []), 'UNIT', tag_keys_dict),
-        get_sort_value(ap.get('tags', []), 'building-group', tag_keys_dict),
-        floor_plans_dict.get(ap['location'].get('floorPlanId', 'missing_floorPlanId')),
-        get_sort_value(ap.get('tags', []), 'sequence-override', tag_keys_dict),
-        ap['location']['coord']['x']
-    ))
+    # Each AP's tag list is read once, not once per sort key
+    tag_values = [get_tag_values(ap.get('tags', [])) for ap in access_points]
+
+    return lexsorted(access_points,
+                     ordinals([get_sort_value(i, 'UNIT', tag_keys_dict) for i in tag_values]),
+                     ordinals([get_sort_value(i, 'building-group', tag_keys_dict) for i in tag_values]),
+                     floor_name_key(access_points, floor_plans_dict),
+                     ordinals([get_sort_value(i, 'sequence-override', tag_keys_dict) for i in tag_values]),
+                     coordinate_key(access_points, 'x'))
 
 
 def rename_aps(access_points, tag_keys_dict, floor_plans_dict, message_callback):
@@ -1,5 +1,7 @@
 # simple, x-axis.py
 
+from rename_aps.sort_keys import lexsorted, floor_name_key, coordinate_key
+
 ONE_LINER_DESCRIPTION = 'APs sorted by: floor, x-axis value'
 
 SHORT_DESCRIPTION = f"""Intended for simulated APs
@@ -29,8 +31,9 @@ resulting AP names should look like:
 
 
 def sort_logic(access_points_list, floor_plans_dict):
-    return sorted(access_points_list, key=lambda i: (floor_plans_dict.get(i['location']['floorPlanId']).get('name'),
-                                                     i['location']['coord']['x']))
+    return lexsorted(access_points_list,
+                     floor_name_key(access_points_list, floor_plans_dict),
+                     coordinate_key(access_points_list, 'x'))
 
 
 def connections_colour_logic():
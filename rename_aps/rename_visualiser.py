@@ -1,22 +1,32 @@
 import wx
+import math
 import platform
 
-import matplotlib.image as mpimg
+from concurrent.futures import ThreadPoolExecutor
 from matplotlib.backends.backend_wxagg import FigureCanvasWxAgg as FigureCanvas
+from matplotlib.collections import LineCollection
 from matplotlib.figure import Figure
-from pathlib import Path
 
-from common import import_module_from_path
 from common import load_json
 from common import create_floor_plans_dict
 from common import model_antenna_split
 
-from common import discover_available_scripts
 from common import RENAME_APS_DIR
 from common import BOUNDARY_SEPARATION_WIDGET
 
 from common import nl
 
+from rename_aps.image_pyramid import ImagePyramidCache
+
+from module_registry import available_modules
+from module_registry import load_module
+
+# Zoom factor per mouse wheel step
+SCROLL_ZOOM_STEP = 1.25
+
+# Re-sort once the boundary separator slider has been still for this long
+SLIDER_DEBOUNCE_MS = 150
+
 
 class MapDialog(wx.Dialog):
     """A dialog for displaying maps and access point information."""
@@ -30,12 +40,20 @@ class MapDialog(wx.Dialog):
         self.current_dropdown_selection = parent.ap_rename_script_dropdown.GetSelection()
 
         self.current_sorting_module = None
-        self.image_cache = {}  # Cache for loaded images
+        self.image_pyramid = ImagePyramidCache()  # Downsampled floor plans, within a byte budget
         self.rename_aps_boundary_separator = parent.rename_aps_boundary_separator
         self.update_boundary_separator_value = parent.update_boundary_separator_value
         self.update_ap_rename_script_dropdown_selection = parent.update_ap_rename_script_dropdown_selection
         self.message_callback = parent.append_message
         self.boundaries = None
+        self.aps_per_floor = self.count_aps_per_floor(ap_data)
+
+        # Boundary separator slider, the current floor is pre-sorted once and re-grouped on a worker thread
+        self.boundary_groups = None
+        self.group_ids = None  # Row / column of each sorted AP, kept out of the AP data
+        self.sort_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='boundary-sort')
+        self.sort_generation = 0
+        self.slider_timer = None
 
         self.init_ui()
 
@@ -71,20 +89,68 @@ class MapDialog(wx.Dialog):
         self.map_choice = wx.Choice(self.panel, choices=sorted(self.map_data.keys()))
         self.map_choice.Bind(wx.EVT_CHOICE, self.on_map_change)
 
-        self.rename_choice = wx.Choice(self.panel, choices=discover_available_scripts(RENAME_APS_DIR))
+        self.rename_choice = wx.Choice(self.panel, choices=available_modules(RENAME_APS_DIR))
         self.rename_choice.Bind(wx.EVT_CHOICE, self.on_rename_change)
         self.rename_choice.SetSelection(self.current_dropdown_selection)
 
     def setup_figure(self):
-        """Setup the matplotlib figure."""
+        """
+        Setup the matplotlib figure.
+        The floor plan is drawn once per floor and cached as the blit background, the AP layer
+        (one marker collection, one connection collection, the numbers and boundaries) is animated
+        and only redrawn over that background when the sorting changes.
+        """
         self.figure = Figure()
         self.canvas = FigureCanvas(self.panel, -1, self.figure)
+        self.ax = self.figure.add_subplot(111)
+        self.ax.axis('off')
+
+        self.background = None
+        self.background_image = None
+        self.displayed_map = None
+        self.displayed_level = None
+
+        self.ap_markers = self.ax.scatter([], [], s=280, zorder=5, animated=True)
+        self.ap_numbers = []
+        self.connections = LineCollection([], zorder=4, animated=True)
+        self.ax.add_collection(self.connections)
+        self.boundary_lines = LineCollection([], colors='b', linestyles='--', linewidths=1, animated=True)
+        self.ax.add_collection(self.boundary_lines)
+        self.boundary_labels = []
+
+        # A full redraw (first show, resize) refreshes the cached background
+        self.canvas.mpl_connect('draw_event', self.on_canvas_draw)
+        self.canvas.mpl_connect('scroll_event', self.on_scroll)
+        # The canvas size is only final after layout, a resize may need a different pyramid level
+        self.canvas.mpl_connect('resize_event', self.on_canvas_resize)
+
+    def screen_scale(self):
+        """On screen pixels per full resolution pixel of the visible area."""
+        x_min, x_max = self.ax.get_xlim()
+        y_bottom, y_top = self.ax.get_ylim()
+        return min(self.ax.bbox.width / abs(x_max - x_min), self.ax.bbox.height / abs(y_bottom - y_top))
 
     def load_image(self, img_path):
-        """Load and cache the image to avoid redundant disk reads."""
-        if img_path not in self.image_cache:
-            self.image_cache[img_path] = mpimg.imread(img_path)
-        return self.image_cache[img_path]
+        """
+        Load the pyramid level of the image matching the visible area at the current on screen size.
+        Returns only the visible window of that level (a view, not a copy) and its extent in full resolution pixels.
+        """
+        width, height = self.image_pyramid.full_size(img_path)
+        x_min, x_max = self.ax.get_xlim()
+        y_bottom, y_top = self.ax.get_ylim()
+        self.displayed_level = self.image_pyramid.level_for(img_path, self.screen_scale())
+        img = self.image_pyramid.get(img_path, self.displayed_level)
+
+        # Full resolution pixels per level pixel
+        x_scale, y_scale = width / img.shape[1], height / img.shape[0]
+
+        column_start = max(0, int((x_min + 0.5) // x_scale))
+        column_end = min(img.shape[1], math.ceil((x_max + 0.5) / x_scale))
+        row_start = max(0, int((y_top + 0.5) // y_scale))
+        row_end = min(img.shape[0], math.ceil((y_bottom + 0.5) / y_scale))
+
+        extent = (column_start * x_scale - 0.5, column_end * x_scale - 0.5, row_end * y_scale - 0.5, row_start * y_scale - 0.5)
+        return img[row_start:row_end, column_start:column_end], extent
 
     def setup_layout(self):
         """Setup the layout of the dialog."""
@@ -113,17 +179,20 @@ class MapDialog(wx.Dialog):
     def on_map_change(self, event):
         """Handle map selection changes."""
         self.current_map = self.map_choice.GetStringSelection()
+        self.boundary_groups = None
+        if hasattr(self, 'slider'):
+            self.slider.SetMax(max(self.slider_max_value(), self.rename_aps_boundary_separator))
         self.update_plot()
 
     def on_rename_change(self, event):
         """Handle rename script selection changes."""
         self.boundaries = None
+        self.boundary_groups = None
         selected_script = self.rename_choice.GetStringSelection()
         # pass index back to parent
         self.update_ap_rename_script_dropdown_selection(self.rename_choice.GetSelection())
 
-        path_to_module = Path(__file__).resolve().parent.parent / RENAME_APS_DIR / f'{selected_script}.py'
-        self.current_sorting_module = import_module_from_path(selected_script, path_to_module)
+        self.current_sorting_module = load_module(RENAME_APS_DIR, selected_script)
 
         # Update the one-liner label with a description from the selected module
         if hasattr(self.current_sorting_module, 'ONE_LINER_DESCRIPTION'):
@@ -151,16 +220,21 @@ class MapDialog(wx.Dialog):
             self.spin_ctrl_label.SetToolTip(wx.ToolTip(boundary_separator_tooltip))
 
         self.spin_ctrl = wx.SpinCtrl(self.panel, value='0')
-        self.spin_ctrl.SetRange(0, 10000)  # Set minimum and maximum values
+        self.spin_ctrl.SetRange(1, 10000)  # Set minimum and maximum values
         self.spin_ctrl.SetValue(self.rename_aps_boundary_separator)  # Set the initial value
         self.spin_ctrl.SetIncrement(10)  # Set the increment value (step size)
 
         self.update_button = wx.Button(self.panel, label='Update')
         self.update_button.Bind(wx.EVT_BUTTON, self.on_update_boundary_separator)
 
+        # Dragging the slider re-sorts the APs live
+        self.slider = wx.Slider(self.panel, value=self.rename_aps_boundary_separator, minValue=1, maxValue=max(self.slider_max_value(), self.rename_aps_boundary_separator), size=(200, -1))
+        self.slider.Bind(wx.EVT_SLIDER, self.on_slider)
+
         self.row1.Add(self.spin_ctrl_label, 0, wx.ALL, 5)
         self.row1.Add(self.spin_ctrl, 0, wx.ALIGN_CENTER_VERTICAL, 1)
         self.row1.Add(self.update_button, 0, wx.ALL, 5)
+        self.row1.Add(self.slider, 0, wx.ALIGN_CENTER_VERTICAL, 1)
 
     def remove_boundary_separation_widget(self):
         """Remove any existing rename_aps_boundary_separator widgets."""
@@ -177,50 +251,201 @@ class MapDialog(wx.Dialog):
         self.update_button.Destroy()
         del self.update_button
 
+        if self.slider_timer is not None:
+            self.slider_timer.Stop()
+        self.row1.Detach(self.slider)
+        self.slider.Destroy()
+        del self.slider
+
     def on_update_boundary_separator(self, event):
         """Update the boundary separator value."""
         if not self.rename_aps_boundary_separator == int(self.spin_ctrl.GetValue()):
+            self.sort_generation += 1  # Discard any slider sort still running
             self.rename_aps_boundary_separator = int(self.spin_ctrl.GetValue())
             self.update_boundary_separator_value(self.rename_aps_boundary_separator)
+            self.slider.SetMax(max(self.slider.GetMax(), self.rename_aps_boundary_separator))
+            self.slider.SetValue(self.rename_aps_boundary_separator)
             self.update_plot()
 
+    def slider_max_value(self):
+        """The floor plan size along the boundary axis, in the same pixels as the AP coordinates."""
+        width, height = self.image_pyramid.full_size(self.map_data[self.current_map][0])
+        return height if getattr(self.current_sorting_module, 'BOUNDARY_ORIENTATION', None) == 'horizontal' else width
+
+    def on_slider(self, event):
+        """Restart the debounce timer, the APs are only re-sorted once the slider pauses."""
+        self.spin_ctrl.SetValue(self.slider.GetValue())
+        if self.slider_timer is not None and self.slider_timer.IsRunning():
+            self.slider_timer.Restart(SLIDER_DEBOUNCE_MS)
+        else:
+            self.slider_timer = wx.CallLater(SLIDER_DEBOUNCE_MS, self.start_boundary_sort)
+
+    def start_boundary_sort(self):
+        """Group the current floor for the slider value on the worker thread."""
+        if self.boundary_groups is None:
+            return
+
+        boundary_separator = self.slider.GetValue()
+        self.sort_generation += 1
+        generation = self.sort_generation
+
+        future = self.sort_executor.submit(self.boundary_groups.assign, boundary_separator)
+        future.add_done_callback(lambda f: wx.CallAfter(self.on_boundary_sort_done, generation, boundary_separator, f))
+
+    def on_boundary_sort_done(self, generation, boundary_separator, future):
+        """Apply a finished sort, unless the slider, floor or script has changed since, then redraw only the AP layer."""
+        if generation != self.sort_generation or future.exception() is not None:
+            return
+
+        access_points_list_sorted, group_ids, boundaries = future.result()
+
+        self.rename_aps_boundary_separator = boundary_separator
+        self.update_boundary_separator_value(boundary_separator)
+
+        self.sorted_aps_list, self.group_ids, self.boundaries = access_points_list_sorted, group_ids, boundaries
+        self.draw_aps()
+        self.draw_connections()
+        self.plot_boundaries()
+        self.blit_ap_layer()
+
     def on_show(self, event):
         self.map_choice.SetSelection(0)
         self.rename_choice.SetSelection(0)
         self.update_plot()
 
     def update_plot(self):
-        """High-level plot update management."""
+        """High-level plot update management, the floor plan is only redrawn when the floor changes."""
         with wx.BusyCursor():
-            self.figure.clear()
-            ax = self.figure.add_subplot(111)
-            self.load_image_and_plot(ax)
-            self.plot_aps(ax)
-            self.draw_connections(ax)
-            self.plot_boundaries(ax)
-            self.figure.tight_layout()
-            self.canvas.draw()
+            self.show_current_map()
+            self.plot_aps()
+            self.draw_connections()
+            self.plot_boundaries()
+            self.blit_ap_layer()
+
+    def show_current_map(self):
+        """Load and plot the current map image, then redraw the figure to refresh the cached background."""
+        if self.displayed_map == self.current_map:
+            return
+
+        img_path = self.map_data[self.current_map][0]
+        width, height = self.image_pyramid.full_size(img_path)
+
+        # Data coordinates stay in full resolution pixels, whichever pyramid level is displayed
+        self.ax.set_xlim(-0.5, width - 0.5)
+        self.ax.set_ylim(height - 0.5, -0.5)
+        self.figure.tight_layout()
+
+        img, extent = self.load_image(img_path)  # Use cached image
+        if self.background_image is None:
+            self.background_image = self.ax.imshow(img, zorder=0, extent=extent)
+        else:
+            self.background_image.set_data(img)
+            self.background_image.set_extent(extent)
+        self.ax.set_xlim(-0.5, width - 0.5)
+        self.ax.set_ylim(height - 0.5, -0.5)
+
+        self.displayed_map = self.current_map
+        self.background = None
+        self.canvas.draw()
+
+    def on_scroll(self, event):
+        """Zoom around the cursor, switching to a finer pyramid level when the visible area needs it."""
+        if event.inaxes is not self.ax or self.background_image is None:
+            return
+
+        width, height = self.image_pyramid.full_size(self.map_data[self.current_map][0])
+        zoom = 1 / SCROLL_ZOOM_STEP if event.button == 'up' else SCROLL_ZOOM_STEP
+
+        x_min, x_max = self.ax.get_xlim()
+        y_bottom, y_top = self.ax.get_ylim()
+        visible_width = min((x_max - x_min) * zoom, width)
+        visible_height = min((y_bottom - y_top) * zoom, height)
 
-    def load_image_and_plot(self, ax):
-        """Load and plot the current map image."""
+        # Keep the point under the cursor in place, without panning beyond the floor plan
+        x_min = min(max(event.xdata - (event.xdata - x_min) * zoom, -0.5), width - 0.5 - visible_width)
+        y_top = min(max(event.ydata - (event.ydata - y_top) * zoom, -0.5), height - 0.5 - visible_height)
+        self.ax.set_xlim(x_min, x_min + visible_width)
+        self.ax.set_ylim(y_top + visible_height, y_top)
+
+        self.refresh_image()
+
+        # Boundary lines and indicators follow the visible area
+        self.plot_boundaries()
+        self.background = None
+        self.canvas.draw()
+
+    def on_canvas_resize(self, event):
+        """Re-select the pyramid level for the new canvas size, the figure itself is redrawn by the resize."""
+        if self.background_image is None:
+            return
         img_path = self.map_data[self.current_map][0]
-        img = self.load_image(img_path)  # Use cached image
-        ax.imshow(img)
-        ax.axis('off')
+        if self.image_pyramid.level_for(img_path, self.screen_scale()) == self.displayed_level:
+            return
+
+        self.refresh_image()
+        self.background = None
+        self.canvas.draw_idle()
+
+    def refresh_image(self):
+        """Reload the visible window of the floor plan at the pyramid level matching the current view."""
+        x_limits, y_limits = self.ax.get_xlim(), self.ax.get_ylim()
+        img, extent = self.load_image(self.map_data[self.current_map][0])
+        self.background_image.set_data(img)
+        self.background_image.set_extent(extent)
+        # set_extent autoscales to the window, restore the view
+        self.ax.set_xlim(*x_limits)
+        self.ax.set_ylim(*y_limits)
+
+    def ap_layer_artists(self):
+        """The animated artists in drawing order."""
+        return [self.boundary_lines, *self.boundary_labels, self.connections, self.ap_markers, *self.ap_numbers]
+
+    def on_canvas_draw(self, event):
+        self.background = self.canvas.copy_from_bbox(self.ax.bbox)
+        for artist in self.ap_layer_artists():
+            self.ax.draw_artist(artist)
+
+    def blit_ap_layer(self):
+        """Redraw only the AP layer over the cached floor plan background."""
+        if self.background is None:
+            self.canvas.draw()
+            return
+
+        self.canvas.restore_region(self.background)
+        for artist in self.ap_layer_artists():
+            self.ax.draw_artist(artist)
+        self.canvas.blit(self.ax.bbox)
+
+    def update_texts(self, texts, entries, **text_kwargs):
+        """Reuse the animated Text artists in texts for entries of (x, y, string), creating more only when needed."""
+        while len(texts) < len(entries):
+            texts.append(self.ax.text(0, 0, '', animated=True, **text_kwargs))
+
+        for text, (x, y, string) in zip(texts, entries):
+            text.set_position((x, y))
+            text.set_text(string)
+            text.set_visible(True)
+
+        for text in texts[len(entries):]:
+            text.set_visible(False)
 
-    def plot_aps(self, ax):
+    def plot_aps(self):
         """Plot APs on the map."""
         self.sorted_aps_list, self.boundaries, self.boundary_orientation = self.get_sorted_aps_list()
+        self.draw_aps()
 
-        # Calculate the number of APs per floor
-        aps_per_floor = self.count_aps_per_floor(self.ap_data)
-
+    def draw_aps(self):
+        """Update the AP markers and numbers for the sorted APs."""
         # Calculate the total number of preceding APs for the current floor
-        preceding_aps = sum(count for floor, count in aps_per_floor.items() if floor < self.current_map)
+        preceding_aps = sum(count for floor, count in self.aps_per_floor.items() if floor < self.current_map)
+
+        coordinates = [(ap['location']['coord']['x'], ap['location']['coord']['y']) for ap in self.sorted_aps_list]
+        self.ap_markers.set_offsets(coordinates if coordinates else [(float('nan'), float('nan'))])
+        self.ap_markers.set_facecolors([ap['color'] for ap in self.sorted_aps_list] or ['none'])
+        self.ap_markers.set_edgecolors('none')
 
-        for i, ap in enumerate(self.sorted_aps_list, start=1 + preceding_aps):
-            ax.scatter(ap['location']['coord']['x'], ap['location']['coord']['y'], color=ap['color'], s=280, zorder=5)
-            ax.text(ap['location']['coord']['x'], ap['location']['coord']['y'], str(i), color='black', ha='center', va='center', fontsize=9, zorder=6)
+        self.update_texts(self.ap_numbers, [(x, y, str(i)) for i, (x, y) in enumerate(coordinates, start=1 + preceding_aps)],
+                          color='black', ha='center', va='center', fontsize=9, zorder=6)
 
     def count_aps_per_floor(self, ap_data):
         aps_per_floor = {}
@@ -229,8 +454,10 @@ class MapDialog(wx.Dialog):
             aps_per_floor[floor] = aps_per_floor.get(floor, 0) + 1
         return aps_per_floor
 
-    def draw_connections(self, ax):
+    def draw_connections(self):
         """Draw connections between APs and any additional markers, with each segment in a different color."""
+        segments, colors, linestyles, linewidths = [], [], [], []
+
         # Ensure there are at least two points to connect.
         if len(self.sorted_aps_list) > 1:
             for i in range(len(self.sorted_aps_list) - 1):
@@ -256,21 +483,24 @@ class MapDialog(wx.Dialog):
                             segment_color = 'grey'  # Change the color to grey for dashed lines
                             linewidth = 1
 
-                        # Check for different x or y group and change linestyle accordingly
-                        different_group = False
-                        if self.boundary_orientation == 'horizontal':
-                            if self.sorted_aps_list[i]['location']['coord']['y_group'] != self.sorted_aps_list[i + 1]['location']['coord']['y_group']:
-                                different_group = True
-                        if self.boundary_orientation == 'vertical':
-                            if self.sorted_aps_list[i]['location']['coord']['x_group'] != self.sorted_aps_list[i + 1]['location']['coord']['x_group']:
-                                different_group = True
+                        # Check for different row / column group and change linestyle accordingly
+                        different_group = self.group_ids is not None and self.group_ids[i] != self.group_ids[i + 1]
 
                         if different_group and segment_color != 'grey':
                             linestyle = '--'  # Dotted line for different grouped APs
                             linewidth = 2
 
-                # Draw the line segment with the specified color and linestyle
-                ax.plot([start_point[0], end_point[0]], [start_point[1], end_point[1]], color=segment_color, linestyle=linestyle, linewidth=linewidth, zorder=4)
+                # Every segment is part of the one connections collection
+                segments.append([start_point, end_point])
+                colors.append(segment_color)
+                linestyles.append(linestyle)
+                linewidths.append(linewidth)
+
+        self.connections.set_segments(segments)
+        if segments:
+            self.connections.set_color(colors)
+            self.connections.set_linestyle(linestyles)
+            self.connections.set_linewidth(linewidths)
 
     def get_sorted_aps_list(self):
         """Obtain the sorted list of APs and any additional data, such as boundaries."""
@@ -279,50 +509,74 @@ class MapDialog(wx.Dialog):
             if ap['floor'] == self.current_map:
                 ap_list.append(ap)
 
-        if self.current_sorting_module and hasattr(self.current_sorting_module, BOUNDARY_SEPARATION_WIDGET):
+        self.group_ids = None
+
+        if self.current_sorting_module and hasattr(self.current_sorting_module, 'prepare_sort'):
+            # Pre-sorted once per floor and script, for the boundary separator slider
+            if self.boundary_groups is None:
+                self.boundary_groups = self.current_sorting_module.prepare_sort(ap_list, self.floor_plans_dict)
+            self.sort_generation += 1  # Discard any slider sort still running
+            access_points_list_sorted, self.group_ids, boundaries = self.boundary_groups.assign(self.rename_aps_boundary_separator)
+            return access_points_list_sorted, boundaries, self.boundary_groups.orientation
+
+        elif self.current_sorting_module and hasattr(self.current_sorting_module, BOUNDARY_SEPARATION_WIDGET):
             return self.current_sorting_module.sort_logic(ap_list, self.floor_plans_dict, self.rename_aps_boundary_separator, True)
 
         elif self.current_sorting_module and hasattr(self.current_sorting_module, "sort_logic"):
             return self.current_sorting_module.sort_logic(ap_list, self.floor_plans_dict), None, None  # Adjust as per the sorting function's requirements
 
-    def plot_boundaries(self, ax):
-        if self.boundaries is None:
-            return
+    def plot_boundaries(self):
+        segments = []
+        labels = []
+        x_min, x_max = self.ax.get_xlim()
+        y_bottom, y_top = self.ax.get_ylim()
+
+        if self.boundaries is None or not self.boundaries:
+            pass
 
         elif self.boundary_orientation == 'horizontal':
-            self.draw_row_indicators(ax)
+            labels = self.row_indicators()
             for boundary in self.boundaries:
-                ax.axhline(y=boundary, color='b', linestyle='--', linewidth=1)
+                segments.append([(x_min, boundary), (x_max, boundary)])
             # Skip drawing the last boundary if it's beyond the plot's limits
-            if self.boundaries[-1] + self.rename_aps_boundary_separator < ax.get_ylim()[1]:
-                ax.axhline(y=boundary + self.rename_aps_boundary_separator, color='b', linestyle='--', linewidth=1)  # Draw the last boundary
+            if self.boundaries[-1] + self.rename_aps_boundary_separator < y_top:
+                segments.append([(x_min, boundary + self.rename_aps_boundary_separator), (x_max, boundary + self.rename_aps_boundary_separator)])  # Draw the last boundary
 
         elif self.boundary_orientation == 'vertical':
-            self.draw_column_indicators(ax)
+            labels = self.column_indicators()
             for boundary in self.boundaries:
-                ax.axvline(x=boundary, color='b', linestyle='--', linewidth=1)
-            ax.axvline(x=boundary + self.rename_aps_boundary_separator, color='b', linestyle='--', linewidth=1)  # Draw the last boundary
-
-    def draw_row_indicators(self, ax):
-        """Draw indicators for row numbers between boundary lines."""
-        plot_xlim = ax.get_xlim()
+                segments.append([(boundary, y_bottom), (boundary, y_top)])
+            segments.append([(boundary + self.rename_aps_boundary_separator, y_bottom), (boundary + self.rename_aps_boundary_separator, y_top)])  # Draw the last boundary
+
+        self.boundary_lines.set_segments(segments)
+        self.update_texts(self.boundary_labels, labels, color='blue', fontsize=10)
+        for text in self.boundary_labels:
+            text.set_verticalalignment('center' if self.boundary_orientation == 'horizontal' else 'bottom')
+            text.set_horizontalalignment('left' if self.boundary_orientation == 'horizontal' else 'center')
+
+    def row_indicators(self):
+        """Row numbers between boundary lines, as (x, y, text)."""
+        plot_xlim = self.ax.get_xlim()
         x_position = plot_xlim[0]  # You might want to adjust this to not overlap with your plot
 
-        for i, y_position in enumerate(self.boundaries, start=1):
-            # Place the row indicator. Adjust `x_position` and `y_position` as needed.
-            # You might want to add or subtract a small value to `y_position` to avoid overlap with the lines
-            ax.text(x_position, y_position + (self.rename_aps_boundary_separator / 2), f"{i}", verticalalignment='center', horizontalalignment='left', color='blue', fontsize=10)
+        # Offset by half a boundary separator to avoid overlap with the lines
+        return [(x_position, y_position + (self.rename_aps_boundary_separator / 2), f"{i}") for i, y_position in enumerate(self.boundaries, start=1)]
 
-    def draw_column_indicators(self, ax):
-        """Draw indicators for column numbers between boundary lines."""
-        plot_ylim = ax.get_ylim()
+    def column_indicators(self):
+        """Column numbers between boundary lines, as (x, y, text)."""
+        plot_ylim = self.ax.get_ylim()
         y_position = plot_ylim[0]  # Adjust as needed, depending on where you want the text
 
-        for i, x_position in enumerate(self.boundaries, start=1):
-            # Similar to rows, but now we're adjusting the x positions for column indicators
-            ax.text(x_position + (self.rename_aps_boundary_separator / 2), y_position, f"{i}", verticalalignment='bottom', horizontalalignment='center', color='blue', fontsize=10)
+        # Similar to rows, but now we're adjusting the x positions for column indicators
+        return [(x_position + (self.rename_aps_boundary_separator / 2), y_position, f"{i}") for i, x_position in enumerate(self.boundaries, start=1)]
 
     def on_dismiss(self, event):
+        # Stop the slider timer and ignore any sort still running
+        if self.slider_timer is not None:
+            self.slider_timer.Stop()
+        self.sort_generation += 1
+        self.sort_executor.shutdown(wait=False)
+
         if self.current_sorting_module and hasattr(self.current_sorting_module, BOUNDARY_SEPARATION_WIDGET):
             self.message_callback(f"{nl}Boundary separator value configured at: {self.rename_aps_boundary_separator}{nl}AP renaming function will use this value")
 
@@ -0,0 +1,51 @@
+# sort_keys.py
+
+"""
+Sort keys for the AP rename scripts.
+
+Every sort criterion is computed once per AP into an array, text criteria
+(floor name, model, tag values) as ordinals, and the APs are then sorted once
+with np.lexsort over those arrays, instead of Python sorts whose key functions
+repeat dict lookups and tag list scans for every AP.
+
+np.lexsort is stable, like sorted(), so APs that tie on every key keep their order.
+"""
+
+import numpy as np
+
+from common import model_sort_order
+
+
+def ordinals(values):
+    """The rank of each value among the distinct values, equal values share a rank."""
+    rank = {value: i for i, value in enumerate(sorted(set(values)))}
+    return np.fromiter((rank[value] for value in values), dtype=np.int64, count=len(values))
+
+
+def floor_name_key(access_points_list, floor_plans_dict):
+    floor_names = {}  # By floorPlanId, each floor is looked up once
+    for ap in access_points_list:
+        floor_id = ap['location'].get('floorPlanId')
+        if floor_id not in floor_names:
+            floor_names[floor_id] = (floor_plans_dict.get(floor_id) or {}).get('name', '')
+    return ordinals([floor_names[ap['location'].get('floorPlanId')] for ap in access_points_list])
+
+
+def floor_id_key(access_points_list):
+    """Tells floors sharing a name apart."""
+    return ordinals([ap['location'].get('floorPlanId', '') for ap in access_points_list])
+
+
+def model_key(access_points_list):
+    return ordinals([model_sort_order.get(ap['model'], ap['model']) for ap in access_points_list])
+
+
+def coordinate_key(access_points_list, axis):
+    return np.fromiter((ap['location']['coord'][axis] for ap in access_points_list), dtype=np.float64, count=len(access_points_list))
+
+
+def lexsorted(access_points_list, *keys):
+    """Return the APs sorted by the key arrays, most significant key first."""
+    if not access_points_list:
+        return []
+    return [access_points_list[i] for i in np.lexsort(keys[::-1])]
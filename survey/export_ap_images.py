@@ -5,12 +5,15 @@ Credit to Francois Verges (@VergesFrancois) for the original script and inspirat
 Adapted, modified, mangled by Nick Turner (@nickjvturner)
 """
 
-import wx
 import shutil
 
 from common import load_json
 from common import nl
 from common import sanitize_string
+from common import create_floor_plans_dict
+
+from survey.image_export_common import get_photo_export_options
+from survey.image_export_common import export_images
 
 
 def export_ap_images(project_object):
@@ -18,18 +21,19 @@ def export_ap_images(project_object):
 
     project_dir = project_object.working_directory / project_object.project_name
 
+    floor_plans_json = load_json(project_dir, 'floorPlans.json', message_callback)
     access_points_json = load_json(project_dir, 'accessPoints.json', message_callback)
     notes_json = load_json(project_dir, 'notes.json', message_callback)
 
     if not notes_json:
-        wx.CallAfter(message_callback, f'No notes found in the project{nl}')
+        message_callback(f'No notes found in the project{nl}')
         return
 
     if not access_points_json:
-        wx.CallAfter(message_callback, f'No access points found in the project{nl}')
+        message_callback(f'No access points found in the project{nl}')
         return
 
-    wx.CallAfter(message_callback, f'Extracting AP Images from: {project_object.project_name}{nl}')
+    message_callback(f'Extracting AP Images from: {project_object.project_name}{nl}')
 
     # Create directory to hold output directories
     output_dir = project_object.working_directory / 'OUTPUT'
@@ -39,6 +43,12 @@ def export_ap_images(project_object):
     ap_images_dir = output_dir / 'AP images'
     ap_images_dir.mkdir(parents=True, exist_ok=True)
 
+    floor_plans_dict = create_floor_plans_dict(floor_plans_json)
+
+    # Optional downscale / transcode pipeline, configured by the project profile
+    photo_export_options = get_photo_export_options(getattr(project_object, 'project_profile_module', None))
+    photo_export_jobs = []
+
     image_extraction_counter = []
 
     # Loop through all the APs in the project
@@ -77,19 +87,33 @@ def export_ap_images(project_object):
                                     # Determine the output image name
                                     if image_notes_count > 1 or len(note['imageIds']) > 1:
                                         # Add image count starting from 1 if there are multiple images associated with this AP
-                                        ap_image_name = f"{ap_image_name}-{image_count}.png"
+                                        ap_image_stem = f"{ap_image_name}-{image_count}"
                                     else:
                                         # Only one note with images, so no suffix for the first image
-                                        ap_image_name = f"{ap_image_name}.png"
-
-                                    output_destination = ap_images_dir / ap_image_name
+                                        ap_image_stem = ap_image_name
 
                                     # Count total number of APs extracted
                                     image_extraction_counter.append(source_image_file)
 
+                                    image_count += 1
+
+                                    if photo_export_options is not None:
+                                        # Defer to the export pipeline, the file extension follows the detected format
+                                        photo_export_jobs.append({
+                                            'source': source_image_full_path,
+                                            'output_stem': ap_image_stem,
+                                            'floor': floor_plans_dict.get(ap['location']['floorPlanId'], {}).get('name', 'Unknown')
+                                        })
+                                        continue
+
+                                    ap_image_name = f"{ap_image_stem}.png"
+                                    output_destination = ap_images_dir / ap_image_name
+
                                     shutil.copy(source_image_full_path, output_destination)
-                                    wx.CallAfter(message_callback, f"{ap_image_name} Image extracted")
+                                    message_callback(f"{ap_image_name} Image extracted")
 
-                                    image_count += 1
+    if photo_export_jobs:
+        message_callback(f'Exporting {len(photo_export_jobs)} images with options: {photo_export_options}{nl}')
+        export_images(photo_export_jobs, ap_images_dir, photo_export_options, message_callback)
 
-    wx.CallAfter(message_callback, f'{nl}{len(image_extraction_counter)} images extracted{nl}')
+    message_callback(f'{nl}{len(image_extraction_counter)} images extracted{nl}')
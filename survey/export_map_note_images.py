@@ -14,6 +14,28 @@ from datetime import datetime
 
 from common import load_json
 from common import nl
+from common import create_floor_plans_dict
+
+from survey.image_export_common import get_photo_export_options
+from survey.image_export_common import export_images
+
+
+def create_note_floor_dict(picture_notes_json, floor_plans_json):
+	"""Map each noteId to the name of the floor its picture note is placed on."""
+	note_floor_dict = {}
+
+	if not picture_notes_json or not floor_plans_json:
+		return note_floor_dict
+
+	floor_plans_dict = create_floor_plans_dict(floor_plans_json)
+
+	for picture_note in picture_notes_json.get('pictureNotes', []):
+		floor_plan_id = picture_note.get('location', {}).get('floorPlanId')
+		floor_name = floor_plans_dict.get(floor_plan_id, {}).get('name', 'Unknown')
+		for note_id in picture_note.get('noteIds', []):
+			note_floor_dict[note_id] = floor_name
+
+	return note_floor_dict
 
 
 def export_map_note_images(project_object):
@@ -63,6 +85,15 @@ def export_map_note_images(project_object):
 
 	message_callback(f'Extracting Images from: {project_object.project_name} notes')
 
+	# Optional downscale / transcode pipeline, configured by the project profile
+	photo_export_options = get_photo_export_options(getattr(project_object, 'project_profile_module', None))
+	photo_export_jobs = []
+
+	if photo_export_options is not None:
+		floor_plans_json = load_json(project_dir, 'floorPlans.json', message_callback)
+		picture_notes_json = load_json(project_dir, 'pictureNotes.json', message_callback)
+		note_floor_dict = create_note_floor_dict(picture_notes_json, floor_plans_json)
+
 	image_extraction_counter = []
 
 	for map_note in map_note_ids:
@@ -78,10 +109,23 @@ def export_map_note_images(project_object):
 
 				if len(map_note['imageIds']) > 1:
 					# there must be more than 1 image, add '-1', '-2', '-3', etc
-					map_note_image_name = f"{created_at}-{str(image_count)}.png"
+					map_note_image_stem = f"{created_at}-{str(image_count)}"
 				else:
-					map_note_image_name = f"{created_at}.png"
+					map_note_image_stem = created_at
 
+				image_count += 1
+
+				if photo_export_options is not None:
+					# Defer to the export pipeline, the file extension follows the detected format
+					image_extraction_counter.append(map_note_image_stem)
+					photo_export_jobs.append({
+						'source': image_full_path,
+						'output_stem': map_note_image_stem,
+						'floor': note_floor_dict.get(map_note['id'], 'Unplaced')
+					})
+					continue
+
+				map_note_image_name = f"{map_note_image_stem}.png"
 				dst = map_note_image_dir / map_note_image_name
 
 				# count total number of APs extracted
@@ -90,6 +134,8 @@ def export_map_note_images(project_object):
 				shutil.copy(image_full_path, dst)
 				message_callback(f"{image} extracted as {map_note_image_name}")
 
-				image_count += 1
+	if photo_export_jobs:
+		message_callback(f'Exporting {len(photo_export_jobs)} images with options: {photo_export_options}{nl}')
+		export_images(photo_export_jobs, map_note_image_dir, photo_export_options, message_callback)
 
 	message_callback(f'{nl}{len(image_extraction_counter)} images extracted{nl}')
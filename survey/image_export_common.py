@@ -0,0 +1,258 @@
+# image_export_common.py
+
+"""
+Shared image export pipeline for the survey photo exporters.
+
+Images stored within an .esx project are extension-less 'image-<id>' files,
+regardless of whether they are PNG screenshots or 12 MP JPEG photos.
+When the selected project profile defines 'photo_export_options' the exporters
+hand their work to export_images(), which detects the real image format,
+optionally downscales / transcodes each image across a process pool and
+writes a thumbnail contact sheet per floor.
+
+This module deliberately avoids importing wx / common at module level, the
+worker processes only need PIL.
+
+export_images() runs on a job thread, message_callback is called directly and
+must be safe to call off the GUI thread (MyFrame.append_message is).
+"""
+
+import os
+import shutil
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from PIL import Image, ImageDraw, ImageFont, ImageOps
+
+DEFAULT_PHOTO_EXPORT_OPTIONS = {
+    'format': None,  # None keeps the source format, otherwise 'JPEG' or 'WEBP'
+    'max_dimension': None,  # Longest edge in pixels, None keeps the source resolution
+    'quality': 85,  # JPEG / WebP quality
+    'contact_sheet': True,  # Write a thumbnail contact sheet per floor
+    'thumbnail_size': 256,  # Contact sheet cell size in pixels
+    'contact_sheet_columns': 6,
+    'workers': None,  # None uses all but one CPU core
+}
+
+FORMAT_EXTENSIONS = {
+    'JPEG': '.jpg',
+    'PNG': '.png',
+    'WEBP': '.webp',
+    'GIF': '.gif',
+    'BMP': '.bmp',
+    'TIFF': '.tif',
+}
+
+TRANSCODE_FORMATS = ('JPEG', 'WEBP')
+
+CONTACT_SHEET_DIR = 'contact sheets'
+CONTACT_SHEET_CAPTION_HEIGHT = 18
+CONTACT_SHEET_PADDING = 8
+
+
+def get_photo_export_options(project_profile_module):
+    """
+    Merge the project profile 'photo_export_options' with the defaults.
+    Returns None when the profile does not opt in, the exporters then fall back to a verbatim copy.
+    """
+    profile_options = getattr(project_profile_module, 'photo_export_options', None)
+
+    if profile_options is None:
+        return None
+
+    options = dict(DEFAULT_PHOTO_EXPORT_OPTIONS)
+    options.update(profile_options)
+
+    if options['format'] is not None:
+        options['format'] = options['format'].upper()
+        if options['format'] == 'JPG':
+            options['format'] = 'JPEG'
+        if options['format'] not in TRANSCODE_FORMATS:
+            raise ValueError(f"Unsupported photo export format: {options['format']}, use one of {TRANSCODE_FORMATS}")
+
+    return options
+
+
+def detect_image_format(image_path):
+    """Read only the image header to establish the real format of an 'image-<id>' file."""
+    try:
+        with Image.open(image_path) as img:
+            return img.format
+    except (OSError, ValueError):
+        return None
+
+
+def export_image_job(source, output_dir, output_stem, options):
+    """
+    Process pool worker, export a single image.
+
+    Returns a dict describing the result, including a small RGB thumbnail for the contact sheet.
+    """
+    source = Path(source)
+    output_dir = Path(output_dir)
+    source_format = detect_image_format(source)
+    source_bytes = source.stat().st_size
+
+    if source_format is None:
+        # Not something PIL understands, keep the original bytes
+        destination = output_dir / f"{output_stem}.bin"
+        shutil.copy(source, destination)
+        return {'source': str(source), 'output': str(destination), 'format': None, 'source_bytes': source_bytes,
+                'output_bytes': destination.stat().st_size, 'thumbnail': None}
+
+    target_format = options['format'] or source_format
+    max_dimension = options['max_dimension']
+
+    with Image.open(source) as img:
+        needs_resize = max_dimension is not None and max(img.size) > max_dimension
+        needs_transcode = target_format != source_format
+
+        destination = output_dir / f"{output_stem}{FORMAT_EXTENSIONS.get(target_format, '.png')}"
+
+        if needs_resize and img.format == 'JPEG':
+            # Let libjpeg decode at a reduced scale, far cheaper than decoding all 12 MP
+            img.draft('RGB', (max_dimension, max_dimension))
+
+        if needs_resize or needs_transcode:
+            image = ImageOps.exif_transpose(img)
+
+            if needs_resize:
+                image.thumbnail((max_dimension, max_dimension), Image.LANCZOS)
+
+            save_image(image, destination, target_format, options['quality'])
+        else:
+            # Nothing to change, copy the original bytes under the correct extension
+            image = img
+            shutil.copy(source, destination)
+
+        thumbnail = None
+        if options['contact_sheet']:
+            if image is img:
+                if img.format == 'JPEG':
+                    img.draft('RGB', (options['thumbnail_size'], options['thumbnail_size']))
+                thumbnail_image = ImageOps.exif_transpose(img)
+            else:
+                thumbnail_image = image.copy()
+            thumbnail_image.thumbnail((options['thumbnail_size'], options['thumbnail_size']))
+            thumbnail_image = thumbnail_image.convert('RGB')
+            thumbnail = (thumbnail_image.size, thumbnail_image.tobytes())
+
+    return {'source': str(source), 'output': str(destination), 'format': source_format, 'source_bytes': source_bytes,
+            'output_bytes': destination.stat().st_size, 'thumbnail': thumbnail}
+
+
+def save_image(image, destination, target_format, quality):
+    if target_format == 'JPEG':
+        if image.mode not in ('RGB', 'L'):
+            image = flatten_alpha(image)
+        image.save(destination, 'JPEG', quality=quality, optimize=True, progressive=True)
+    elif target_format == 'WEBP':
+        image.save(destination, 'WEBP', quality=quality, method=4)
+    else:
+        image.save(destination, target_format)
+
+
+def flatten_alpha(image):
+    """Composite images with transparency onto white, JPEG has no alpha channel."""
+    image = image.convert('RGBA')
+    background = Image.new('RGB', image.size, 'white')
+    background.paste(image, mask=image.getchannel('A'))
+    return background
+
+
+def export_images(jobs, output_dir, options, message_callback):
+    """
+    Export a list of image jobs across a process pool.
+
+    Each job is a dict with 'source' (Path to the image-<id> file), 'output_stem' (filename without extension)
+    and 'floor' (floor name, used to group the contact sheets).
+    Returns the list of exported output paths.
+    """
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    results_by_floor = {}
+    exported = []
+    total_source_bytes = 0
+    total_output_bytes = 0
+
+    with ProcessPoolExecutor(max_workers=options['workers'] or default_worker_count()) as executor:
+        futures = {executor.submit(export_image_job, str(job['source']), str(output_dir), job['output_stem'], options): job for job in jobs}
+
+        for future in as_completed(futures):
+            job = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                message_callback(f"Failed to export {job['source'].name}: {e}")
+                continue
+
+            exported.append(result['output'])
+            total_source_bytes += result['source_bytes']
+            total_output_bytes += result['output_bytes']
+            results_by_floor.setdefault(job['floor'], []).append((job['output_stem'], result['thumbnail']))
+
+            message_callback(f"{Path(result['output']).name} exported (source format: {result['format']})")
+
+    message_callback(f"\nSource images: {format_bytes(total_source_bytes)}, exported images: {format_bytes(total_output_bytes)}")
+
+    if options['contact_sheet']:
+        # Imported here, the worker processes never need common (and with it wx)
+        from common import sanitize_filename
+
+        contact_sheet_dir = output_dir / CONTACT_SHEET_DIR
+        contact_sheet_dir.mkdir(parents=True, exist_ok=True)
+
+        for floor_name, floor_results in sorted(results_by_floor.items()):
+            contact_sheet_path = contact_sheet_dir / f"{sanitize_filename(floor_name, message_callback)} contact sheet.jpg"
+            try:
+                create_contact_sheet(sorted(floor_results, key=lambda result: result[0]), contact_sheet_path, options)
+            except Exception as e:
+                # The images themselves are exported, one failed sheet does not fail the export
+                message_callback(f"Failed to create the contact sheet for {floor_name}: {e}")
+                continue
+            message_callback(f"Contact sheet created: {contact_sheet_path.name}")
+
+    return exported
+
+
+def create_contact_sheet(floor_results, contact_sheet_path, options):
+    """Tile the returned thumbnails into a single captioned JPEG."""
+    thumbnails = [(stem, thumbnail) for stem, thumbnail in floor_results if thumbnail is not None]
+    if not thumbnails:
+        return
+
+    cell = options['thumbnail_size']
+    columns = min(options['contact_sheet_columns'], len(thumbnails))
+    rows = -(-len(thumbnails) // columns)
+
+    cell_width = cell + CONTACT_SHEET_PADDING
+    cell_height = cell + CONTACT_SHEET_CAPTION_HEIGHT + CONTACT_SHEET_PADDING
+
+    sheet = Image.new('RGB', (columns * cell_width + CONTACT_SHEET_PADDING, rows * cell_height + CONTACT_SHEET_PADDING), 'white')
+    draw = ImageDraw.Draw(sheet)
+    font = ImageFont.load_default()
+
+    for index, (stem, (size, data)) in enumerate(thumbnails):
+        thumbnail = Image.frombytes('RGB', size, data)
+        column, row = index % columns, index // columns
+
+        x = CONTACT_SHEET_PADDING + column * cell_width
+        y = CONTACT_SHEET_PADDING + row * cell_height
+
+        # Centre the thumbnail within its cell
+        sheet.paste(thumbnail, (x + (cell - size[0]) // 2, y + (cell - size[1]) // 2))
+        draw.text((x + cell // 2, y + cell + 2), stem, fill='black', font=font, anchor='mt')
+
+    sheet.save(contact_sheet_path, 'JPEG', quality=options['quality'])
+
+
+def format_bytes(size):
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if size < 1024:
+            return f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} TB"
+
+
+def default_worker_count():
+    return max(1, (os.cpu_count() or 2) - 1)
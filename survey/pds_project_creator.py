@@ -2,6 +2,7 @@ import wx
 import re
 import shutil
 import json
+import copy
 
 from common import load_json
 from common import nl
@@ -132,6 +133,10 @@ def create_pds_project_esx(self, message_callback):
     if not areas_json:
         return
 
+    # Both are modified below, work on copies in case they are shared with other pipeline stages
+    requirements_json = copy.deepcopy(requirements_json)
+    areas_json = copy.deepcopy(areas_json)
+
     # Create a temporary directory inside the working directory
     temp_dir_name = f"temp_dir"
     temp_dir = self.working_directory / temp_dir_name
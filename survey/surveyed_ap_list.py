@@ -12,6 +12,9 @@ from common import format_headers
 from common import flatten_picture_notes_hierarchical
 
 from common import nl
+from common import PROCESS_ABORTED
+
+from instrumentation import span
 
 
 channel_bands = ['2.4', '5', '6']
@@ -43,7 +46,7 @@ wide_fixed_width_cols =\
 ssid_columns = ['2.4 SSIDs', '5 SSIDs', '6 SSIDs']
 
 
-def create_surveyed_ap_list(self):
+def create_surveyed_ap_list(self, stop_event=None):
     message_callback = self.append_message
 
     message_callback(f'Generating surveyed AP list for: {self.project_name}\n')
@@ -64,6 +67,10 @@ def create_surveyed_ap_list(self):
     measured_radios_dict = create_measured_radios_dict(measured_radios_json, access_point_measurements_dict)
     notes_dict = create_notes_dict(notes_json)
 
+    if stop_event is not None and stop_event.is_set():
+        message_callback(PROCESS_ABORTED)
+        return
+
     surveyed_ap_list = self.current_profile_ap_list_module.create_custom_measured_ap_list(access_points_json, floor_plans_dict, tag_keys_dict, measured_radios_dict, notes_dict)
 
     # Create a pandas dataframe and export to Excel
@@ -101,6 +108,10 @@ def create_surveyed_ap_list(self):
         map_notes = flatten_picture_notes_hierarchical(picture_notes_json, notes_dict, floor_plans_dict)
         map_note_df = pd.DataFrame(map_notes)
 
+    if stop_event is not None and stop_event.is_set():
+        message_callback(PROCESS_ABORTED)
+        return
+
     # Create directory to hold output
     output_dir = self.working_directory / 'OUTPUT'
     output_dir.mkdir(parents=True, exist_ok=True)
@@ -108,41 +119,42 @@ def create_surveyed_ap_list(self):
     output_filename = output_dir / f'{self.project_name} - Surveyed AP List.xlsx'
 
     try:
-        sheet_name = 'Surveyed AP List'
-        writer = pd.ExcelWriter(str(output_filename), engine='xlsxwriter')
-        # Sheet 1: Surveyed AP List
-        df.to_excel(writer, sheet_name=sheet_name, index=False)
-        adjust_column_widths(df, writer, sheet_name, right_align_cols, narrow_fixed_width_cols, wide_fixed_width_cols)
-        format_headers(df, writer, sheet_name, freeze_row=True, freeze_col=True)
-
-        # Separate SSID Sheets
-        sheet_name = '2.4GHz SSIDs'
-        ssids_24.to_excel(writer, sheet_name=sheet_name, index=False)
-        adjust_column_widths(ssids_24, writer, sheet_name)
-        format_headers(ssids_24, writer, sheet_name)
-
-        sheet_name = '5GHz SSIDs'
-        ssids_5.to_excel(writer, sheet_name='5GHz SSIDs', index=False)
-        adjust_column_widths(ssids_5, writer, sheet_name)
-        format_headers(ssids_5, writer, sheet_name)
-
-        sheet_name = '6GHz SSIDs'
-        ssids_6.to_excel(writer, sheet_name='6GHz SSIDs', index=False)
-        adjust_column_widths(ssids_6, writer, sheet_name)
-        format_headers(ssids_6, writer, sheet_name)
-
-        sheet_name = 'All SSIDs'
-        all_ssids.to_excel(writer, sheet_name='All SSIDs', index=False)
-        adjust_column_widths(all_ssids, writer, sheet_name)
-        format_headers(all_ssids, writer, sheet_name)
-
-        if map_note_df is not None and not map_note_df.empty:
-            sheet_name = 'Map Notes'
-            map_note_df.to_excel(writer, sheet_name=sheet_name, index=False)
-            adjust_column_widths(map_note_df, writer, sheet_name)
-            format_headers(map_note_df, writer, sheet_name)
-
-        writer.close()
+        with span('xlsx write', file=output_filename.name):
+            sheet_name = 'Surveyed AP List'
+            writer = pd.ExcelWriter(str(output_filename), engine='xlsxwriter')
+            # Sheet 1: Surveyed AP List
+            df.to_excel(writer, sheet_name=sheet_name, index=False)
+            adjust_column_widths(df, writer, sheet_name, right_align_cols, narrow_fixed_width_cols, wide_fixed_width_cols)
+            format_headers(df, writer, sheet_name, freeze_row=True, freeze_col=True)
+
+            # Separate SSID Sheets
+            sheet_name = '2.4GHz SSIDs'
+            ssids_24.to_excel(writer, sheet_name=sheet_name, index=False)
+            adjust_column_widths(ssids_24, writer, sheet_name)
+            format_headers(ssids_24, writer, sheet_name)
+
+            sheet_name = '5GHz SSIDs'
+            ssids_5.to_excel(writer, sheet_name='5GHz SSIDs', index=False)
+            adjust_column_widths(ssids_5, writer, sheet_name)
+            format_headers(ssids_5, writer, sheet_name)
+
+            sheet_name = '6GHz SSIDs'
+            ssids_6.to_excel(writer, sheet_name='6GHz SSIDs', index=False)
+            adjust_column_widths(ssids_6, writer, sheet_name)
+            format_headers(ssids_6, writer, sheet_name)
+
+            sheet_name = 'All SSIDs'
+            all_ssids.to_excel(writer, sheet_name='All SSIDs', index=False)
+            adjust_column_widths(all_ssids, writer, sheet_name)
+            format_headers(all_ssids, writer, sheet_name)
+
+            if map_note_df is not None and not map_note_df.empty:
+                sheet_name = 'Map Notes'
+                map_note_df.to_excel(writer, sheet_name=sheet_name, index=False)
+                adjust_column_widths(map_note_df, writer, sheet_name)
+                format_headers(map_note_df, writer, sheet_name)
+
+            writer.close()
         message_callback(f'{nl}"{output_filename.name}" created successfully{nl}{nl}### PROCESS COMPLETE ###')
     except Exception as e:
         print(e)